@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the per-hit cost of generating an encoded hit by merging all parameters and encoding them, with the
+pre-encoded static parameters of :meth:`server_tracking.google.client.AnalyticsClient.get_payload`, and in addition a
+pre-encoded event template. No requests are sent.
+
+Usage: python -m benchmarks.bench_client
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from server_tracking.encoding import encode_params
+from server_tracking.google.client import AnalyticsClient
+from server_tracking.google.parameters import (SessionParameters, PageViewParameters, EventParameters,
+                                               CustomDimensionUrlGenerator)
+from server_tracking.google.templates import event_template
+from server_tracking.parameters import VP
+
+NUMBER = 50000
+
+
+class Dimensions(CustomDimensionUrlGenerator):
+    site = VP(1)
+    environment = VP(2)
+    release = VP(3)
+
+
+def main():
+    client = AnalyticsClient(None, {'tracking_id': 'UA-12345678-1', 'anonymize_ip': 1, 'data_source': 'web'},
+                             misc_parameters=(Dimensions(site='www.example.com', environment='production',
+                                                         release='2024.05.1'), ))
+    session = SessionParameters(client_id='6c0bd0a1-6d7c-4e8c-9ba5-5f42e1c7f6ae', ip_override='192.168.100.0',
+                                user_language='en-US')
+    page = PageViewParameters(host_name='www.example.com', path='/products/category/item')
+    event = EventParameters('Checkout', action='Submit')
+    template = event_template('Checkout', 'Submit')
+    cases = (
+        ('Merge + encode', lambda: encode_params(client.get_request_params('event', page, event, session))),
+        ('Pre-encoded static part', lambda: client.get_payload('event', page, event, session)),
+        ('Event template', lambda: client.get_payload('event', page, template, session)),
+        ('New objects per hit', lambda: client.get_payload('event', PageViewParameters(page),
+                                                           EventParameters('Checkout', action='Submit'),
+                                                           SessionParameters(session))),
+        ('Template per hit', lambda: client.get_payload('event', PageViewParameters(page), template,
+                                                        SessionParameters(session))),
+    )
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=3))
+        print('{0:<28}{1:8.2f} us/hit'.format(name, seconds / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
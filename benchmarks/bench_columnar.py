@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Compares generating encoded event hits from columns of data row by row, i.e. creating parameter objects and calling
+:meth:`server_tracking.google.client.AnalyticsClient.get_payload` for each row, with
+:class:`server_tracking.google.columnar.ColumnarHitBuilder`. No requests are sent.
+
+Usage: python -m benchmarks.bench_columnar
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from server_tracking.google import HIT_TYPE_EVENT
+from server_tracking.google.client import AnalyticsClient
+from server_tracking.google.columnar import ColumnarHitBuilder
+from server_tracking.google.parameters import SessionParameters, PageViewParameters, EventParameters
+
+ROWS = 20000
+
+
+def per_row(client, columns):
+    payloads = []
+    for client_id, host_name, path, action, value in zip(columns['client_id'], columns['host_name'],
+                                                         columns['path'], columns['action'], columns['value']):
+        session = SessionParameters(client_id=client_id)
+        page = PageViewParameters(host_name=host_name, path=path)
+        event = EventParameters(columns['category'], action=action, value=value)
+        payloads.append(client.get_payload(HIT_TYPE_EVENT, page, event, session))
+    return payloads
+
+
+def columnar(client, columns):
+    return list(ColumnarHitBuilder(client, HIT_TYPE_EVENT).payloads(columns))
+
+
+def main():
+    client = AnalyticsClient(None, {'tracking_id': 'UA-12345678-1', 'anonymize_ip': 1, 'data_source': 'import'})
+    columns = {
+        'client_id': ['{0:08d}-6d7c-4e8c-9ba5-5f42e1c7f6ae'.format(i) for i in range(ROWS)],
+        'host_name': ['www.example.com'] * ROWS,
+        'path': ['/products/category/item/{0}'.format(i % 50) for i in range(ROWS)],
+        'category': 'Order Import',
+        'action': [('Order', 'Refund', 'Cancel / Return')[i % 3] for i in range(ROWS)],
+        'value': [i % 200 for i in range(ROWS)],
+    }
+    for name, func in (('Objects per row', per_row), ('ColumnarHitBuilder', columnar)):
+        seconds = min(timeit.repeat(lambda: func(client, columns), number=1, repeat=3))
+        print('{0:<24}{1:8.2f} us/hit'.format(name, seconds / ROWS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
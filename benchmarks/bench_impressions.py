@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the cost of generating the parameters of large Enhanced E-Commerce product impression lists, product by
+product through :meth:`url` and in a single call through :meth:`url_list`.
+
+Usage: python -m benchmarks.bench_impressions
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from server_tracking.google.parameters import EnhancedEComPIProductParameters
+
+NUMBER = 200
+
+
+class ImpressionParameters(EnhancedEComPIProductParameters):
+    class Meta(object):
+        index_prefix = 1
+
+
+def per_item(products):
+    url = {}
+    for index, product in enumerate(products, 1):
+        # Discard the cached result, as if the product objects were new.
+        product._url = None
+        url.update(product.url(index))
+    return url
+
+
+def main():
+    for size in (50, 200):
+        products = [ImpressionParameters(sku='SKU-{0}'.format(i), name='Product {0}'.format(i), brand='Brand',
+                                         category='Category/Subcategory', position=i, price=19.99)
+                    for i in range(size)]
+        cases = (
+            ('url() per product', per_item),
+            ('url_list()', ImpressionParameters.url_list),
+        )
+        for name, func in cases:
+            seconds = min(timeit.repeat(lambda: func(products), number=NUMBER, repeat=3))
+            print('{0:>4} products, {1:<20}{2:10.1f} us/list'.format(size, name, seconds / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Compares checking paths against a growing number of excluded prefixes one by one, as ``any(path.startswith(...))``,
+with :class:`server_tracking.matching.PathMatcher`.
+
+Usage: python -m benchmarks.bench_matching
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from server_tracking.matching import PathMatcher
+
+RULE_COUNTS = (10, 100, 1000, 5000)
+PATHS = (
+    'products/category/item/42',
+    'tenant-417/admin/users/',
+    'api/v2/orders/1234/',
+    'blog/2020/05/a-long-article-title/',
+)
+NUMBER = 2000
+
+
+def get_prefixes(count):
+    prefixes = ['admin/', 'api/internal/']
+    prefixes.extend('tenant-{0}/admin/'.format(i) for i in range(count - len(prefixes)))
+    return prefixes
+
+
+def main():
+    print('{0:<8}{1:>20}{2:>20}'.format('Rules', 'startswith', 'PathMatcher'))
+    for count in RULE_COUNTS:
+        prefixes = get_prefixes(count)
+        matcher = PathMatcher(prefixes)
+
+        def linear():
+            for path in PATHS:
+                any(path.startswith(prefix) for prefix in prefixes)
+
+        def compiled():
+            for path in PATHS:
+                matcher.get_rate(path)
+
+        results = []
+        for func in (linear, compiled):
+            seconds = min(timeit.repeat(func, number=NUMBER, repeat=3))
+            results.append(seconds / NUMBER / len(PATHS) * 1e6)
+        print('{0:<8}{1:14.2f} us/path{2:14.2f} us/path'.format(count, *results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the per-object cost of constructing parameter objects, as done for every tracked request, and of generating
+their URL parameters.
+
+Usage: python -m benchmarks.bench_parameters
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from server_tracking.google.parameters import GeneralParameters, SessionParameters, PageViewParameters
+
+SESSION = {
+    'client_id': '6c0bd0a1-6d7c-4e8c-9ba5-5f42e1c7f6ae',
+    'ip_override': '192.168.100.0',
+    'user_agent_override': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0',
+    'user_language': 'en-US',
+    'document_referrer': 'https://www.google.com/',
+}
+PAGE = {
+    'host_name': 'www.example.com',
+    'path': '/products/category/item',
+    'title': 'Product',
+}
+NUMBER = 50000
+
+
+def construct():
+    SessionParameters(**SESSION)
+    PageViewParameters(**PAGE)
+
+
+def main():
+    general = GeneralParameters(tracking_id='UA-12345678-1', anonymize_ip=1)
+    session = SessionParameters(**SESSION)
+    page = PageViewParameters(**PAGE)
+    cases = (
+        ('Construction', construct),
+        ('url()', lambda: (general.url('pageview'), session.url(), page.url())),
+        ('Attribute access', lambda: (session.client_id, session.user_id, page.path, page.title)),
+    )
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=3))
+        print('{0:<28}{1:8.2f} us/request'.format(name, seconds / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the per-hit cost of preparing a request through ``requests.Request`` and ``Session.prepare_request`` with
+the direct encoding path of :class:`server_tracking.google.sender.AnalyticsSender`. No requests are sent.
+
+Usage: python -m benchmarks.bench_sender
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from requests import Request
+
+from server_tracking.encoding import encode_payload
+from server_tracking.google.sender import AnalyticsSender
+
+HIT = {
+    'v': 1,
+    'tid': 'UA-12345678-1',
+    'aip': 1,
+    't': 'pageview',
+    'cid': '6c0bd0a1-6d7c-4e8c-9ba5-5f42e1c7f6ae',
+    'uip': '192.168.100.0',
+    'ua': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0 Safari/537.36',
+    'ul': 'en-US',
+    'dh': 'www.example.com',
+    'dp': '/products/category/item?id=1234&ref=search',
+    'dt': 'Product – Example Shop',
+    'dr': 'https://www.google.com/',
+}
+NUMBER = 20000
+
+
+def prepare_legacy(sender, session):
+    req = Request('GET', sender._base_url, params=HIT)
+    return session.prepare_request(req)
+
+
+def prepare_direct(sender, session):
+    payload = encode_payload(HIT)
+    return sender._prepare_request(session, 'GET', '{0}?{1}'.format(sender._base_url, payload))
+
+
+def main():
+    sender = AnalyticsSender()
+    session = sender.session
+    assert prepare_legacy(sender, session).url == prepare_direct(sender, session).url
+    for name, func in (('Request + prepare_request', prepare_legacy), ('Direct encoding', prepare_direct)):
+        seconds = min(timeit.repeat(lambda: func(sender, session), number=NUMBER, repeat=3))
+        print('{0:<28}{1:8.2f} us/hit'.format(name, seconds / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
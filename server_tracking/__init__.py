@@ -5,3 +5,13 @@ __version__ = '1.0.0'
 
 DEFER_METHOD_THREADED = 'threaded'
 DEFER_METHOD_CELERY = 'celery'
+DEFER_METHOD_BATCHED = 'batched'
+DEFER_METHOD_SIDECAR = 'sidecar'
+
+QUEUE_OVERFLOW_BLOCK = 'block'
+QUEUE_OVERFLOW_DROP_NEWEST = 'drop_newest'
+QUEUE_OVERFLOW_DROP_OLDEST = 'drop_oldest'
+
+FALLBACK_DROP = 'drop'
+FALLBACK_SPOOL = 'spool'
+FALLBACK_QUEUE = 'queue'
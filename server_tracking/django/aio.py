@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Middleware, views, and decorator for asynchronous Django views under ASGI. Hits are sent by
+:class:`server_tracking.google.aio.AsyncAnalyticsClient` from tasks on the event loop, so that neither the response
+nor the event loop waits for them, and no thread is needed. Requires Python 3 and ``aiohttp``.
+"""
+from __future__ import unicode_literals
+
+import asyncio
+import logging
+
+from django.http import HttpResponse
+from django.views.generic import View
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:
+    markcoroutinefunction = None
+
+from ..google.aio import AsyncAnalyticsClient, AsyncAnalyticsSender
+from ..google.templates import event_template
+from . import utils
+from .middleware import PageViewMiddleware
+from .settings import SERVER_SIDE_TRACKING as SST_SETTINGS, SERVER_SIDE_TRACKING_GA as GA_SETTINGS
+from .views import SESSION_PARAMETERS
+
+
+log = logging.getLogger(__name__)
+
+# Keeps references to running tasks, which the event loop only holds weakly.
+_tasks = set()
+
+
+def get_async_client(default_parameters=None, **kwargs):
+    """
+    :param default_parameters: Default parameters.
+    :type default_parameters: server_tracking.google.parameters.GeneralParameters | dict
+    :param kwargs: Additional general parameters.
+    :return: Configured client.
+    :rtype: server_tracking.google.aio.AsyncAnalyticsClient
+    """
+    sender = AsyncAnalyticsSender(ssl=GA_SETTINGS['ssl'],
+                                  debug=SST_SETTINGS['debug'],
+                                  default_method=SST_SETTINGS['send_method'],
+                                  post_fallback=SST_SETTINGS['post_fallback'],
+                                  timeout=SST_SETTINGS['timeout'],
+                                  pool_maxsize=SST_SETTINGS['pool_maxsize'],
+                                  keep_alive=SST_SETTINGS['keep_alive'],
+                                  split_hits=SST_SETTINGS['split_hits'])
+    return AsyncAnalyticsClient(sender.send, utils.get_general_parameters(default_parameters, **kwargs),
+                                sampler=utils.get_sampler(), encode_hits=True,
+                                deduplicator=utils.get_deduplicator())
+
+
+def _task_done(task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Failed to send hit.", exc_info=task.exception())
+
+
+def dispatch(coro):
+    """
+    Runs a coroutine that sends hits in the background on the current event loop. Errors are logged.
+
+    :param coro: Coroutine.
+    :return: Task.
+    :rtype: asyncio.Task
+    """
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
+
+
+async def process_pageview(request, response, pageview_parameters=None, session_parameters=None, client_id=None):
+    pageview_params, session_params = utils.get_default_parameters(request, response,
+                                                                   pageview_parameters=pageview_parameters,
+                                                                   session_parameters=session_parameters,
+                                                                   client_id=client_id)
+    return await async_client.pageview(pageview_params, session_params=session_params)
+
+
+async def process_ping(request, response, pageview_parameters=None, session_parameters=None, client_id=None):
+    params = utils.get_ping_parameters(request, response, pageview_parameters=pageview_parameters,
+                                       session_parameters=session_parameters, client_id=client_id)
+    if params is None:
+        return
+    pageview_params, session_params = params
+    return await async_client.event(GA_SETTINGS['ping_category'], GA_SETTINGS['ping_action'],
+                                    label=GA_SETTINGS['ping_label'], non_interaction_hit=1,
+                                    page_params=pageview_params, session_params=session_params)
+
+
+async def process_exception(request, response, description=None, fatal=None, pageview_parameters=None,
+                            session_parameters=None, client_id=None):
+    pageview_params, session_params = utils.get_default_parameters(request, response,
+                                                                   pageview_parameters=pageview_parameters,
+                                                                   session_parameters=session_parameters,
+                                                                   client_id=client_id)
+    return await async_client.exception(description=description, fatal=fatal, page_params=pageview_params,
+                                        misc_params=(session_params,))
+
+
+_ASYNC_PROCESSORS = {
+    utils.process_pageview: process_pageview,
+    utils.process_exception: process_exception,
+}
+
+
+class AsyncPageViewMiddleware(PageViewMiddleware):
+    """
+    Variant of :class:`server_tracking.django.middleware.PageViewMiddleware`, that supports both synchronous and
+    asynchronous request handling. In an asynchronous chain, the client id cookie is set on the response, and hits
+    are built and sent from a task on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super(AsyncPageViewMiddleware, self).__init__(get_response)
+        self._is_async = asyncio.iscoroutinefunction(get_response)
+        if self._is_async:
+            if markcoroutinefunction is not None:
+                markcoroutinefunction(self)
+            else:
+                # Django before 4.1 checks for this marker.
+                self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        return super(AsyncPageViewMiddleware, self).__call__(request)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def _track(self, func, request, response, client_id=None, **kwargs):
+        if not self._is_async:
+            super(AsyncPageViewMiddleware, self)._track(func, request, response, client_id=client_id, **kwargs)
+            return
+        try:
+            if client_id is None:
+                client_id = utils.get_client_id(request, response)
+            dispatch(_ASYNC_PROCESSORS[func](request, response, client_id=client_id, **kwargs))
+        except Exception as e:
+            log.exception(e)
+
+
+class AsyncAnalyticsSessionParameterView(View):
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        response = HttpResponse(status=204)
+        if utils.has_own_cookie(request):
+            return response
+        params = {}
+        for url_param, s_param in SESSION_PARAMETERS:
+            value = request.GET.get(url_param)
+            if value:
+                params[s_param] = value
+        if params and request.META.get('HTTP_REFERER'):
+            # Sets the client id cookie on the response, before it is returned.
+            client_id = utils.get_client_id(request, response)
+            dispatch(process_ping(request, response, session_parameters=params, client_id=client_id))
+        return response
+
+
+class AsyncOwnCookieView(View):
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        response = HttpResponse(status=204)
+        utils.set_own_cookie(response)
+        return response
+
+
+def track_event(category, action, label=None, value=None, misc_parameters=()):
+    """
+    Variant of :func:`server_tracking.django.decorators.track_event` for ``async`` view methods.
+    """
+    template = event_template(category, action, label=label, value=value)
+
+    def event_decorator(func):
+        async def event_wrapper(self, *args, **kwargs):
+            response = await func(self, *args, **kwargs)
+            param_response = response if isinstance(response, HttpResponse) else None
+            try:
+                pageview_params, session_params = utils.get_default_parameters(self.request, param_response)
+                dispatch(template.send(async_client, pageview_params, session_params, *misc_parameters))
+            except Exception as e:
+                log.exception(e)
+
+            return response
+
+        return event_wrapper
+    return event_decorator
+
+
+async_client = get_async_client()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Verification of signed cookies with caching. Visitors send the same signed cookie values with each request, so the
+result of verifying a value is kept in a bounded process-wide cache, along with its signing time for checking the
+maximum age. Results are also memoized on each request.
+"""
+from __future__ import unicode_literals, absolute_import
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from django.core import signing
+
+from .settings import SERVER_SIDE_TRACKING as SST_SETTINGS
+
+_REQUEST_ATTRIBUTE = '_sst_signed_cookies'
+_INVALID = (None, None)
+
+_cache = OrderedDict()
+_lock = Lock()
+
+
+def _unsign(name, signed_value):
+    # Same as TimestampSigner.unsign, but keeping the timestamp, so that the age can be checked again later.
+    signer = signing.get_cookie_signer(salt=name + SST_SETTINGS['cookie_salt'])
+    if not isinstance(signer, signing.TimestampSigner):
+        return None
+    try:
+        result = super(signing.TimestampSigner, signer).unsign(signed_value)
+        value, timestamp = result.rsplit(signer.sep, 1)
+        return value, signing.b62_decode(timestamp)
+    except (signing.BadSignature, ValueError):
+        return _INVALID
+
+
+def _verify(request, name, signed_value, max_age):
+    key = (name, signed_value)
+    with _lock:
+        result = _cache.pop(key, None)
+        if result is not None:
+            # Moves the entry to the end, as the most recently used.
+            _cache[key] = result
+    if result is None:
+        result = _unsign(name, signed_value)
+        if result is None:
+            # Other signing backends are not supported by the cache.
+            return request.get_signed_cookie(name, default=None, salt=SST_SETTINGS['cookie_salt'], max_age=max_age)
+        with _lock:
+            _cache[key] = result
+            while len(_cache) > SST_SETTINGS['cookie_cache_size']:
+                _cache.popitem(last=False)
+    value, timestamp = result
+    if value is None or (max_age is not None and time.time() - timestamp > max_age):
+        return None
+    return value
+
+
+def get_signed_cookie(request, name, max_age=None):
+    """
+    Returns the value of a cookie signed with ``cookie_salt``, like ``request.get_signed_cookie``. The signature of
+    each distinct value is only verified once, as long as it is in the cache; the maximum age is checked on every call.
+
+    :param request: Request.
+    :type request: django.http.HttpRequest
+    :param name: Cookie name.
+    :type name: unicode | str
+    :param max_age: Maximum age of the signature in seconds.
+    :type max_age: int
+    :return: Cookie value, or ``None`` if the cookie is not set, has an invalid signature, or is expired.
+    :rtype: unicode | str
+    """
+    memo = getattr(request, _REQUEST_ATTRIBUTE, None)
+    if memo is None:
+        memo = {}
+        setattr(request, _REQUEST_ATTRIBUTE, memo)
+    key = (name, max_age)
+    try:
+        return memo[key]
+    except KeyError:
+        pass
+    signed_value = request.COOKIES.get(name)
+    value = _verify(request, name, signed_value, max_age) if signed_value is not None else None
+    memo[key] = value
+    return value
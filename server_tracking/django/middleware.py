@@ -3,48 +3,83 @@ from __future__ import unicode_literals
 
 import logging
 
+from ..google.sampling import client_bucket
+from ..matching import PathMatcher
 from .settings import SERVER_SIDE_TRACKING as SST_SETTINGS
-from .utils import has_own_cookie, process_pageview, process_exception
+from .utils import (has_own_cookie, is_ajax, process_pageview, process_exception, get_client_id,
+                    call_after_response)
 
 
 log = logging.getLogger(__name__)
 
+_path_matcher = None
+
+
+def get_path_matcher():
+    """
+    Returns the matcher for ``pageview_exclude`` and ``pageview_include``, compiled on first use.
+
+    :rtype: server_tracking.matching.PathMatcher
+    """
+    global _path_matcher
+    if _path_matcher is None:
+        _path_matcher = PathMatcher(SST_SETTINGS['pageview_exclude'], SST_SETTINGS['pageview_include'])
+    return _path_matcher
+
 
 class PageViewMiddleware(object):
     def __init__(self, get_response=None):
         self.get_response = get_response
-        self.exclude = SST_SETTINGS['pageview_exclude']
+        self.path_matcher = get_path_matcher()
         self.track_not_available = SST_SETTINGS['pageview_na_exceptions']
         self.track_exceptions = SST_SETTINGS['pageview_server_exceptions']
         self.track_ajax_responses = SST_SETTINGS['pageview_ajax_responses']
         self.track_ajax_exceptions = SST_SETTINGS['pageview_ajax_exceptions']
+        self.after_response = SST_SETTINGS['pageview_after_response']
 
     def __call__(self, request):
         response = self.get_response(request)
         return self.process_response(request, response)
 
+    def _track(self, func, request, response, client_id=None, **kwargs):
+        try:
+            if self.after_response:
+                # Only the client id cookie has to be set before the response is returned. Everything else happens
+                # after it has been sent.
+                if client_id is None:
+                    client_id = get_client_id(request, response)
+                call_after_response(response, func, request, response, client_id=client_id, **kwargs)
+            else:
+                func(request, response, client_id=client_id, **kwargs)
+        except Exception as e:
+            log.exception(e)
+
+    def _track_sampled(self, func, request, response, rate, **kwargs):
+        # Sampled by client id, so that a visitor is tracked on either all or none of the paths with the same rate.
+        try:
+            client_id = get_client_id(request, response)
+        except Exception as e:
+            log.exception(e)
+            return
+        if client_bucket(client_id) < rate:
+            self._track(func, request, response, client_id=client_id, **kwargs)
+
     def process_response(self, request, response):
         if has_own_cookie(request):
             return response
         status_code = response.status_code
         if 200 <= status_code < 300:
-            if self.track_ajax_responses or not request.is_ajax():
-                path = request.path_info.lstrip('/')
-                if not any(path.startswith(exclude) for exclude in self.exclude):
-                    try:
-                        process_pageview(request, response)
-                    except Exception as e:
-                        log.exception(e)
+            if self.track_ajax_responses or not is_ajax(request):
+                rate = self.path_matcher.get_rate(request.path_info.lstrip('/'))
+                if rate is None or rate >= 1:
+                    self._track(process_pageview, request, response)
+                elif rate > 0:
+                    self._track_sampled(process_pageview, request, response, rate)
         elif status_code == 404:
-            if self.track_not_available and (self.track_ajax_exceptions or not request.is_ajax()):
-                try:
-                    process_exception(request, response, description=response.reason_phrase, fatal=0)
-                except Exception as e:
-                    log.exception(e)
+            if self.track_not_available and (self.track_ajax_exceptions or not is_ajax(request)):
+                self._track(process_exception, request, response, description=response.reason_phrase, fatal=0)
         elif status_code >= 400:
-            if self.track_exceptions and (self.track_ajax_exceptions or not request.is_ajax()):
-                try:
-                    process_exception(request, response, description=response.reason_phrase or status_code, fatal=1)
-                except Exception as e:
-                    log.exception(e)
+            if self.track_exceptions and (self.track_ajax_exceptions or not is_ajax(request)):
+                self._track(process_exception, request, response, description=response.reason_phrase or status_code,
+                            fatal=1)
         return response
@@ -6,11 +6,16 @@ from uuid import uuid4
 
 from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpRequest
-from django.utils.six import text_type
+from django.template.response import SimpleTemplateResponse
+from six import text_type
 
+from .cookies import get_signed_cookie
 from .settings import SERVER_SIDE_TRACKING as SST_SETTINGS, SERVER_SIDE_TRACKING_GA as GA_SETTINGS
+from .. import lifecycle
 from ..google.client import AnalyticsClient
+from ..google.dedup import HitDeduplicator
 from ..google.parameters import GeneralParameters, SessionParameters, PageViewParameters
+from ..google.sampling import HitSampler
 from ..google.sender import get_send_function
 from ..utils import class_from_name, anonymize_ip_address
 
@@ -18,17 +23,44 @@ from ..utils import class_from_name, anonymize_ip_address
 log = logging.getLogger(__name__)
 
 
+TITLE_RESOLVER_CACHE_SIZE = 256
+
+
 class ContextTitleExtractor(object):
+    """
+    Uses the variable ``title`` from the template context.
+    """
+    response_types = (SimpleTemplateResponse, )
+
     def get_title(self, response):
         """
         :param response:
         :type response: django.http.response.HttpResponse
         :return:
         """
-        return response.context_data.get('title')
+        context = response.context_data
+        if context:
+            return context.get('title')
+        return None
 
 
 class ViewTitleExtractor(object):
+    """
+    Uses the attribute ``title`` of the view in the template context. It must be defined on the view class.
+    """
+    response_types = (SimpleTemplateResponse, )
+
+    def applies_to(self, response_class, view_class):
+        """
+        :param response_class: Class of the response.
+        :type response_class: type
+        :param view_class: Class of the view in the template context, or ``None``.
+        :type view_class: type
+        :return: Whether the extractor can return a title for responses of this kind.
+        :rtype: bool
+        """
+        return view_class is not None and hasattr(view_class, 'title')
+
     def get_title(self, response):
         """
 
@@ -131,10 +163,49 @@ def set_own_cookie(response):
                                httponly=SST_SETTINGS['cookie_httponly'])
 
 
+def is_ajax(request):
+    """
+    Same as ``request.is_ajax()``, which has been removed in Django 4.0.
+
+    :type request: django.http.HttpRequest
+    :rtype: bool
+    """
+    return request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
+
+
 def has_own_cookie(request):
-    cookie_value = request.get_signed_cookie(SST_SETTINGS['own_cookie_name'], default=None,
-                                             salt=SST_SETTINGS['cookie_salt'])
-    return cookie_value == '1'
+    return get_signed_cookie(request, SST_SETTINGS['own_cookie_name']) == '1'
+
+
+def get_general_parameters(default_parameters=None, **kwargs):
+    if default_parameters:
+        default_params = GeneralParameters(default_parameters)
+        if not default_params.tracking_id:
+            default_params.tracking_id = GA_SETTINGS['property']
+        default_params.update(kwargs)
+    else:
+        default_params = GeneralParameters(tracking_id=GA_SETTINGS['property'], **kwargs)
+    return default_params
+
+
+def get_sampler():
+    if (SST_SETTINGS['sample_rates'] or SST_SETTINGS['sample_rate_default'] < 1 or
+            SST_SETTINGS['sample_rate_categories'] or SST_SETTINGS['sample_rate_paths']):
+        return HitSampler(SST_SETTINGS['sample_rates'],
+                          default_rate=SST_SETTINGS['sample_rate_default'],
+                          category_rates=SST_SETTINGS['sample_rate_categories'],
+                          path_rates=SST_SETTINGS['sample_rate_paths'],
+                          dimension=SST_SETTINGS['sample_rate_dimension'])
+    return None
+
+
+def get_deduplicator():
+    if SST_SETTINGS['dedup_window']:
+        deduplicator = HitDeduplicator(SST_SETTINGS['dedup_window'], max_size=SST_SETTINGS['dedup_max_size'],
+                                       keys=SST_SETTINGS['dedup_keys'])
+        lifecycle.register(deduplicator)
+        return deduplicator
+    return None
 
 
 def get_client(default_parameters=None, **kwargs):
@@ -145,50 +216,159 @@ def get_client(default_parameters=None, **kwargs):
     :return: Configured client.
     :rtype: server_tracking.google.client.AnalyticsClient
     """
-    if default_parameters:
-        default_params = GeneralParameters(default_parameters)
-        if not default_params.tracking_id:
-            default_params.tracking_id = GA_SETTINGS['property']
-        default_params.update(kwargs)
-    else:
-        default_params = GeneralParameters(tracking_id=GA_SETTINGS['property'], **kwargs)
+    default_params = get_general_parameters(default_parameters, **kwargs)
     send_function = get_send_function(SST_SETTINGS['defer'],
                                       ssl=GA_SETTINGS['ssl'],
                                       debug=SST_SETTINGS['debug'],
                                       default_method=SST_SETTINGS['send_method'],
                                       post_fallback=SST_SETTINGS['post_fallback'],
-                                      timeout=SST_SETTINGS['timeout'])
-    return AnalyticsClient(send_function, default_params)
+                                      split_hits=SST_SETTINGS['split_hits'],
+                                      timeout=SST_SETTINGS['timeout'],
+                                      batch_max_hits=SST_SETTINGS['batch_max_hits'],
+                                      batch_max_bytes=SST_SETTINGS['batch_max_bytes'],
+                                      batch_max_linger=SST_SETTINGS['batch_max_linger'],
+                                      thread_pool_size=SST_SETTINGS['thread_pool_size'],
+                                      thread_queue_size=SST_SETTINGS['thread_queue_size'],
+                                      thread_queue_overflow=SST_SETTINGS['thread_queue_overflow'],
+                                      pool_connections=SST_SETTINGS['pool_connections'],
+                                      pool_maxsize=SST_SETTINGS['pool_maxsize'],
+                                      pool_block=SST_SETTINGS['pool_block'],
+                                      pool_prewarm=SST_SETTINGS['pool_prewarm'],
+                                      keep_alive=SST_SETTINGS['keep_alive'],
+                                      session_per_thread=SST_SETTINGS['session_per_thread'],
+                                      spool_path=SST_SETTINGS['spool_path'],
+                                      spool_segment_size=SST_SETTINGS['spool_segment_size'],
+                                      spool_max_segments=SST_SETTINGS['spool_max_segments'],
+                                      spool_replay_rate=SST_SETTINGS['spool_replay_rate'],
+                                      retry_max=SST_SETTINGS['retry_max'],
+                                      retry_backoff=SST_SETTINGS['retry_backoff'],
+                                      retry_backoff_max=SST_SETTINGS['retry_backoff_max'],
+                                      retry_jitter=SST_SETTINGS['retry_jitter'],
+                                      breaker_threshold=SST_SETTINGS['breaker_threshold'],
+                                      breaker_cooldown=SST_SETTINGS['breaker_cooldown'],
+                                      send_fallback=SST_SETTINGS['send_fallback'],
+                                      fallback_queue_size=SST_SETTINGS['fallback_queue_size'],
+                                      sidecar_socket=SST_SETTINGS['sidecar_socket'],
+                                      shutdown_timeout=SST_SETTINGS['shutdown_timeout'],
+                                      shutdown_on_sigterm=SST_SETTINGS['shutdown_on_sigterm'])
+    return AnalyticsClient(send_function, default_params, sampler=get_sampler(), encode_hits=True,
+                           deduplicator=get_deduplicator())
+
+
+def _applies_to(extractor, response_class, view_class):
+    response_types = getattr(extractor, 'response_types', None)
+    if response_types is not None and not issubclass(response_class, response_types):
+        return False
+    applies_to = getattr(extractor, 'applies_to', None)
+    return applies_to is None or applies_to(response_class, view_class)
+
+
+def _resolve_title_extractors(key):
+    extractors = [ex for ex in title_extractors if _applies_to(ex, *key)]
+    if len(_title_resolvers) >= TITLE_RESOLVER_CACHE_SIZE:
+        _title_resolvers.clear()
+    _title_resolvers[key] = extractors
+    return extractors
 
 
 def get_title(response):
-    for ex in title_extractors:
+    """
+    Returns the title of a page from the first of the configured extractors that finds one. Which extractors apply is
+    determined once per combination of response class and view class, and kept in a bounded cache. Extractors can
+    limit the responses they are used for by a class attribute ``response_types`` and a method
+    ``applies_to(response_class, view_class)``.
+
+    :param response: Response.
+    :type response: django.http.response.HttpResponse
+    :return: Page title, or ``None``.
+    :rtype: unicode | str
+    """
+    context = getattr(response, 'context_data', None)
+    view = context.get('view') if context else None
+    key = (response.__class__, view.__class__ if view is not None else None)
+    extractors = _title_resolvers.get(key)
+    if extractors is None:
+        extractors = _resolve_title_extractors(key)
+    for ex in extractors:
         try:
             title = ex.get_title(response)
         except AttributeError:
             continue
-        else:
-            if title is not None:
-                return title
+        if title is not None:
+            return title
     return None
 
 
-def get_default_parameters(request, response, on_page=True, pageview_parameters=None, session_parameters=None):
-    cid = request.get_signed_cookie(SST_SETTINGS['cookie_name'], default=None,
-                                    salt=SST_SETTINGS['cookie_salt'],
-                                    max_age=SST_SETTINGS['cookie_max_age'])
+def get_client_id(request, response):
+    """
+    Returns the client id from the signed cookie, or generates a new one. Where the id is new or the visitor has
+    changed their consent, the cookies are updated on the response.
+
+    :type request: django.http.HttpRequest
+    :type response: django.http.HttpResponse
+    :return: Client id.
+    :rtype: unicode | str
+    """
+    cid = get_signed_cookie(request, SST_SETTINGS['cookie_name'], max_age=SST_SETTINGS['cookie_max_age'])
     if cid is None:
         cid = text_type(uuid4())
         updated_cid = True
     else:
         updated_cid = False
     c_consent_action = request.COOKIES.get(SST_SETTINGS['cookie_action'])
-    if response:
-        title = get_title(response) if on_page else None
-        if updated_cid or c_consent_action:
-            cid = set_client_id(request, response, cid, c_consent_action)
+    if response and (updated_cid or c_consent_action):
+        cid = set_client_id(request, response, cid, c_consent_action)
+    return cid
+
+
+class _DeferredCall(object):
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def close(self):
+        # Errors must not keep the response from closing its other resources.
+        try:
+            self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            log.exception(e)
+
+    __call__ = close
+
+
+def call_after_response(response, func, *args, **kwargs):
+    """
+    Calls ``func`` when the server closes ``response``, i.e. after its content has been sent to the client. If the
+    response does not support this, ``func`` is called immediately. Exceptions are logged.
+
+    :type response: django.http.HttpResponse
+    :param func: Function to call.
+    :type func: callable
+    :return: ``True`` if the call has been deferred.
+    :rtype: bool
+    """
+    deferred = _DeferredCall(func, args, kwargs)
+    closers = getattr(response, '_resource_closers', None)
+    if closers is not None:
+        closers.append(deferred)
+        return True
+    closable_objects = getattr(response, '_closable_objects', None)
+    if closable_objects is not None:
+        # Django before 3.0.
+        closable_objects.append(deferred)
+        return True
+    deferred()
+    return False
+
+
+def get_default_parameters(request, response, on_page=True, pageview_parameters=None, session_parameters=None,
+                           client_id=None):
+    if client_id is None:
+        cid = get_client_id(request, response)
     else:
-        title = None
+        cid = client_id
+    title = get_title(response) if response and on_page else None
     session_params = SessionParameters(extract_parameters(request, SST_SETTINGS['anonymize_ip'], on_page))
     if on_page:
         host_name = request.get_host().partition(':')[0]
@@ -201,36 +381,46 @@ def get_default_parameters(request, response, on_page=True, pageview_parameters=
     return pageview_params, session_params
 
 
-def process_pageview(request, response, pageview_parameters=None, session_parameters=None):
+def process_pageview(request, response, pageview_parameters=None, session_parameters=None, client_id=None):
     pageview_params, session_params = get_default_parameters(request, response,
                                                              pageview_parameters=pageview_parameters,
-                                                             session_parameters=session_parameters)
+                                                             session_parameters=session_parameters,
+                                                             client_id=client_id)
     return default_client.pageview(pageview_params, session_params=session_params)
 
 
-def process_ping(request, response, pageview_parameters=None, session_parameters=None):
+def get_ping_parameters(request, response, pageview_parameters=None, session_parameters=None, client_id=None):
     meta = request.META
     referrer = meta.get('HTTP_REFERER')
     if not referrer:
         # Discard on direct access to view.
-        return
+        return None
     page = PageViewParameters(pageview_parameters, location_url=referrer)
-    pageview_params, session_params = get_default_parameters(request, response, on_page=False,
-                                                             pageview_parameters=page,
-                                                             session_parameters=session_parameters)
+    return get_default_parameters(request, response, on_page=False, pageview_parameters=page,
+                                  session_parameters=session_parameters, client_id=client_id)
+
+
+def process_ping(request, response, pageview_parameters=None, session_parameters=None, client_id=None):
+    params = get_ping_parameters(request, response, pageview_parameters=pageview_parameters,
+                                 session_parameters=session_parameters, client_id=client_id)
+    if params is None:
+        return
+    pageview_params, session_params = params
     return default_client.event(GA_SETTINGS['ping_category'], GA_SETTINGS['ping_action'],
                                 label=GA_SETTINGS['ping_label'], non_interaction_hit=1, page_params=pageview_params,
                                 session_params=session_params)
 
 
 def process_exception(request, response, description=None, fatal=None, pageview_parameters=None,
-                      session_parameters=None):
+                      session_parameters=None, client_id=None):
     pageview_params, session_params = get_default_parameters(request, response,
                                                              pageview_parameters=pageview_parameters,
-                                                             session_parameters=session_parameters)
+                                                             session_parameters=session_parameters,
+                                                             client_id=client_id)
     return default_client.exception(description=description, fatal=fatal, page_params=pageview_params,
                                     misc_params=(session_params,))
 
 
 default_client = get_client()
 title_extractors = get_title_extractors()
+_title_resolvers = {}
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import re
+
+import six
+from six.moves.urllib.parse import quote_plus
+
+
+SAFE_PATTERN = re.compile(r'[A-Za-z0-9_.\-]*\Z')
+
+_KEY_CACHE = {}
+_KEY_CACHE_SIZE = 4096
+_VALUE_CACHE = {}
+_VALUE_CACHE_SIZE = 4096
+_VALUE_CACHE_LENGTH = 512
+
+
+if six.PY2:
+    def _to_str(value):
+        if isinstance(value, six.text_type):
+            return value.encode('utf-8')
+        return str(value)
+
+    def _quote(value):
+        return quote_plus(_to_str(value)).decode('ascii')
+else:
+    def _quote(value):
+        if isinstance(value, str):
+            return quote_plus(value)
+        return quote_plus(str(value))
+
+
+def encode_key(key):
+    """
+    Percent-encodes a parameter name. Results are cached, as the set of parameter names is usually small.
+
+    :param key: Parameter name.
+    :type key: unicode | str
+    :return: Encoded parameter name.
+    :rtype: unicode | str
+    """
+    try:
+        return _KEY_CACHE[key]
+    except KeyError:
+        encoded = _quote(key)
+        if len(_KEY_CACHE) < _KEY_CACHE_SIZE:
+            _KEY_CACHE[key] = encoded
+        return encoded
+
+
+def encode_value(value):
+    """
+    Percent-encodes a parameter value for ``application/x-www-form-urlencoded`` content. Strings that recur often
+    in hits, such as user agents and host names, are cached up to a limited number.
+
+    :param value: Parameter value. Other types than strings are converted to strings first.
+    :return: Encoded value.
+    :rtype: unicode | str
+    """
+    if not isinstance(value, six.string_types):
+        return _quote(value)
+    if SAFE_PATTERN.match(value):
+        return value
+    try:
+        return _VALUE_CACHE[value]
+    except KeyError:
+        pass
+    encoded = _quote(value)
+    if len(value) <= _VALUE_CACHE_LENGTH:
+        if len(_VALUE_CACHE) >= _VALUE_CACHE_SIZE:
+            _VALUE_CACHE.clear()
+        _VALUE_CACHE[value] = encoded
+    return encoded
+
+
+def encode_params(params):
+    """
+    Encodes a dictionary of parameters in the same way as ``requests`` does for query strings and form data. Items
+    with a value of ``None`` are omitted.
+
+    :param params: Parameters.
+    :type params: dict
+    :return: URL-encoded parameters.
+    :rtype: unicode | str
+    """
+    return '&'.join(['{0}={1}'.format(encode_key(k), encode_value(v))
+                     for k, v in six.iteritems(params)
+                     if v is not None])
+
+
+def encode_payload(request_params):
+    """
+    Returns the URL-encoded form of a hit. Input that has already been encoded is returned unchanged.
+
+    :param request_params: Parameters, or an encoded payload.
+    :type request_params: dict | unicode | str | bytes
+    :return: URL-encoded payload.
+    :rtype: unicode | str
+    """
+    if isinstance(request_params, dict):
+        return encode_params(request_params)
+    if isinstance(request_params, six.binary_type):
+        return request_params.decode('ascii')
+    return request_params
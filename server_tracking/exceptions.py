@@ -21,4 +21,4 @@ class InvalidParametersException(Exception):
 @six.python_2_unicode_compatible
 class SenderException(Exception):
     def __str__(self):
-        return ' '.join(self.args) if self.args else ''
+        return ' '.join(six.text_type(arg) for arg in self.args)
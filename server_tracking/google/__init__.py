@@ -4,10 +4,14 @@ from __future__ import unicode_literals
 HTTP_URL = 'http://www.google-analytics.com'
 SSL_URL = 'https://www.google-analytics.com'
 COLLECT_PATH = '/collect'
+BATCH_PATH = '/batch'
 DEBUG_PATH = '/debug'
 
 GET_SIZE_LIMIT = 2000
 POST_SIZE_LIMIT = 8000
+BATCH_HIT_LIMIT = 20
+BATCH_SIZE_LIMIT = 16000
+QUEUE_TIME_LIMIT = 14400
 
 HIT_TYPE_PAGEVIEW = 'pageview'
 HIT_TYPE_SCREENVIEW = 'screenview'
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio-based client and sender. Requires Python 3 and ``aiohttp``.
+"""
+from __future__ import unicode_literals
+
+import asyncio
+import copy
+import logging
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:
+    aiohttp = None
+    URL = None
+
+from ..encoding import encode_payload
+from ..exceptions import SenderException
+from . import COLLECT_PATH, DEBUG_PATH, HTTP_URL, SSL_URL, GET_SIZE_LIMIT, POST_SIZE_LIMIT
+from .client import AnalyticsClient, BulkResult, BULK_METHODS
+from .debug import HitParserResults
+from .splitting import split_payload
+
+
+log = logging.getLogger(__name__)
+
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class AsyncAnalyticsSender(object):
+    """
+    Sends predefined data to Google Analytics without blocking the event loop, either through a ``GET`` or a
+    ``POST``. All hits share the connection pool of one ``aiohttp`` session, which is created with the first hit.
+
+    :param session: Session object. If not provided, one is created from the remaining arguments.
+    :type session: aiohttp.ClientSession
+    :param ssl: Use the HTTPS base URL.
+    :type ssl: bool
+    :param debug: Only debug hits. They are returned with debug information but not processed by GA.
+    :type debug: bool
+    :param default_method: Default method to use for sending. Default is ``GET``.
+    :type default_method: unicode | str
+    :param post_fallback: If the request size is over 2000 bytes, automatically make a ``POST`` request instead of
+     ``GET``.
+    :type post_fallback: bool
+    :param timeout: Timeout for sending a request, in seconds. Can also be a tuple for specifying connect and read
+     timeout separately.
+    :type timeout: int | (int, int)
+    :param pool_maxsize: Maximum number of simultaneous connections.
+    :type pool_maxsize: int
+    :param keep_alive: Reuse connections for further requests.
+    :type keep_alive: bool
+    :param split_hits: Split hits that exceed the size limit of a ``POST`` request into several hits, by distributing
+     their Enhanced E-Commerce products and impressions. See :func:`server_tracking.google.splitting.split_payload`.
+    :type split_hits: bool
+    """
+    def __init__(self, session=None, ssl=True, debug=False, default_method='GET', post_fallback=True, timeout=10,
+                 pool_maxsize=100, keep_alive=True, split_hits=True):
+        if aiohttp is None:
+            raise ValueError("aiohttp is not available.")
+        self._debug = debug
+        root_url = SSL_URL if ssl else HTTP_URL
+        if debug:
+            self._base_url = '{0}{1}{2}'.format(root_url, DEBUG_PATH, COLLECT_PATH)
+        else:
+            self._base_url = '{0}{1}'.format(root_url, COLLECT_PATH)
+        self._root_url_len = len(root_url)
+        self._session = session
+        if isinstance(timeout, tuple):
+            self._timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        else:
+            self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._pool_maxsize = pool_maxsize
+        self._keep_alive = keep_alive
+        self.send = getattr(self, default_method.lower())
+        self._post_fallback = post_fallback
+        self._split_hits = split_hits
+
+    async def _process_response(self, response):
+        if self._debug:
+            results = HitParserResults.from_dict(await response.json(content_type=None))
+            results.log_all()
+        else:
+            await response.read()
+        return response
+
+    async def get(self, request_params):
+        """
+        Sends a hit to GA via a GET-request.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :return: A response object.
+        :rtype: aiohttp.ClientResponse
+        """
+        payload = encode_payload(request_params)
+        url = '{0}?{1}'.format(self._base_url, payload)
+        if len(url) - self._root_url_len > GET_SIZE_LIMIT:
+            if self._post_fallback:
+                return await self.post(payload)
+            raise SenderException("Request is too large for GET method and POST fallback is deactivated:",
+                                  len(url))
+        async with self.session.get(URL(url, encoded=True), timeout=self._timeout) as response:
+            return await self._process_response(response)
+
+    async def post(self, request_data):
+        """
+        Sends a hit to GA via a POST-request.
+
+        :param request_data: POST payload.
+        :type request_data: dict | unicode | str
+        :return: A response object.
+        :rtype: aiohttp.ClientResponse
+        """
+        payload = encode_payload(request_data)
+        if len(payload) > POST_SIZE_LIMIT:
+            if self._split_hits:
+                return await self._post_parts(payload)
+            raise SenderException("Request is too large for POST method:", len(payload))
+        body = payload.encode('ascii')
+        async with self.session.post(self._base_url, data=body, headers=FORM_HEADERS,
+                                     timeout=self._timeout) as response:
+            return await self._process_response(response)
+
+    async def _post_parts(self, payload):
+        # Sent one after another, so that the first part, which carries the transaction, arrives first.
+        responses = [await self.post(part) for part in split_payload(payload)]
+        for response in responses:
+            if response is not None and response.status >= 400:
+                return response
+        return responses[-1]
+
+    async def send(self, request_params):
+        """
+        Assigned to default method as set during instantiation.
+        """
+        pass
+
+    async def close(self):
+        """
+        Closes the session and all of its connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._pool_maxsize, force_close=not self._keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+
+class AsyncAnalyticsClient(AnalyticsClient):
+    """
+    Client implementation that uses the Google Analytics Measurement Protocol from asyncio code. Accepts the same
+    arguments as :class:`server_tracking.google.client.AnalyticsClient`, but ``send_func`` has to be a coroutine
+    function, e.g. :meth:`AsyncAnalyticsSender.send`. All methods that send hits return awaitables.
+    """
+    async def request(self, hit_type, *params, **kwargs):
+        """
+        Sends a request to Google Analytics.
+
+        :param hit_type: Hit type.
+        :type hit_type: unicode | str
+        :param params: UrlGenerator objects to provide parameters.
+        :type params: Tuple[server_tracking.parameters.UrlGenerator]
+        :param kwargs: Raw url parameters to update the generated url with.
+        :return: ``True``, unless the response has an error status code.
+        :rtype: bool
+        """
+        request_params = self.build_hit(hit_type, *params, **kwargs)
+        if request_params is None or self._is_duplicate(request_params):
+            return True
+        response = await self._send_func(request_params)
+        if response:
+            return response.status <= 400
+        return True
+
+    async def transaction(self, transaction_id, items, affiliation=None, revenue='sum', shipping=None, tax=None,
+                          currency_code=None, page_params=None, misc_params=(), **kwargs):
+        """
+        Sends an E-Commerce transaction and items. All hits are sent concurrently. For a description of the
+        arguments, see :meth:`server_tracking.google.client.AnalyticsClient.transaction`.
+
+        :return: Returns ``True`` when all generated hits got sent.
+        :rtype: bool
+        """
+        transaction, page, item_params = self._get_transaction_parameters(transaction_id, items, affiliation, revenue,
+                                                                          shipping, tax, currency_code, page_params,
+                                                                          **kwargs)
+        hits = [hit for hit in self._build_transaction_hits(transaction, page, item_params, misc_params)
+                if not self._is_duplicate(hit)]
+        responses = await asyncio.gather(*[self._send_func(hit) for hit in hits])
+        return all(response.status <= 400 for response in responses if response)
+
+    async def send_many(self, hits, concurrency=4, queue_size=100, send_func=None, on_progress=None,
+                        progress_interval=1000, on_error=None):
+        """
+        Sends a large number of hits, e.g. from a generator. Hits are generated one by one, and sent from
+        ``concurrency`` tasks. For a description of the arguments, see
+        :meth:`server_tracking.google.client.AnalyticsClient.send_many`; ``send_func`` has to be a coroutine function.
+
+        :return: Number of processed specifications, and the number of hits sent, failed, and excluded by the
+         sampler.
+        :rtype: server_tracking.google.client.BulkResult
+        """
+        send_func = send_func or self._send_func
+        counts = {'processed': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+
+        def _report(spec, error):
+            log.debug("Failed to send hit %r: %s", spec, error)
+            if on_error is not None:
+                on_error(spec, error)
+
+        def _count(key):
+            counts[key] += 1
+            if key == 'processed' and on_progress and not counts['processed'] % progress_interval:
+                on_progress(BulkResult(**counts))
+
+        async def _send(item):
+            spec, hit = item
+            try:
+                response = await send_func(hit)
+            except Exception as e:
+                _count('failed')
+                _report(spec, e)
+                return
+            if response is not None and getattr(response, 'status', 200) > 400:
+                _count('failed')
+                _report(spec, ValueError("Response status {0}.".format(response.status)))
+            else:
+                _count('sent')
+
+        queue = asyncio.Queue(queue_size)
+
+        async def _work():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                await _send(item)
+
+        workers = [asyncio.ensure_future(_work()) for __ in range(concurrency)]
+        submit = queue.put if workers else _send
+        # Generates hits with the same parameters as this client, but collects them instead of sending them.
+        builder = copy.copy(self)
+        generated = []
+
+        async def _collect(hit):
+            generated.append(hit)
+
+        builder._send_func = _collect
+        try:
+            for spec in hits:
+                method, kwargs = spec
+                del generated[:]
+                try:
+                    if method not in BULK_METHODS:
+                        raise ValueError("Invalid hit method '{0}'.".format(method))
+                    await getattr(builder, method)(**kwargs)
+                except Exception as e:
+                    _count('failed')
+                    _report(spec, e)
+                else:
+                    if not generated:
+                        _count('skipped')
+                    for hit in generated:
+                        await submit((spec, hit))
+                _count('processed')
+        finally:
+            for __ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        result = BulkResult(**counts)
+        if on_progress is not None:
+            on_progress(result)
+        return result
@@ -1,10 +1,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from collections import namedtuple
+import copy
+import itertools
 import logging
+import random
+import sys
+from threading import Lock
 
+from six.moves.urllib.parse import urlparse
+
+from .. import QUEUE_OVERFLOW_BLOCK
+from ..encoding import encode_params
+from ..workers import WorkerPool
 from . import (HIT_TYPE_TRANSACTION, HIT_TYPE_TRANSACTION_ITEM, HIT_TYPE_EVENT, HIT_TYPE_SCREENVIEW, HIT_TYPE_PAGEVIEW,
                HIT_TYPE_SOCIAL, HIT_TYPE_TIMING, HIT_TYPE_EXCEPTION)
+from .templates import HitTemplate, TemplateCache, event_template
 from .parameters import (GeneralParameters, PageViewParameters, EventParameters, AppTrackingParameters,
                          EComTransactionParameters, EComItemParameters, HitParameters, SessionParameters,
                          SocialInteractionParameters, TimingParameters, ExceptionParameters)
@@ -12,6 +24,10 @@ from .parameters import (GeneralParameters, PageViewParameters, EventParameters,
 
 log = logging.getLogger(__name__)
 
+BULK_METHODS = frozenset(['pageview', 'screenview', 'event', 'transaction', 'social', 'timing', 'exception'])
+
+BulkResult = namedtuple('BulkResult', ['processed', 'sent', 'failed', 'skipped'])
+
 
 class AnalyticsClient(object):
     """
@@ -24,53 +40,205 @@ class AnalyticsClient(object):
     :param misc_parameters: Additional UrlGenerator objects to use as default parameters.
     :type misc_parameters: tuple[server_tracking.parameters.UrlGenerator] |
      list[server_tracking.parameters.UrlGenerator]
+    :param sampler: Optional sampler, that decides which hits are sent.
+    :type sampler: server_tracking.google.sampling.HitSampler
+    :param encode_hits: Pass hits to ``send_func`` as URL-encoded strings instead of dictionaries. The general and
+     miscellaneous parameters are then encoded once and reused for every hit, as long as they are not modified.
+    :type encode_hits: bool
+    :param deduplicator: Optional filter, that discards hits which have already been sent recently.
+    :type deduplicator: server_tracking.google.dedup.HitDeduplicator
     :param kwargs: Keyword arguments for general parameters.
     """
-    def __init__(self, send_func, general_parameters=None, misc_parameters=(), **kwargs):
+    def __init__(self, send_func, general_parameters=None, misc_parameters=(), sampler=None, encode_hits=False,
+                 deduplicator=None, **kwargs):
         if isinstance(general_parameters, (dict, GeneralParameters)):
             self._general_parameters = GeneralParameters(general_parameters)
         elif general_parameters is not None:
             raise ValueError("Invalid type of default parameters: {0}.", type(general_parameters).__name__)
         self._general_parameters.update(kwargs)
         self._misc_parameters = misc_parameters
-        self._misc_url = None
         self.update_misc_parameters()
         self._send_func = send_func
+        self._sampler = sampler
+        self._encode_hits = encode_hits
+        self._static = None
+        self._event_templates = TemplateCache(event_template)
+        self._deduplicator = deduplicator
 
     def update_misc_parameters(self):
         """
-        Updates the generated parameters from :attr:`AnalyticsClient.misc_parameters`. Only needs to be called
-        explicitly, if the objects have gotten modified after the assignment.
+        Validates and generates the parameters from :attr:`AnalyticsClient.misc_parameters`. Generated parameters are
+        cached by each object until it is modified, so that this does not have to be called again after changes.
         """
-        self._misc_url = misc_url = {}
         for p in self._misc_parameters:
-            misc_url.update(p.url())
+            p.cached_url()
 
-    def request(self, hit_type, *params, **kwargs):
+    def _sample(self, sampler, hit_type, params, kwargs):
+        client_id = kwargs.get('cid')
+        category = kwargs.get('ec')
+        path = kwargs.get('dp')
+        location_url = None
+        for p in itertools.chain(params, self._misc_parameters):
+            if isinstance(p, SessionParameters):
+                if client_id is None:
+                    client_id = p.client_id
+            elif isinstance(p, EventParameters):
+                if category is None:
+                    category = p.category
+            elif isinstance(p, HitTemplate):
+                if category is None:
+                    category = p.cached_url().get('ec')
+            elif isinstance(p, PageViewParameters):
+                if path is None:
+                    path = p.path
+                    location_url = p.location_url
+        if path is None and location_url:
+            path = urlparse(location_url).path
+        return sampler.sample(hit_type, client_id, category, path)
+
+    def _is_sampled_out(self, hit_type, params, kwargs):
+        sampler = self._sampler
+        if sampler is not None:
+            rate = self._sample(sampler, hit_type, params, kwargs)
+            if rate is None:
+                return True
+            if sampler.dimension:
+                kwargs[sampler.dimension] = rate
+        return False
+
+    def get_request_params(self, hit_type, *params, **kwargs):
         """
-        Sends a request to Google Analytics.
+        Generates the parameters of a hit, without sending it.
 
         :param hit_type: Hit type.
         :type hit_type: unicode | str
         :param params: UrlGenerator objects to provide parameters.
         :type params: Tuple[server_tracking.parameters.UrlGenerator]
         :param kwargs: Raw url parameters to update the generated url with.
-        :return: In normal scenarios always returns ``True``. For synchronous requests actually processes the status
-         code, but Google Analytics does not return error codes for invalid hits. In debug mode, hits are validated
-         by GA and this method returns the parsed result.
-        :rtype: bool | server_tracking.google.debug.HitParserResults
+        :return: Request parameters, or ``None`` if the hit is excluded by the sampler.
+        :rtype: dict
         """
+        if self._is_sampled_out(hit_type, params, kwargs):
+            return None
+        return self._merge_params(hit_type, params, kwargs)
+
+    def _merge_params(self, hit_type, params, kwargs):
         request_params = self._general_parameters.url(hit_type)
         for p in params:
             if p:
-                request_params.update(p.url())
-        request_params.update(self._misc_url)
+                request_params.update(p.cached_url())
+        for p in self._misc_parameters:
+            request_params.update(p.cached_url())
         request_params.update(kwargs)
+        return request_params
+
+    def _get_static(self):
+        general = self._general_parameters
+        sources = [general.cached_url()]
+        sources.extend(p.cached_url() for p in self._misc_parameters)
+        static = self._static
+        if (static is None or len(static[0]) != len(sources) or
+                any(a is not b for a, b in zip(static[0], sources))):
+            merged = {}
+            for url in sources:
+                merged.update(url)
+            self._static = static = (sources, encode_params(merged), frozenset(merged))
+        return static
+
+    def get_payload(self, hit_type, *params, **kwargs):
+        """
+        Generates the URL-encoded form of a hit, without sending it. The result is the same as encoding
+        :meth:`get_request_params`, but only parameters that vary between hits are encoded for each hit: The general
+        and miscellaneous parameters are encoded once, and reused until they are modified.
+
+        :param hit_type: Hit type.
+        :type hit_type: unicode | str
+        :param params: UrlGenerator objects to provide parameters.
+        :type params: Tuple[server_tracking.parameters.UrlGenerator]
+        :param kwargs: Raw url parameters to update the generated url with.
+        :return: URL-encoded hit, or ``None`` if the hit is excluded by the sampler.
+        :rtype: unicode | str
+        """
+        if self._is_sampled_out(hit_type, params, kwargs):
+            return None
+        return self._encode_hit(hit_type, params, kwargs)
+
+    def _encode_hit(self, hit_type, params, kwargs):
+        sources, prefix, static_keys = self._get_static()
+        hit = {'t': hit_type}
+        if self._general_parameters.use_cache_buster:
+            hit['z'] = random.randint(0, sys.maxsize)
+        templates = None
+        for p in params:
+            if p:
+                if isinstance(p, HitTemplate):
+                    if templates is None:
+                        templates = []
+                    templates.append(p)
+                else:
+                    hit.update(p.cached_url())
+        if not static_keys.isdisjoint(hit) or (kwargs and not static_keys.isdisjoint(kwargs)):
+            # Per-hit parameters override static ones, or the other way around. Merge all layers in order instead.
+            return encode_params(self._merge_params(hit_type, params, kwargs))
+        hit.update(kwargs)
+        if templates:
+            encoded = [prefix] if prefix else []
+            used_keys = static_keys.union(hit)
+            for template in templates:
+                if not used_keys.isdisjoint(template.keys):
+                    return encode_params(self._merge_params(hit_type, params, kwargs))
+                used_keys = used_keys.union(template.keys)
+                encoded.append(template.payload)
+            encoded.append(encode_params(hit))
+            return '&'.join(encoded)
+        if prefix:
+            return '{0}&{1}'.format(prefix, encode_params(hit))
+        return encode_params(hit)
+
+    def build_hit(self, hit_type, *params, **kwargs):
+        """
+        Generates a hit as passed to ``send_func``: Either as returned by :meth:`get_payload` or by
+        :meth:`get_request_params`, depending on ``encode_hits``.
+        """
+        if self._encode_hits:
+            return self.get_payload(hit_type, *params, **kwargs)
+        return self.get_request_params(hit_type, *params, **kwargs)
+
+    def _build_unsampled(self, hit_type, params, kwargs):
+        if self._encode_hits:
+            return self._encode_hit(hit_type, params, kwargs)
+        return self._merge_params(hit_type, params, kwargs)
+
+    def request(self, hit_type, *params, **kwargs):
+        """
+        Sends a request to Google Analytics.
+
+        :param hit_type: Hit type.
+        :type hit_type: unicode | str
+        :param params: UrlGenerator objects to provide parameters.
+        :type params: Tuple[server_tracking.parameters.UrlGenerator]
+        :param kwargs: Raw url parameters to update the generated url with.
+        :return: In normal scenarios always returns ``True``, also if the hit is excluded by the sampler or discarded as
+         a duplicate. For synchronous requests actually processes the status code, but Google Analytics does not
+         return error codes for invalid hits. In debug mode, hits are validated by GA and this method returns the
+         parsed result.
+        :rtype: bool | server_tracking.google.debug.HitParserResults
+        """
+        request_params = self.build_hit(hit_type, *params, **kwargs)
+        if request_params is None or self._is_duplicate(request_params):
+            return True
         response = self._send_func(request_params)
         if response:
             return response.status_code <= 400
         return True
 
+    def _is_duplicate(self, request_params):
+        deduplicator = self._deduplicator
+        if deduplicator is not None and deduplicator.is_duplicate(request_params):
+            log.debug("Discarding duplicate hit.")
+            return True
+        return False
+
     def pageview(self, params=None, location_url=None, host_name=None, path=None, session_params=None, misc_params=(),
                  **kwargs):
         """
@@ -158,10 +326,36 @@ class AnalyticsClient(object):
             page = PageViewParameters(page_params, location_url=location_url, host_name=host_name, path=path)
         else:
             page = None
-        event = EventParameters(category, action=action, label=label, value=value)
+        template = self._event_templates.get(category, action, label, value)
         session = SessionParameters(session_params)
-        hit = HitParameters(hit_params, non_interaction_hit=non_interaction_hit)
-        return self.request(HIT_TYPE_EVENT, page, event, session, hit, *misc_params, **kwargs)
+        if hit_params or non_interaction_hit is not None:
+            hit = HitParameters(hit_params, non_interaction_hit=non_interaction_hit)
+        else:
+            hit = None
+        return self.request(HIT_TYPE_EVENT, page, template, session, hit, *misc_params, **kwargs)
+
+    @staticmethod
+    def _get_transaction_parameters(transaction_id, items, affiliation, revenue, shipping, tax, currency_code,
+                                    page_params, **kwargs):
+        page = PageViewParameters(page_params) if page_params else None
+        if revenue == 'sum':
+            revenue = (shipping or 0) + (tax or 0) + sum((item.price or 0) * (item.quantity or 1) for item in items)
+        transaction = EComTransactionParameters(transaction_id=transaction_id, affiliation=affiliation, revenue=revenue,
+                                                shipping=shipping, tax=tax, **kwargs)
+        item_params = [EComItemParameters.from_item(item, transaction_id, transaction_currency=currency_code)
+                       for item in items]
+        return transaction, page, item_params
+
+    def _build_transaction_hits(self, transaction, page, item_params, misc_params):
+        # The transaction and its items are sampled as a unit, so that no items are sent without their transaction.
+        params = (transaction, page) + tuple(misc_params)
+        sample_kwargs = {}
+        if self._is_sampled_out(HIT_TYPE_TRANSACTION, params, sample_kwargs):
+            return []
+        hits = [self._build_unsampled(HIT_TYPE_TRANSACTION, params, dict(sample_kwargs))]
+        hits.extend(self._build_unsampled(HIT_TYPE_TRANSACTION_ITEM, (item, page), dict(sample_kwargs))
+                    for item in item_params)
+        return hits
 
     def transaction(self, transaction_id, items, affiliation=None, revenue='sum', shipping=None, tax=None,
                     currency_code=None, page_params=None, misc_params=(), **kwargs):
@@ -191,16 +385,36 @@ class AnalyticsClient(object):
         :return: Returns ``True`` when all generated hits got sent or deferred to a separate thread / task.
         :rtype: bool
         """
-        page = PageViewParameters(page_params) if page_params else None
-        if revenue == 'sum':
-            revenue = shipping or 0 + tax or 0 + sum((item.price or 0) * (item.quantity or 1) for item in items)
-        transaction = EComTransactionParameters(transaction_id=transaction_id, affiliation=affiliation, revenue=revenue,
-                                                shipping=shipping, tax=tax, **kwargs)
-        item_params = [EComItemParameters.from_item(item, transaction_id, transaction_currency=currency_code)
-                       for item in items]
-        tr = self.request(HIT_TYPE_TRANSACTION, transaction, page, *misc_params)
-        ti = all(self.request(HIT_TYPE_TRANSACTION_ITEM, item, page) for item in item_params) if item_params else True
-        return tr and ti
+        transaction, page, item_params = self._get_transaction_parameters(transaction_id, items, affiliation, revenue,
+                                                                          shipping, tax, currency_code, page_params,
+                                                                          **kwargs)
+        hits = self._build_transaction_hits(transaction, page, item_params, misc_params)
+        if not hits:
+            return True
+        return self.request_many(hits)
+
+    def request_many(self, hits):
+        """
+        Sends hits that belong together, e.g. a transaction and its items, as one unit. If ``send_func`` provides a
+        ``send_many`` function, as the send functions of :func:`server_tracking.google.sender.get_send_function` do,
+        all hits are passed to it at once: They are sent in ``/batch`` requests, or handed over to a worker together.
+        Otherwise they are passed to ``send_func`` one by one.
+
+        :param hits: Hits as generated by :meth:`build_hit`.
+        :type hits: list[dict | unicode | str]
+        :return: ``True``, unless any response has an error status code. All hits are sent in either case.
+        :rtype: bool
+        """
+        if self._deduplicator is not None:
+            hits = [hit for hit in hits if not self._is_duplicate(hit)]
+            if not hits:
+                return True
+        send_many = getattr(self._send_func, 'send_many', None)
+        if send_many is not None:
+            responses = send_many(hits) or ()
+        else:
+            responses = [self._send_func(hit) for hit in hits]
+        return all(response.status_code <= 400 for response in responses if response)
 
     def social(self, network, action, target, page_params=None, misc_params=(), **kwargs):
         """
@@ -268,6 +482,101 @@ class AnalyticsClient(object):
         page = PageViewParameters(page_params) if page_params else None
         return self.request(HIT_TYPE_EXCEPTION, exception, page, *misc_params, **kwargs)
 
+    def send_many(self, hits, concurrency=4, queue_size=100, send_func=None, on_progress=None, progress_interval=1000,
+                  on_error=None):
+        """
+        Sends a large number of hits, e.g. from a generator. Hits are generated and validated one by one in the
+        calling thread, and sent from ``concurrency`` threads. At most ``queue_size`` generated hits wait for sending
+        at a time, so that memory use does not depend on the number of hits.
+
+        :param hits: Hit specifications. Each is a tuple of the name of a method of this client, e.g. ``event`` or
+         ``transaction``, and a dictionary of its keyword arguments.
+        :type hits: collections.Iterable[(unicode | str, dict)]
+        :param concurrency: Number of sending threads. With ``0``, hits are sent from the calling thread.
+        :type concurrency: int
+        :param queue_size: Maximum number of hits waiting for a sending thread.
+        :type queue_size: int
+        :param send_func: Function for sending hits. Default is the function of this client.
+        :type send_func: callable
+        :param on_progress: Called with a :class:`BulkResult` every ``progress_interval`` processed specifications,
+         and when all hits have been sent. Can be called from any sending thread.
+        :type on_progress: callable
+        :param progress_interval: Number of processed specifications between calls of ``on_progress``.
+        :type progress_interval: int
+        :param on_error: Called with the specification and the exception, if a hit cannot be generated or sent.
+         Can be called from any sending thread.
+        :type on_error: callable
+        :return: Number of processed specifications, and the number of hits sent, failed, and excluded by the
+         sampler.
+        :rtype: BulkResult
+        """
+        send_func = send_func or self._send_func
+        counts = {'processed': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+        lock = Lock()
+
+        def _report(spec, error):
+            log.debug("Failed to send hit %r: %s", spec, error)
+            if on_error is not None:
+                on_error(spec, error)
+
+        def _count(key):
+            with lock:
+                counts[key] += 1
+                if key != 'processed' or not on_progress or counts['processed'] % progress_interval:
+                    return
+                result = BulkResult(**counts)
+            on_progress(result)
+
+        def _send(item):
+            spec, hit = item
+            try:
+                response = send_func(hit)
+            except Exception as e:
+                _count('failed')
+                _report(spec, e)
+                return
+            if response is not None and getattr(response, 'status_code', 200) > 400:
+                _count('failed')
+                _report(spec, ValueError("Response status {0}.".format(response.status_code)))
+            else:
+                _count('sent')
+
+        if concurrency:
+            pool = WorkerPool(_send, workers=concurrency, queue_size=queue_size, overflow=QUEUE_OVERFLOW_BLOCK,
+                              name='AnalyticsClientBulk')
+            submit = pool.submit
+        else:
+            pool = None
+            submit = _send
+        # Generates hits with the same parameters as this client, but collects them instead of sending them.
+        builder = copy.copy(self)
+        generated = []
+        builder._send_func = generated.append
+        try:
+            for spec in hits:
+                method, kwargs = spec
+                del generated[:]
+                try:
+                    if method not in BULK_METHODS:
+                        raise ValueError("Invalid hit method '{0}'.".format(method))
+                    getattr(builder, method)(**kwargs)
+                except Exception as e:
+                    _count('failed')
+                    _report(spec, e)
+                else:
+                    if not generated:
+                        _count('skipped')
+                    for hit in generated:
+                        submit((spec, hit))
+                _count('processed')
+        finally:
+            if pool is not None:
+                pool.close()
+        result = BulkResult(**counts)
+        if on_progress is not None:
+            on_progress(result)
+        return result
+
     @property
     def general_parameters(self):
         """
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Builds hits of one type in bulk from column-oriented data, e.g. lists, NumPy arrays, or the columns of a pandas
+``DataFrame``. Instead of creating parameter objects for each row, columns are mapped to URL components once, required
+fields are checked once per column, and values are percent-encoded column by column.
+"""
+from __future__ import unicode_literals
+
+import itertools
+import numbers
+import time
+
+import six
+
+from ..encoding import encode_key, encode_value
+from ..exceptions import InvalidParametersException
+from . import (HIT_TYPE_PAGEVIEW, HIT_TYPE_EVENT, HIT_TYPE_SOCIAL, HIT_TYPE_TIMING, HIT_TYPE_EXCEPTION,
+               QUEUE_TIME_LIMIT)
+from .parameters import (HitParameters, SessionParameters, PageViewParameters, EventParameters,
+                         SocialInteractionParameters, TimingParameters, ExceptionParameters)
+
+
+DEFAULT_PARAMETER_CLASSES = {
+    HIT_TYPE_PAGEVIEW: (PageViewParameters, SessionParameters, HitParameters),
+    HIT_TYPE_EVENT: (EventParameters, SessionParameters, PageViewParameters, HitParameters),
+    HIT_TYPE_SOCIAL: (SocialInteractionParameters, SessionParameters, PageViewParameters, HitParameters),
+    HIT_TYPE_TIMING: (TimingParameters, SessionParameters, PageViewParameters, HitParameters),
+    HIT_TYPE_EXCEPTION: (ExceptionParameters, SessionParameters, PageViewParameters, HitParameters),
+}
+
+CHUNK_SIZE = 1000
+_VALUE_CACHE_SIZE = 4096
+_PAGE_LOCATION_COMPONENTS = (('dl', ), ('dh', 'dp'), ('cd', ))
+
+
+def _is_constant(value):
+    return isinstance(value, (six.string_types, six.binary_type)) or not hasattr(value, '__iter__')
+
+
+def _is_nan(value):
+    # NaN stands for missing values in NumPy arrays and pandas columns. NumPy registers its floating types as Real.
+    return isinstance(value, numbers.Real) and value != value
+
+
+def _encode_column(name, prefix, values, cache, required, offset):
+    # Encodes a chunk of a column, including its key. Values that recur in the column, e.g. categories or host names,
+    # are only encoded once. Keys of the cache include the type, so that e.g. 1, 1.0, and True are kept apart.
+    encoded = []
+    append = encoded.append
+    text_type = six.text_type
+    for row, value in enumerate(values, offset):
+        if value is None or (type(value) is not text_type and _is_nan(value)):
+            if required:
+                raise InvalidParametersException("Required parameter '{0}' is missing in row {1}.",
+                                                 name, row)
+            append(None)
+            continue
+        cache_key = value if type(value) is text_type else (type(value), value)
+        item = cache.get(cache_key)
+        if item is None:
+            item = prefix + encode_value(value)
+            if len(cache) >= _VALUE_CACHE_SIZE:
+                cache.clear()
+            cache[cache_key] = item
+        append(item)
+    return encoded
+
+
+class ColumnarHitBuilder(object):
+    """
+    Generates encoded hits of one hit type from columns of values. Columns are named by the attributes of the
+    parameter classes, e.g. ``client_id`` or ``category``; for each name the first class in ``parameter_classes`` that
+    defines it is used. The general and miscellaneous parameters of ``client`` are encoded once and prepended to each
+    hit, the same way as by :meth:`~server_tracking.google.client.AnalyticsClient.get_payload`. The sampler of the
+    client is not applied.
+
+    :param client: Client to provide the general and miscellaneous parameters.
+    :type client: server_tracking.google.client.AnalyticsClient
+    :param hit_type: Hit type.
+    :type hit_type: unicode | str
+    :param parameter_classes: Parameter classes that columns are mapped to. The first class is the one of the hit type,
+     and its required fields always have to be present. Defaults to the classes used by the client for ``hit_type``.
+    :type parameter_classes: tuple[type]
+    :param chunk_size: Number of rows that are encoded at once.
+    :type chunk_size: int
+    """
+    def __init__(self, client, hit_type, parameter_classes=None, chunk_size=CHUNK_SIZE):
+        if parameter_classes is None:
+            try:
+                parameter_classes = DEFAULT_PARAMETER_CLASSES[hit_type]
+            except KeyError:
+                raise ValueError("No default parameter classes for hit type '{0}'.".format(hit_type))
+        self._client = client
+        self._hit_type = hit_type
+        self._parameter_classes = parameter_classes
+        self._chunk_size = chunk_size
+        self.expired = 0
+
+    def _resolve(self, names):
+        components = {}
+        involved = {self._parameter_classes[0]}
+        for name in names:
+            for cls in self._parameter_classes:
+                url_comp = cls.meta.name_components.get(name)
+                if url_comp is not None:
+                    components[name] = url_comp
+                    involved.add(cls)
+                    break
+            else:
+                raise ValueError("Invalid field name '{0}'.".format(name))
+        present = set(six.itervalues(components))
+        required = set()
+        for cls in involved:
+            missing = cls.meta.required_components.difference(present)
+            if missing:
+                raise InvalidParametersException("Parameters are required, but missing: {0}",
+                                                 ', '.join(cls.meta.component_parameters[m] for m in missing))
+            required.update(cls.meta.required_components)
+        if PageViewParameters in involved and not any(present.issuperset(c) for c in _PAGE_LOCATION_COMPONENTS):
+            raise InvalidParametersException("Either 'location_url' must be specified, or both 'host_name' and 'path'.")
+        return components, required
+
+    def payloads(self, columns, timestamps=None):
+        """
+        Generates one URL-encoded hit per row. Constant values, i.e. strings and scalars, are encoded once and included
+        in every hit. All other columns must have the same length. Values of ``None`` and NaN omit the parameter in
+        the respective row, unless it is required.
+
+        :param columns: Columns or constants by parameter attribute name.
+        :type columns: dict
+        :param timestamps: Optional column of the times the hits occurred, in seconds since the epoch. The queue time
+         is set accordingly when each hit is generated. Hits older than the queue time limit are skipped, and counted in
+         ``expired``.
+        :type timestamps: collections.Iterable[float]
+        :return: Iterator over URL-encoded hits, ready to be passed to a batch sender.
+        :rtype: collections.Iterator[unicode | str]
+        :raises server_tracking.exceptions.InvalidParametersException: If a required field is missing, either in a
+         column or a row.
+        """
+        components, required = self._resolve(columns)
+        sources, static_prefix, static_keys = self._client._get_static()
+        overlap = static_keys.intersection(six.itervalues(components))
+        if overlap:
+            raise ValueError("Columns override general or miscellaneous parameters: {0}".format(', '.join(overlap)))
+
+        prefix_items = [static_prefix] if static_prefix else []
+        prefix_items.append('t={0}'.format(encode_value(self._hit_type)))
+        names = []
+        iterators = []
+        for name, values in six.iteritems(columns):
+            url_comp = components[name]
+            if _is_constant(values):
+                if values is None or _is_nan(values):
+                    if url_comp in required:
+                        raise InvalidParametersException("Required parameter '{0}' is missing.", name)
+                    continue
+                prefix_items.append('{0}={1}'.format(encode_key(url_comp), encode_value(values)))
+            else:
+                names.append(name)
+                iterators.append(iter(values))
+        if not iterators and timestamps is None:
+            raise ValueError("At least one column or timestamps must be provided.")
+        prefix = '&'.join(prefix_items)
+        keys = ['{0}='.format(encode_key(components[name])) for name in names]
+        required_flags = [components[name] in required for name in names]
+        caches = [{} for _ in names]
+        if timestamps is not None:
+            iterators.append(iter(timestamps))
+        return self._generate(prefix, names, keys, required_flags, caches, iterators, timestamps is not None)
+
+    def _generate(self, prefix, names, keys, required_flags, caches, iterators, with_timestamps):
+        chunk_size = self._chunk_size
+        column_count = len(names)
+        limit = QUEUE_TIME_LIMIT * 1000
+        offset = 0
+        while True:
+            chunks = [list(itertools.islice(it, chunk_size)) for it in iterators]
+            lengths = set(len(chunk) for chunk in chunks)
+            if len(lengths) > 1:
+                raise ValueError("Columns differ in length, starting at row {0}.".format(offset + min(lengths)))
+            length = lengths.pop()
+            if not length:
+                return
+            encoded = [_encode_column(names[i], keys[i], chunks[i], caches[i], required_flags[i], offset)
+                       for i in range(column_count)]
+            if with_timestamps:
+                now = time.time()
+                queue_times = [max(0, int((now - ts) * 1000)) for ts in chunks[-1]]
+                encoded.append(['qt={0}'.format(qt) if qt <= limit else None for qt in queue_times])
+            for row in zip(*encoded):
+                if with_timestamps and row[-1] is None:
+                    self.expired += 1
+                    continue
+                yield '&'.join([prefix] + [item for item in row if item is not None])
+            offset += length
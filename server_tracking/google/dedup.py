@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from threading import Lock
+
+import six
+
+from ..resilience import monotonic
+from . import HIT_TYPE_TRANSACTION, HIT_TYPE_TRANSACTION_ITEM
+
+
+DEFAULT_KEYS = {
+    HIT_TYPE_TRANSACTION: ('ti', ),
+    HIT_TYPE_TRANSACTION_ITEM: ('ti', 'ic', 'in'),
+}
+IGNORED_PARAMETERS = frozenset(['z', 'qt'])
+_IGNORED_PREFIXES = tuple('{0}='.format(key) for key in IGNORED_PARAMETERS)
+
+
+def _get_hit_type(payload):
+    if payload.startswith('t='):
+        start = 2
+    else:
+        start = payload.find('&t=')
+        if start < 0:
+            return None
+        start += 3
+    end = payload.find('&', start)
+    return payload[start:end] if end >= 0 else payload[start:]
+
+
+def _parse_payload(payload):
+    return dict(item.split('=', 1) if '=' in item else (item, '') for item in payload.split('&'))
+
+
+class HitDeduplicator(object):
+    """
+    Detects hits that have already been sent recently, e.g. when a form is submitted twice or a request is retried.
+    Each hit is reduced to a fingerprint, that is kept for ``window`` seconds. At most ``max_size`` fingerprints are
+    kept; when exceeded, the oldest ones are discarded first.
+
+    By default, the fingerprint covers all parameters except for the cache buster ``z`` and the queue time ``qt``.
+    For hit types in ``keys``, only the given parameters, along with the hit type and tracking id, are considered; e.g.
+    a transaction is identified by its transaction id ``ti``, regardless of other parameters.
+
+    :param window: Time in seconds that a hit is considered a duplicate of an earlier one.
+    :type window: int | float
+    :param max_size: Maximum number of fingerprints to keep.
+    :type max_size: int
+    :param keys: Parameters that identify a hit, by hit type. Defaults to :data:`DEFAULT_KEYS`.
+    :type keys: dict[unicode | str, tuple[unicode | str]]
+    """
+    def __init__(self, window=60, max_size=10000, keys=None):
+        self._window = window
+        self._max_size = max_size
+        self._keys = DEFAULT_KEYS if keys is None else keys
+        self._fingerprints = OrderedDict()
+        self._lock = Lock()
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def fingerprint(self, request_params):
+        """
+        Returns the fingerprint of a hit.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :return: Fingerprint.
+        :rtype: int
+        """
+        if isinstance(request_params, dict):
+            params = request_params
+        else:
+            if isinstance(request_params, six.binary_type):
+                request_params = request_params.decode('ascii')
+            if _get_hit_type(request_params) in self._keys:
+                params = _parse_payload(request_params)
+            else:
+                # Fast path for the common case, that does not need to look up any parameter.
+                return hash(frozenset(item for item in request_params.split('&')
+                                      if not item.startswith(_IGNORED_PREFIXES)))
+        hit_type = params.get('t')
+        keys = self._keys.get(hit_type)
+        if keys:
+            values = tuple(params.get(key) for key in keys)
+            if any(value is not None for value in values):
+                return hash((hit_type, params.get('tid')) + tuple(six.text_type(value) for value in values))
+        return hash(frozenset((k, six.text_type(v)) for k, v in six.iteritems(params)
+                              if k not in IGNORED_PARAMETERS and v is not None))
+
+    def is_duplicate(self, request_params):
+        """
+        Checks whether a hit has been seen within the time window, and records it otherwise.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :return: ``True`` if the hit is a duplicate and should not be sent.
+        :rtype: bool
+        """
+        fingerprint = self.fingerprint(request_params)
+        now = monotonic()
+        fingerprints = self._fingerprints
+        with self._lock:
+            # Entries are ordered by time, so that expired ones are always at the beginning.
+            while fingerprints:
+                oldest, seen = next(iter(six.iteritems(fingerprints)))
+                if now - seen < self._window:
+                    break
+                del fingerprints[oldest]
+            if fingerprint in fingerprints:
+                self.duplicates += 1
+                return True
+            fingerprints[fingerprint] = now
+            if len(fingerprints) > self._max_size:
+                fingerprints.popitem(last=False)
+        return False
+
+    def after_fork(self):
+        """
+        Replaces the lock, which may have been held by another thread of the parent process. Fingerprints are kept.
+        """
+        self._lock = Lock()
+
+    def close(self, timeout=None):
+        """
+        Discards all fingerprints.
+        """
+        with self._lock:
+            self._fingerprints.clear()
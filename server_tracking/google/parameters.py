@@ -21,6 +21,8 @@ class CustomMetricUrlGenerator(UrlGenerator):
 
 
 class GeneralParameters(UrlGenerator):
+    __slots__ = (str('_use_cache_buster'), )
+
     # General
     protocol_version = UP('v', True)
     tracking_id = UP('tid', True)
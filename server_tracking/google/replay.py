@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import time
+from threading import Event, Thread
+
+from ..resilience import set_background_thread
+from . import QUEUE_TIME_LIMIT
+
+
+log = logging.getLogger(__name__)
+
+
+def set_queue_time(payload, queue_time):
+    """
+    Sets the queue time parameter ``qt`` of an encoded hit, replacing a previous value.
+
+    :param payload: URL-encoded hit.
+    :type payload: unicode | str
+    :param queue_time: Queue time in milliseconds.
+    :type queue_time: int
+    :return: URL-encoded hit.
+    :rtype: unicode | str
+    """
+    items = [item for item in payload.split('&') if not item.startswith('qt=')]
+    items.append('qt={0}'.format(queue_time))
+    return '&'.join(items)
+
+
+class SpoolReplayer(object):
+    """
+    Sends hits from a :class:`server_tracking.spool.HitSpool` at a limited rate in a background thread. The queue
+    time of each hit is set from the time it has been recorded. Hits that are older than GA accepts are discarded.
+
+    :param spool: Spool to read from.
+    :type spool: server_tracking.spool.HitSpool
+    :param send_func: Function for sending an encoded hit. Should raise an exception if the hit cannot be delivered.
+    :type send_func: callable
+    :param rate: Maximum number of hits to send per second.
+    :type rate: int | float
+    :param retry_interval: Time in seconds to wait before retrying after a failed hit.
+    :type retry_interval: int | float
+    :param idle_interval: Time in seconds to wait before checking an empty spool again.
+    :type idle_interval: int | float
+    :param max_age: Maximum age of a hit in seconds.
+    :type max_age: int | float
+    """
+    def __init__(self, spool, send_func, rate=10, retry_interval=30, idle_interval=5, max_age=QUEUE_TIME_LIMIT):
+        self._spool = spool
+        self._send_func = send_func
+        self._interval = 1.0 / rate
+        self._retry_interval = retry_interval
+        self._idle_interval = idle_interval
+        self._max_age = max_age
+        self._stopped = Event()
+        self._thread = None
+        self.expired = 0
+
+    def start(self):
+        """
+        Starts the background thread.
+        """
+        self._stopped.clear()
+        self._thread = thread = Thread(target=self._run, name='SpoolReplayer')
+        thread.daemon = True
+        thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread after the current hit.
+
+        :param timeout: Maximum time in seconds to wait for the thread.
+        :type timeout: int | float
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self, timeout=None):
+        """
+        Same as :meth:`stop`.
+        """
+        self.stop(timeout)
+
+    def after_fork(self):
+        """
+        Restarts the background thread in a child process, if it was running in the parent process.
+        """
+        running = self._thread is not None and not self._stopped.is_set()
+        self._stopped = Event()
+        self._thread = None
+        if running:
+            self.start()
+
+    def replay_next(self):
+        """
+        Sends the next hit from the spool.
+
+        :return: ``False`` if the spool is empty, ``True`` otherwise.
+        :rtype: bool
+        """
+        record = self._spool.peek()
+        if record is None:
+            return False
+        timestamp, payload = record
+        age = time.time() - timestamp
+        if age > self._max_age:
+            self.expired += 1
+            log.debug("Discarding spooled hit older than %s seconds.", self._max_age)
+        else:
+            self._send_func(set_queue_time(payload, int(max(age, 0) * 1000)))
+        self._spool.consume()
+        return True
+
+    def _run(self):
+        set_background_thread()
+        wait = self._stopped.wait
+        while not self._stopped.is_set():
+            try:
+                if self.replay_next():
+                    wait(self._interval)
+                else:
+                    wait(self._idle_interval)
+            except Exception as e:
+                log.warning("Failed to send spooled hit, retrying in %s seconds: %s", self._retry_interval, e)
+                wait(self._retry_interval)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import zlib
+
+import six
+
+from ..matching import PathMatcher
+
+
+BUCKET_RANGE = float(1 << 32)
+
+
+def client_bucket(client_id):
+    """
+    Maps a client id to a number between ``0`` and ``1``. The result is the same for the same client id in any
+    process, so that sampling decisions for a visitor are consistent.
+
+    :param client_id: Client id.
+    :type client_id: unicode | str | int
+    :return: Number between ``0`` (inclusive) and ``1`` (exclusive).
+    :rtype: float
+    """
+    return (zlib.crc32(six.text_type(client_id).encode('utf-8')) & 0xffffffff) / BUCKET_RANGE
+
+
+class HitSampler(object):
+    """
+    Decides whether hits are sent, based on a sample rate and the client id. A visitor is either included or excluded
+    with all hits of the same rate.
+
+    :param rates: Sample rates by hit type, between ``0`` and ``1``.
+    :type rates: dict[unicode | str, float]
+    :param default_rate: Sample rate of hit types that are not in ``rates``.
+    :type default_rate: float
+    :param category_rates: Sample rates of events by event category. Take precedence over all other rates.
+    :type category_rates: dict[unicode | str, float]
+    :param path_rates: Sample rates by URL path prefix or compiled regular expression, matched as described in
+     :class:`server_tracking.matching.PathMatcher`. Take precedence over rates by hit type.
+    :type path_rates: dict[unicode | str, float]
+    :param dimension: Index of a custom dimension, that the sample rate of each sent hit is recorded in.
+    :type dimension: int
+    """
+    def __init__(self, rates=None, default_rate=1, category_rates=None, path_rates=None, dimension=None):
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.category_rates = category_rates or {}
+        self.path_rates = path_rates or {}
+        self._path_matcher = PathMatcher(include=six.iteritems(self.path_rates))
+        self.dimension = 'cd{0}'.format(dimension) if dimension else None
+
+    def get_rate(self, hit_type, category=None, path=None):
+        """
+        Returns the sample rate that applies to a hit.
+
+        :param hit_type: Hit type.
+        :type hit_type: unicode | str
+        :param category: Event category.
+        :type category: unicode | str
+        :param path: URL path of the page.
+        :type path: unicode | str
+        :return: Sample rate.
+        :rtype: float
+        """
+        if category is not None:
+            rate = self.category_rates.get(category)
+            if rate is not None:
+                return rate
+        if path is not None and self._path_matcher:
+            rate = self._path_matcher.get_rate(path)
+            if rate is not None:
+                return rate
+        return self.rates.get(hit_type, self.default_rate)
+
+    def sample(self, hit_type, client_id, category=None, path=None):
+        """
+        Decides whether a hit is sent.
+
+        :param hit_type: Hit type.
+        :type hit_type: unicode | str
+        :param client_id: Client id.
+        :type client_id: unicode | str | int
+        :param category: Event category.
+        :type category: unicode | str
+        :param path: URL path of the page.
+        :type path: unicode | str
+        :return: The sample rate if the hit should be sent, ``None`` otherwise.
+        :rtype: float
+        """
+        rate = self.get_rate(hit_type, category, path)
+        if rate >= 1:
+            return rate
+        if rate <= 0 or client_id is None:
+            return None
+        if client_bucket(client_id) < rate:
+            return rate
+        return None
@@ -1,22 +1,98 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from collections import deque
+from functools import partial
+import logging
 import time
-from threading import Thread
+from threading import Condition, Thread, local
 
-from requests import Request, Session
+from requests import HTTPError, PreparedRequest, RequestException, Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
-from .. import DEFER_METHOD_THREADED, DEFER_METHOD_CELERY
+from .. import (DEFER_METHOD_THREADED, DEFER_METHOD_CELERY, DEFER_METHOD_BATCHED, DEFER_METHOD_SIDECAR,
+               QUEUE_OVERFLOW_DROP_NEWEST, QUEUE_OVERFLOW_DROP_OLDEST, FALLBACK_DROP, FALLBACK_SPOOL, FALLBACK_QUEUE)
+from ..encoding import encode_payload
 from ..exceptions import SenderException
-from . import COLLECT_PATH, DEBUG_PATH, HTTP_URL, SSL_URL, GET_SIZE_LIMIT, POST_SIZE_LIMIT
+from .. import lifecycle
+from ..resilience import RetryPolicy, CircuitBreaker, monotonic, is_background_thread, set_background_thread
+from ..spool import HitSpool
+from ..workers import WorkerPool
+from . import (COLLECT_PATH, BATCH_PATH, DEBUG_PATH, HTTP_URL, SSL_URL, GET_SIZE_LIMIT, POST_SIZE_LIMIT,
+               BATCH_HIT_LIMIT, BATCH_SIZE_LIMIT, QUEUE_TIME_LIMIT)
 from .debug import process_debug_response
+from .replay import SpoolReplayer, set_queue_time
+from .splitting import split_payload
+
+
+log = logging.getLogger(__name__)
+
+
+def create_session(pool_connections=1, pool_maxsize=10, pool_block=False, keep_alive=True):
+    """
+    Creates a session with a configured connection pool.
+
+    :param pool_connections: Number of connection pools to cache, i.e. one per host.
+    :type pool_connections: int
+    :param pool_maxsize: Maximum number of connections kept open per host.
+    :type pool_maxsize: int
+    :param pool_block: Wait for a free connection instead of opening one that is discarded after use, when all
+     ``pool_maxsize`` connections are busy.
+    :type pool_block: bool
+    :param keep_alive: Reuse connections for further requests. If set to ``False``, every connection is closed
+     after one request.
+    :type keep_alive: bool
+    :return: A new session.
+    :rtype: requests.sessions.Session
+    """
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+FALLBACK_METHODS = (FALLBACK_DROP, FALLBACK_SPOOL, FALLBACK_QUEUE)
+FALLBACK_RETRY_INTERVAL = 5
+FALLBACK_MIN_WAIT = 0.1
+
+
+def get_batches(payloads, max_hits=BATCH_HIT_LIMIT, max_bytes=BATCH_SIZE_LIMIT):
+    """
+    Groups encoded hits for ``/batch`` requests, keeping their order.
+
+    :param payloads: URL-encoded hits.
+    :type payloads: list[unicode | str]
+    :param max_hits: Maximum number of hits per batch.
+    :type max_hits: int
+    :param max_bytes: Maximum size of a batch payload in bytes.
+    :type max_bytes: int
+    :return: Iterator over lists of hits.
+    :rtype: collections.Iterator[list[unicode | str]]
+    """
+    batch = []
+    size = 0
+    for payload in payloads:
+        # Hits are separated by a line break.
+        if batch and (len(batch) >= max_hits or size + len(payload) + 1 > max_bytes):
+            yield batch
+            batch = []
+            size = 0
+        size += len(payload) + 1 if batch else len(payload)
+        batch.append(payload)
+    if batch:
+        yield batch
 
 
 class AnalyticsSender(object):
     """
     Sends predefined data to Google Analytics, either through a ``GET`` or a ``POST``.
 
-    :param session: Session object.
+    :param session: Session object. If not provided, one is created from ``session_factory``.
     :type session: requests.sessions.Session
     :param ssl: Use the HTTPS base URL.
     :type ssl: bool
@@ -31,69 +107,644 @@ class AnalyticsSender(object):
     :param timeout: Timeout for sending a request, in seconds. Can also be a tuple for specifying connect and read
      timeout separately.
     :type timeout: int | (int, int)
+    :param session_factory: Function for creating new sessions. Default is :func:`create_session`.
+    :type session_factory: callable
+    :param session_per_thread: Use a separate session for each thread that sends hits, instead of sharing
+     ``session`` between all threads.
+    :type session_per_thread: bool
+    :param spool: Spool for writing hits to, that cannot be sent.
+    :type spool: server_tracking.spool.HitSpool
+    :param retry: Policy for retrying failed hits. By default, hits are not retried. Retries are only made from
+     background threads, i.e. worker threads of the ``threaded`` method, the batch thread, and the fallback queue.
+     Elsewhere, hits that fail are passed to the fallback immediately.
+    :type retry: server_tracking.resilience.RetryPolicy
+    :param breaker: Circuit breaker that stops sending attempts after repeated failures.
+    :type breaker: server_tracking.resilience.CircuitBreaker
+    :param fallback: What to do with hits that cannot be sent, or are not attempted because the breaker is open:
+     ``drop`` discards them, ``spool`` writes them to the spool, and ``queue`` keeps them in memory and sends them from
+     a background thread when the breaker allows for it. By default, hits are written to the spool if one is set. If
+     not, they are discarded when a breaker is set, and exceptions are raised otherwise.
+    :type fallback: unicode | str
+    :param fallback_queue_size: Maximum number of hits kept in memory for the ``queue`` fallback. When exceeded, the
+     oldest hits are written to the spool if one is set, or discarded otherwise.
+    :type fallback_queue_size: int
+    :param split_hits: Split hits that exceed the size limit of a ``POST`` request into several hits, by distributing
+     their Enhanced E-Commerce products and impressions. See :func:`server_tracking.google.splitting.split_payload`.
+    :type split_hits: bool
     """
-    def __init__(self, session, ssl=True, debug=False, default_method='GET', post_fallback=True, timeout=10):
+    def __init__(self, session=None, ssl=True, debug=False, default_method='GET', post_fallback=True, timeout=10,
+                 session_factory=None, session_per_thread=False, spool=None, retry=None, breaker=None, fallback=None,
+                 fallback_queue_size=1000, split_hits=True):
         self._debug = debug
         self._ssl = True
-        root_url = SSL_URL if ssl else HTTP_URL
+        self._root_url = root_url = SSL_URL if ssl else HTTP_URL
         if debug:
             self._base_url = '{0}{1}{2}'.format(root_url, DEBUG_PATH, COLLECT_PATH)
-            session.hooks['response'].append(process_debug_response)
+            self._batch_url = '{0}{1}{2}'.format(root_url, DEBUG_PATH, BATCH_PATH)
         else:
             self._base_url = '{0}{1}'.format(root_url, COLLECT_PATH)
+            self._batch_url = '{0}{1}'.format(root_url, BATCH_PATH)
         self._root_url_len = len(root_url)
         self._base_url_len = len(self._base_url)
-        self._session = session
+        self._session_factory = session_factory or create_session
+        self._session_per_thread = session_per_thread
+        if session_per_thread:
+            self._local = local()
+            self._session = None
+        elif session is not None:
+            self._session = self._init_session(session)
+        else:
+            self._session = self._init_session(self._session_factory())
         self._timeout = timeout
-        self.send = getattr(self, default_method.lower())
+        self.deliver = getattr(self, default_method.lower())
         self._post_fallback = post_fallback
+        self._split_hits = split_hits
+        self._spool = spool
+        self._retry = retry
+        self._breaker = breaker
+        if fallback is None:
+            if spool is not None:
+                fallback = FALLBACK_SPOOL
+            elif breaker is not None:
+                # Otherwise, every hit would raise an exception while the breaker is open.
+                log.debug("No fallback or spool set for the circuit breaker, discarding hits that are not sent.")
+                fallback = FALLBACK_DROP
+        elif fallback not in FALLBACK_METHODS:
+            raise ValueError("Invalid fallback '{0}'.".format(fallback))
+        elif fallback == FALLBACK_SPOOL and spool is None:
+            raise ValueError("Fallback 'spool' requires a spool.")
+        self._fallback = fallback
+        if fallback == FALLBACK_QUEUE:
+            self._fallback_pool = WorkerPool(self._send_queued, workers=1, queue_size=fallback_queue_size,
+                                             overflow=QUEUE_OVERFLOW_DROP_OLDEST,
+                                             on_drop=self._spool_item if spool is not None else None,
+                                             name='AnalyticsSenderFallback')
+        else:
+            self._fallback_pool = None
+        self._direct = spool is None and retry is None and breaker is None and fallback is None
+
+    def _prepare_request(self, session, method, url, body=None):
+        # Skips Session.prepare_request, which would merge cookies, auth, and hooks and encode the payload again.
+        p_req = PreparedRequest()
+        p_req.method = method
+        p_req.url = url
+        p_req.headers = headers = CaseInsensitiveDict(session.headers)
+        if body is not None:
+            headers['Content-Type'] = FORM_CONTENT_TYPE
+            headers['Content-Length'] = str(len(body))
+        p_req.body = body
+        p_req.hooks = {'response': list(session.hooks['response'])}
+        return p_req
 
     def get(self, request_params):
         """
         Sends a hit to GA via a GET-request.
 
-        :param request_params: URL parameters.
-        :type request_params: dict
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
         :return: A response object.
         :rtype: requests.models.Response
         """
-        req = Request('GET', self._base_url, params=request_params)
-        p_req = self._session.prepare_request(req)
-        if len(p_req.url) - self._root_url_len > GET_SIZE_LIMIT:
+        payload = encode_payload(request_params)
+        url_len = self._base_url_len + 1 + len(payload)
+        if url_len - self._root_url_len > GET_SIZE_LIMIT:
             if self._post_fallback:
-                return self.post(p_req.url[self._base_url_len+1:])
+                return self.post(payload)
             raise SenderException("Request is too large for GET method and POST fallback is deactivated:",
-                                  len(p_req.url))
-        return self._session.send(p_req, timeout=self._timeout)
+                                  url_len)
+        session = self.session
+        p_req = self._prepare_request(session, 'GET', '{0}?{1}'.format(self._base_url, payload))
+        return session.send(p_req, timeout=self._timeout)
 
     def post(self, request_data):
         """
         Sends a hit to GA via a POST-request.
 
-        :param request_data: POST payload.
-        :type request_data: dict
+        :param request_data: POST payload, either as parameters or URL-encoded.
+        :type request_data: dict | unicode | str
         :return: A response object.
         :rtype: requests.models.Response
         """
-        req = Request('POST', self._base_url, data=request_data)
-        p_req = self._session.prepare_request(req)
-        if len(p_req.body) > POST_SIZE_LIMIT:
+        payload = encode_payload(request_data)
+        if len(payload) > POST_SIZE_LIMIT:
+            if self._split_hits:
+                return self._post_parts(payload)
             raise SenderException("Request is too large for POST method:",
-                                  len(p_req.body))
-        return self._session.send(p_req, timeout=self._timeout)
+                                  len(payload))
+        body = payload.encode('ascii')
+        session = self.session
+        p_req = self._prepare_request(session, 'POST', self._base_url, body)
+        return session.send(p_req, timeout=self._timeout)
 
-    def send(self, request_params):
+    def _post_parts(self, payload):
+        responses = [self.post(part) for part in split_payload(payload)]
+        for response in responses:
+            if response is not None and response.status_code >= 400:
+                return response
+        return responses[-1]
+
+    def deliver(self, request_params):
         """
         Assigned to default method as set during instantiation.
         """
         pass
 
+    def _call_with_retry(self, func, payload):
+        breaker = self._breaker
+        if self._retry is not None and is_background_thread():
+            delays = self._retry.delays()
+        else:
+            # Retrying would keep the caller, e.g. a web request, waiting.
+            delays = iter(())
+        while True:
+            try:
+                response = func(payload)
+                if response is not None and response.status_code >= 500:
+                    raise HTTPError("Server error: {0}".format(response.status_code), response=response)
+            except RequestException:
+                if breaker is not None:
+                    breaker.record_failure()
+                delay = next(delays, None)
+                if delay is None or (breaker is not None and not breaker.allow()):
+                    raise
+                time.sleep(delay)
+            except Exception:
+                if breaker is not None:
+                    breaker.abort_trial()
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return response
+
+    def _apply_fallback(self, payload, timestamp, error):
+        fallback = self._fallback
+        if fallback == FALLBACK_QUEUE:
+            self._fallback_pool.submit((payload, timestamp or time.time()))
+        elif fallback == FALLBACK_SPOOL:
+            self.spool_hit(payload, timestamp)
+        elif fallback == FALLBACK_DROP:
+            log.debug("Discarding hit: %s", error)
+        elif isinstance(error, Exception):
+            raise error
+        else:
+            raise SenderException(error)
+        return None
+
+    def _send_queued(self, item):
+        payload, timestamp = item
+        age = time.time() - timestamp
+        if age > QUEUE_TIME_LIMIT:
+            log.debug("Discarding queued hit older than %s seconds.", QUEUE_TIME_LIMIT)
+            return
+        breaker = self._breaker
+        if breaker is None or breaker.allow():
+            try:
+                self._call_with_retry(self.deliver, set_queue_time(payload, int(age * 1000)))
+                return
+            except RequestException as e:
+                log.debug("Failed to send queued hit: %s", e)
+        # Wait for the next trial attempt, keeping the hit in the queue.
+        if breaker is not None:
+            time.sleep(max(breaker.remaining(), FALLBACK_MIN_WAIT))
+        else:
+            time.sleep(FALLBACK_RETRY_INTERVAL)
+        self._fallback_pool.submit(item)
+
+    def _spool_item(self, item):
+        self.spool_hit(*item)
+
+    def send(self, request_params, timestamp=None):
+        """
+        Sends a hit with the default method. Failed hits are retried according to the retry policy, and handled as
+        set in ``fallback`` if they cannot be sent. While the circuit breaker is open, no attempts are made and hits
+        are passed to the fallback immediately.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :param timestamp: Time when the hit has been generated. Only used for the fallback.
+        :type timestamp: float
+        :return: A response object, or ``None`` if the hit has been passed to the fallback.
+        :rtype: requests.models.Response
+        """
+        if self._direct:
+            return self.deliver(request_params)
+        payload = encode_payload(request_params)
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            return self._apply_fallback(payload, timestamp, "Circuit breaker is open.")
+        try:
+            return self._call_with_retry(self.deliver, payload)
+        except RequestException as e:
+            log.warning("Failed to send hit: %s", e)
+            return self._apply_fallback(payload, timestamp, e)
+
+    def send_batch(self, payloads):
+        """
+        Sends a list of encoded hits to GA in a single ``POST`` request to the ``/batch`` endpoint.
+
+        :param payloads: URL-encoded hits.
+        :type payloads: list[unicode | str]
+        :return: A response object.
+        :rtype: requests.models.Response
+        """
+        body = '\n'.join(payloads).encode('utf-8')
+        return self.session.post(self._batch_url, data=body, timeout=self._timeout)
+
+    def send_many(self, hits, timestamp=None):
+        """
+        Sends several hits that belong together, e.g. a transaction and its items, in as few ``POST`` requests to the
+        ``/batch`` endpoint as the limits of the Measurement Protocol allow. Retries, the circuit breaker, and the
+        fallback apply to each of these requests as in :meth:`send`.
+
+        :param hits: URL parameters, or the URL-encoded hits.
+        :type hits: list[dict | unicode | str]
+        :param timestamp: Time when the hits have been generated. Only used for the fallback.
+        :type timestamp: float
+        :return: A response object for each request, or ``None`` where the hits have been passed to the fallback.
+        :rtype: list[requests.models.Response]
+        """
+        payloads = []
+        for request_params in hits:
+            payload = encode_payload(request_params)
+            if len(payload) > POST_SIZE_LIMIT:
+                if not self._split_hits:
+                    raise SenderException("Request is too large for POST method:", len(payload))
+                payloads.extend(split_payload(payload))
+            else:
+                payloads.append(payload)
+        responses = []
+        breaker = self._breaker
+        for batch in get_batches(payloads):
+            if breaker is not None and not breaker.allow():
+                error = "Circuit breaker is open."
+            else:
+                try:
+                    responses.append(self._call_with_retry(self.send_batch, batch))
+                    continue
+                except RequestException as e:
+                    log.warning("Failed to send batch of %s hits: %s", len(batch), e)
+                    error = e
+            for payload in batch:
+                self._apply_fallback(payload, timestamp, error)
+            responses.append(None)
+        return responses
+
+    def spool_hit(self, request_params, timestamp=None):
+        """
+        Writes a hit to the spool, if one is set.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :param timestamp: Time when the hit has been generated. Default is the current time.
+        :type timestamp: float
+        :return: ``True`` if the hit has been written to the spool, ``False`` otherwise.
+        :rtype: bool
+        """
+        if self._spool is None:
+            return False
+        try:
+            self._spool.append(encode_payload(request_params), timestamp)
+        except Exception as e:
+            log.exception(e)
+            return False
+        return True
+
+    def replay(self, request_params):
+        """
+        Sends a hit from the spool. Unlike :meth:`send`, no fallback is applied; the hit is only considered delivered
+        if GA has accepted it, so that it is kept in the spool otherwise.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :return: A response object.
+        :rtype: requests.models.Response
+        :raises server_tracking.exceptions.SenderException: If the circuit breaker is open.
+        :raises requests.RequestException: If the hit cannot be sent, or the response status is not successful.
+        """
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            raise SenderException("Circuit breaker is open.")
+        response = self._call_with_retry(self.deliver, request_params)
+        if response is not None and not 200 <= response.status_code < 300:
+            raise HTTPError("Hit has not been accepted: {0}".format(response.status_code), response=response)
+        return response
+
+    def _init_session(self, session):
+        if self._debug:
+            session.hooks['response'].append(process_debug_response)
+        return session
+
+    def prewarm(self, connections=1):
+        """
+        Opens connections to GA in advance, so that the first hits do not have to wait for connection setup and the
+        TLS handshake. With ``session_per_thread``, this applies to the session of the current thread.
+
+        :param connections: Number of connections to open. Limited to the pool size of the session.
+        :type connections: int
+        """
+        url = self._base_url
+        timeout = self._timeout[0] if isinstance(self._timeout, tuple) else self._timeout
+        try:
+            adapter = self.session.get_adapter(url)
+            pool = adapter.poolmanager.connection_from_url(url)
+            adapter.cert_verify(pool, url, True, None)
+            # Further connections would be discarded when they are returned to the pool.
+            connections = min(connections, pool.pool.maxsize)
+            get_conn, put_conn = pool._get_conn, pool._put_conn
+        except AttributeError as e:
+            # Relies on internals of requests and urllib3.
+            log.warning("Connection pool does not support prewarming, skipping it: %s", e)
+            return
+        conns = []
+        try:
+            for __ in range(connections):
+                # Raises an exception instead of waiting indefinitely, if the pool blocks and has no free connection.
+                conn = get_conn(timeout=timeout)
+                conns.append(conn)
+                if conn.sock is None:
+                    conn.connect()
+        except Exception as e:
+            log.warning("Failed to open connection to %s: %s", url, e)
+        finally:
+            for conn in conns:
+                put_conn(conn)
+
+    def after_fork(self):
+        """
+        Replaces connections, locks, and threads inherited from the parent process. In a child process, a new session
+        is always created from ``session_factory``, also if a session has been passed in.
+        """
+        if self._session_per_thread:
+            self._local = local()
+        else:
+            self._session = self._init_session(self._session_factory())
+        if self._breaker is not None:
+            self._breaker.after_fork()
+        if self._fallback_pool is not None:
+            self._fallback_pool.after_fork()
+
+    def close(self, timeout=None):
+        """
+        Sends hits remaining in the fallback queue and closes the session.
+
+        :param timeout: Maximum time in seconds to wait for remaining hits to be sent.
+        :type timeout: int | float
+        """
+        if self._fallback_pool is not None:
+            self._fallback_pool.close(timeout)
+        if not self._session_per_thread:
+            self._session.close()
+
     @property
     def session(self):
+        if self._session_per_thread:
+            session = getattr(self._local, 'session', None)
+            if session is None:
+                self._local.session = session = self._init_session(self._session_factory())
+            return session
         return self._session
 
 
-def get_send_function(defer, **kwargs):
+class BatchAnalyticsSender(AnalyticsSender):
+    """
+    Collects hits and sends them to GA in groups, using ``POST`` requests to the ``/batch`` endpoint. A batch is
+    sent as soon as it reaches ``max_hits`` or ``max_bytes``, or when its oldest hit has been waiting for
+    ``max_linger`` seconds. Sending is performed by a background thread, so that :meth:`send` never blocks on
+    network I/O.
+
+    :param session: Session object. If not provided, one is created from ``session_factory``.
+    :type session: requests.sessions.Session
+    :param max_hits: Maximum number of hits per batch. GA accepts up to 20.
+    :type max_hits: int
+    :param max_bytes: Maximum size of a batch payload in bytes. GA accepts up to 16K.
+    :type max_bytes: int
+    :param max_linger: Maximum time in seconds that a hit may wait for its batch to fill up.
+    :type max_linger: int | float
+    :param kwargs: Further arguments to :class:`AnalyticsSender`. The default method and POST fallback do not apply.
+     Batches that cannot be sent are passed to the fallback hit by hit, or discarded if none is set.
+    """
+    def __init__(self, session=None, max_hits=BATCH_HIT_LIMIT, max_bytes=BATCH_SIZE_LIMIT, max_linger=5, **kwargs):
+        kwargs.pop('default_method', None)
+        kwargs.pop('post_fallback', None)
+        super(BatchAnalyticsSender, self).__init__(session, default_method='POST', **kwargs)
+        self._max_hits = min(max_hits, BATCH_HIT_LIMIT)
+        self._max_bytes = min(max_bytes, BATCH_SIZE_LIMIT)
+        self._max_linger = max_linger
+        self._condition = Condition()
+        self._pending = []
+        self._pending_size = 0
+        self._pending_since = None
+        self._ready = deque()
+        self._closed = False
+        self._thread = None
+        self.deliver = self.add
+
+    def _take_pending(self):
+        batch = self._pending
+        self._pending = []
+        self._pending_size = 0
+        self._pending_since = None
+        return batch
+
+    def _start_thread(self):
+        self._thread = thread = Thread(target=self._run, name='BatchAnalyticsSender')
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        set_background_thread()
+        condition = self._condition
+        while True:
+            with condition:
+                while not self._ready:
+                    if self._pending:
+                        remaining = self._pending_since + self._max_linger - time.time()
+                        if remaining <= 0 or self._closed:
+                            self._ready.append(self._take_pending())
+                            break
+                        condition.wait(remaining)
+                    elif self._closed:
+                        return
+                    else:
+                        condition.wait()
+                batch = self._ready.popleft()
+            self._process_batch(batch)
+
+    def _process_batch(self, batch):
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            error = "Circuit breaker is open."
+        else:
+            try:
+                self._call_with_retry(self.send_batch, [payload for payload, __ in batch])
+                return
+            except RequestException as e:
+                log.warning("Failed to send batch of %s hits: %s", len(batch), e)
+                error = e
+            except Exception as e:
+                log.exception(e)
+                return
+        if self._fallback is None:
+            log.error("Discarding batch of %s hits: %s", len(batch), error)
+            return
+        for payload, timestamp in batch:
+            self._apply_fallback(payload, timestamp, error)
+
+    def add(self, request_params, timestamp=None):
+        """
+        Adds a hit to the current batch. The hit is sent along with the batch from a background thread. After the
+        sender has been closed, hits are written to the spool if one is set, and discarded otherwise.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :param timestamp: Time when the hit has been generated. Only used when the hit is written to the spool.
+        :type timestamp: float
+        """
+        payload = encode_payload(request_params)
+        size = len(payload)
+        if size > POST_SIZE_LIMIT:
+            if self._split_hits:
+                for part in split_payload(payload):
+                    self.add(part, timestamp)
+                return
+            raise SenderException("Request is too large for POST method:", size)
+        with self._condition:
+            closed = self._closed
+            if not closed:
+                self._add_pending(payload, size, timestamp)
+        if closed:
+            # E.g. from requests that are still being processed during shutdown.
+            if not self.spool_hit(payload, timestamp):
+                log.debug("Discarding hit added after the sender has been closed.")
+
+    def _add_pending(self, payload, size, timestamp):
+        # Called with the condition's lock held.
+        # Hits are separated by a line break.
+        if self._pending and self._pending_size + size + 1 > self._max_bytes:
+            self._ready.append(self._take_pending())
+        if not self._pending:
+            self._pending_since = time.time()
+            self._pending_size = size
+        else:
+            self._pending_size += size + 1
+        self._pending.append((payload, timestamp or time.time()))
+        if len(self._pending) >= self._max_hits:
+            self._ready.append(self._take_pending())
+        if self._thread is None:
+            self._start_thread()
+        self._condition.notify()
+
+    def send(self, request_params, timestamp=None):
+        """
+        Adds a hit to the current batch. See :meth:`add`.
+        """
+        self.add(request_params, timestamp)
+
+    def send_many(self, hits, timestamp=None):
+        """
+        Adds several hits that belong together to the current batch, without hits of other threads in between. See
+        :meth:`add`.
+        """
+        # The condition uses a reentrant lock.
+        with self._condition:
+            for request_params in hits:
+                self.add(request_params, timestamp)
+
+    def flush(self):
+        """
+        Marks the current batch as ready for sending, regardless of its size and age.
+        """
+        with self._condition:
+            if self._pending:
+                self._ready.append(self._take_pending())
+                self._condition.notify()
+
+    def close(self, timeout=None):
+        """
+        Sends all remaining hits and stops the background thread.
+
+        :param timeout: Maximum time in seconds to wait for remaining hits to be sent.
+        :type timeout: int | float
+        """
+        deadline = monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        super(BatchAnalyticsSender, self).close(max(0, deadline - monotonic()) if deadline is not None else None)
+
+    def after_fork(self):
+        """
+        Discards hits and the background thread inherited from the parent process, which sends these hits itself.
+        """
+        super(BatchAnalyticsSender, self).after_fork()
+        self._condition = Condition()
+        self._take_pending()
+        self._ready = deque()
+        self._closed = False
+        self._thread = None
+
+
+def _prewarm_in_background(sender, connections):
+    thread = Thread(target=sender.prewarm, args=(connections, ), name='AnalyticsSenderPrewarm')
+    thread.daemon = True
+    thread.start()
+
+
+def _get_sender_function(sender):
+    def send_func(request_params):
+        return sender.send(request_params)
+
+    send_func.send_many = sender.send_many
+    return send_func
+
+
+def _get_threaded_send_function(sender, thread_pool_size, thread_queue_size, thread_queue_overflow,
+                                session_per_thread, pool_prewarm):
+    if pool_prewarm and session_per_thread:
+        initializer = partial(sender.prewarm, pool_prewarm)
+    else:
+        initializer = None
+        if pool_prewarm:
+            _prewarm_in_background(sender, pool_prewarm)
+
+    def _send_item(item):
+        request_params, timestamp = item
+        if isinstance(request_params, list):
+            sender.send_many(request_params, timestamp)
+        else:
+            sender.send(request_params, timestamp)
+
+    def _spool_item(item):
+        request_params, timestamp = item
+        for hit in (request_params if isinstance(request_params, list) else [request_params]):
+            sender.spool_hit(hit, timestamp)
+
+    pool = WorkerPool(_send_item, workers=thread_pool_size, queue_size=thread_queue_size,
+                      overflow=thread_queue_overflow, on_drop=_spool_item if sender._spool else None,
+                      initializer=initializer, name='AnalyticsSender')
+    lifecycle.register(pool)
+
+    def send_func(request_params):
+        pool.submit((request_params, time.time()))
+
+    def send_many(hits):
+        # Hits that belong together are sent by the same worker.
+        pool.submit((list(hits), time.time()))
+
+    send_func.send_many = send_many
+    return send_func
+
+
+def get_send_function(defer, batch_max_hits=BATCH_HIT_LIMIT, batch_max_bytes=BATCH_SIZE_LIMIT, batch_max_linger=5,
+                      thread_pool_size=4, thread_queue_size=1000, thread_queue_overflow=QUEUE_OVERFLOW_DROP_NEWEST,
+                      pool_connections=1, pool_maxsize=10, pool_block=False, keep_alive=True, session_per_thread=False,
+                      pool_prewarm=0, spool_path=None, spool_segment_size=1048576, spool_max_segments=16,
+                      spool_replay_rate=10, retry_max=0, retry_backoff=0.5, retry_backoff_max=30, retry_jitter=True,
+                      breaker_threshold=0, breaker_cooldown=30, send_fallback=None, fallback_queue_size=1000,
+                      sidecar_socket=None, shutdown_timeout=5, shutdown_on_sigterm=True, **kwargs):
     if defer == DEFER_METHOD_CELERY:
         try:
             from .tasks import send_hit
@@ -106,10 +757,66 @@ def get_send_function(defer, **kwargs):
 
         return _send_func
 
-    sender = AnalyticsSender(Session(), **kwargs)
-    if defer == DEFER_METHOD_THREADED:
-        def _send_func(request_params):
-            Thread(target=sender.send, args=(request_params, )).start()
+    if spool_path:
+        spool = HitSpool.open_available(spool_path, segment_size=spool_segment_size, max_segments=spool_max_segments)
+        # Registered first, so that it is reopened before and closed after all components that write to it.
+        lifecycle.register(spool)
+    else:
+        spool = None
+    if defer == DEFER_METHOD_SIDECAR:
+        from .sidecar import SidecarClient
 
-        return _send_func
-    return sender.send
+        if not sidecar_socket:
+            raise ValueError("Sidecar socket path is not set.")
+        sender = SidecarClient(sidecar_socket, spool=spool)
+        send_func = sender.send
+        replay_func = sender.deliver
+    else:
+        kwargs['session_factory'] = partial(create_session, pool_connections=pool_connections,
+                                            pool_maxsize=pool_maxsize, pool_block=pool_block, keep_alive=keep_alive)
+        kwargs['spool'] = spool
+        if retry_max:
+            kwargs['retry'] = RetryPolicy(retry_max, backoff=retry_backoff, backoff_max=retry_backoff_max,
+                                          jitter=retry_jitter)
+        if breaker_threshold:
+            kwargs['breaker'] = CircuitBreaker(breaker_threshold, cooldown=breaker_cooldown)
+        kwargs.update(fallback=send_fallback, fallback_queue_size=fallback_queue_size)
+        if defer == DEFER_METHOD_BATCHED:
+            # All batches are sent from a single thread.
+            sender = BatchAnalyticsSender(max_hits=batch_max_hits, max_bytes=batch_max_bytes,
+                                          max_linger=batch_max_linger, **kwargs)
+            lifecycle.register(sender)
+            if pool_prewarm:
+                _prewarm_in_background(sender, pool_prewarm)
+            send_func = _get_sender_function(sender)
+        else:
+            sender = AnalyticsSender(session_per_thread=session_per_thread, **kwargs)
+            lifecycle.register(sender)
+            if defer == DEFER_METHOD_THREADED:
+                send_func = _get_threaded_send_function(sender, thread_pool_size, thread_queue_size,
+                                                        thread_queue_overflow, session_per_thread, pool_prewarm)
+            else:
+                if pool_prewarm and not session_per_thread:
+                    _prewarm_in_background(sender, pool_prewarm)
+                send_func = _get_sender_function(sender)
+        replay_func = sender.replay
+    if spool:
+        replayer = SpoolReplayer(spool, replay_func, rate=spool_replay_rate)
+        lifecycle.register(replayer)
+        replayer.start()
+    lifecycle.install(shutdown_timeout, sigterm=shutdown_on_sigterm)
+    if not lifecycle.FORK_HOOKS:
+        _send_func = send_func
+
+        def send_func(request_params):
+            lifecycle.check_fork()
+            return _send_func(request_params)
+
+        _send_many = getattr(_send_func, 'send_many', None)
+        if _send_many is not None:
+            def send_many(hits):
+                lifecycle.check_fork()
+                return _send_many(hits)
+
+            send_func.send_many = send_many
+    return send_func
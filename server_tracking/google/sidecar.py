@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Sender process that receives hits from local processes through a Unix datagram socket, and sends them to GA in
+batches. Web workers use :class:`SidecarClient` for handing over hits, which never blocks: If the sender process is not
+running or cannot keep up, hits are written to a spool or discarded.
+
+Run the sender process with::
+
+    python -m server_tracking.google.sidecar --socket /run/server-side-tracking.sock
+"""
+from __future__ import unicode_literals
+
+import argparse
+import errno
+import logging
+import os
+import signal
+import socket
+import struct
+import time
+
+from ..encoding import encode_payload
+from ..exceptions import SenderException
+from . import BATCH_HIT_LIMIT, BATCH_SIZE_LIMIT, POST_SIZE_LIMIT
+from .splitting import split_payload
+
+
+log = logging.getLogger(__name__)
+
+# Timestamp and payload size, so that truncated messages can be detected.
+MESSAGE_HEADER = struct.Struct(str('<dI'))
+MESSAGE_SIZE_LIMIT = MESSAGE_HEADER.size + POST_SIZE_LIMIT * 4
+PAYLOAD_SIZE_LIMIT = MESSAGE_SIZE_LIMIT - MESSAGE_HEADER.size
+
+
+class SidecarClient(object):
+    """
+    Hands over hits to the sender process through a Unix datagram socket.
+
+    :param socket_path: Path of the socket the sender process is listening on.
+    :type socket_path: unicode | str
+    :param spool: Spool for writing hits to, that cannot be handed over.
+    :type spool: server_tracking.spool.HitSpool
+    """
+    def __init__(self, socket_path, spool=None):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("Unix sockets are not available.")
+        self._socket_path = socket_path
+        self._spool = spool
+        self._socket = None
+        self._pid = None
+        self.dropped = 0
+
+    def _get_socket(self):
+        pid = os.getpid()
+        if self._socket is None or self._pid != pid:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            self._socket = sock
+            self._pid = pid
+        return self._socket
+
+    def deliver(self, request_params, timestamp=None):
+        """
+        Sends a hit to the sender process.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :param timestamp: Time when the hit has been generated. Default is the current time.
+        :type timestamp: float
+        :raises socket.error: If the hit cannot be handed over.
+        :raises server_tracking.exceptions.SenderException: If the hit exceeds :data:`PAYLOAD_SIZE_LIMIT`.
+        """
+        payload = encode_payload(request_params).encode('ascii')
+        if len(payload) > PAYLOAD_SIZE_LIMIT:
+            raise SenderException("Hit is too large for the sender process:", len(payload))
+        message = MESSAGE_HEADER.pack(timestamp or time.time(), len(payload)) + payload
+        self._get_socket().sendto(message, self._socket_path)
+
+    def _send_part(self, payload, timestamp):
+        try:
+            self.deliver(payload, timestamp)
+        except (socket.error, OSError) as e:
+            if self._spool is not None:
+                log.debug("Sender process is not available, writing hit to spool: %s", e)
+                try:
+                    self._spool.append(payload, timestamp)
+                    return
+                except Exception as spool_e:
+                    log.exception(spool_e)
+            self.dropped += 1
+            log.debug("Sender process is not available, discarding hit: %s", e)
+
+    def send(self, request_params, timestamp=None):
+        """
+        Sends a hit to the sender process. If that is not possible, it is written to the spool or discarded. Hits that
+        exceed the message size limit are split into several hits as described in
+        :func:`server_tracking.google.splitting.split_payload`, or discarded if that is not possible.
+
+        :param request_params: URL parameters, or the URL-encoded hit.
+        :type request_params: dict | unicode | str
+        :param timestamp: Time when the hit has been generated. Default is the current time.
+        :type timestamp: float
+        """
+        payload = encode_payload(request_params)
+        timestamp = timestamp or time.time()
+        if len(payload) > PAYLOAD_SIZE_LIMIT:
+            try:
+                parts = split_payload(payload)
+            except SenderException as e:
+                self.dropped += 1
+                log.warning("Discarding hit that exceeds the message size limit: %s", e)
+                return
+        else:
+            parts = [payload]
+        for part in parts:
+            self._send_part(part, timestamp)
+
+
+class SidecarServer(object):
+    """
+    Receives hits from :class:`SidecarClient` instances and passes them to a sender.
+
+    :param socket_path: Path of the socket to listen on. A stale socket file is replaced.
+    :type socket_path: unicode | str
+    :param sender: Sender, usually a :class:`server_tracking.google.sender.BatchAnalyticsSender`.
+    :type sender: server_tracking.google.sender.AnalyticsSender
+    :param receive_buffer: Size of the socket receive buffer in bytes. Hits are discarded by the system when it is full.
+    :type receive_buffer: int
+    """
+    def __init__(self, socket_path, sender, receive_buffer=None):
+        self._socket_path = socket_path
+        self._sender = sender
+        self._receive_buffer = receive_buffer
+        self._socket = None
+        self._running = False
+
+    def bind(self):
+        try:
+            os.unlink(self._socket_path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        self._socket = sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        if self._receive_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._receive_buffer)
+        sock.bind(self._socket_path)
+        sock.settimeout(1)
+
+    def handle(self, message):
+        """
+        Passes a received message to the sender.
+
+        :param message: Message as sent by :class:`SidecarClient`.
+        :type message: bytes
+        """
+        if len(message) <= MESSAGE_HEADER.size:
+            log.warning("Discarding invalid message of %s bytes.", len(message))
+            return
+        timestamp, size = MESSAGE_HEADER.unpack_from(message)
+        payload = message[MESSAGE_HEADER.size:]
+        if len(payload) != size:
+            log.warning("Discarding truncated message with %s of %s bytes.", len(payload), size)
+            return
+        self._sender.send(payload.decode('ascii'), timestamp)
+
+    def serve(self):
+        """
+        Receives and processes messages until :meth:`stop` is called.
+        """
+        if self._socket is None:
+            self.bind()
+        self._running = True
+        sock = self._socket
+        while self._running:
+            try:
+                # One more byte than allowed, so that larger messages always appear truncated.
+                message = sock.recv(MESSAGE_SIZE_LIMIT + 1)
+            except socket.timeout:
+                continue
+            except (socket.error, OSError) as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            try:
+                self.handle(message)
+            except Exception as e:
+                log.exception(e)
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    from .sender import BatchAnalyticsSender, create_session
+
+    parser = argparse.ArgumentParser(description="Sends hits from local processes to Google Analytics.")
+    parser.add_argument('--socket', required=True, help="Path of the Unix socket to listen on.")
+    parser.add_argument('--no-ssl', action='store_true', help="Use HTTP instead of HTTPS.")
+    parser.add_argument('--debug', action='store_true', help="Send hits to the validation server.")
+    parser.add_argument('--timeout', type=float, default=10, help="Timeout of requests in seconds.")
+    parser.add_argument('--batch-max-hits', type=int, default=BATCH_HIT_LIMIT, help="Maximum number of hits per batch.")
+    parser.add_argument('--batch-max-bytes', type=int, default=BATCH_SIZE_LIMIT, help="Maximum size of a batch.")
+    parser.add_argument('--batch-max-linger', type=float, default=5,
+                        help="Maximum time in seconds that a hit waits for its batch to fill up.")
+    parser.add_argument('--receive-buffer', type=int, default=None, help="Size of the socket receive buffer.")
+    parser.add_argument('--log-level', default='INFO', help="Log level.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+
+    sender = BatchAnalyticsSender(create_session(), ssl=not args.no_ssl, debug=args.debug, timeout=args.timeout,
+                                  max_hits=args.batch_max_hits, max_bytes=args.batch_max_bytes,
+                                  max_linger=args.batch_max_linger)
+    server = SidecarServer(args.socket, sender, receive_buffer=args.receive_buffer)
+
+    def _stop(signum, frame):
+        server.stop()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    server.bind()
+    log.info("Listening on %s.", args.socket)
+    try:
+        server.serve()
+    finally:
+        server.close()
+        sender.close(args.timeout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Splits Enhanced E-Commerce hits that exceed the size limit of the Measurement Protocol into several hits. Products and
+product impressions are distributed over the parts, while all other parameters, e.g. general, session, and page view
+parameters, are repeated in each part.
+"""
+from __future__ import unicode_literals
+
+import re
+
+from ..encoding import encode_value
+from ..exceptions import SenderException
+from . import POST_SIZE_LIMIT, HIT_TYPE_EVENT, EECOM_ACTION_PURCHASE, EECOM_ACTION_REFUND
+
+
+PRODUCT_PATTERN = re.compile(r'^pr(\d+)([a-z].*)$')
+IMPRESSION_PATTERN = re.compile(r'^il(\d+)pi(\d+)([a-z].*)$')
+IMPRESSION_LIST_PATTERN = re.compile(r'^il(\d+)([a-z].*)$')
+TRANSACTION_TOTAL_KEYS = frozenset(['tr', 'tt', 'ts', 'tcc'])
+TRANSACTION_ACTIONS = frozenset([EECOM_ACTION_PURCHASE, EECOM_ACTION_REFUND])
+# Left out of further parts of purchases and refunds, along with the totals.
+TRANSACTION_PREFIXES = ('pa=', 'ti=', 'ta=')
+CONTINUATION_CATEGORY = 'Ecommerce'
+CONTINUATION_ACTION = 'Continuation'
+
+
+def _item_size(item):
+    # Including the separator.
+    return len(item) + 1
+
+
+def split_payload(payload, limit=POST_SIZE_LIMIT, category=CONTINUATION_CATEGORY, action=CONTINUATION_ACTION):
+    """
+    Splits an encoded hit into parts that do not exceed ``limit``. Products (``pr<N>...``) and product impressions
+    (``il<L>pi<N>...``) are distributed over the parts and renumbered in each of them; impression list names are
+    repeated where needed. The product action, transaction id, and totals of purchases and refunds are only kept in
+    the first part, so that the transaction is not counted more than once.
+
+    Further parts of hits other than events are sent as non-interaction events with the given category and action,
+    e.g. so that a page view is not counted again. Further parts of events are marked as non-interaction.
+
+    :param payload: URL-encoded hit.
+    :type payload: unicode | str
+    :param limit: Maximum size of each part in bytes.
+    :type limit: int
+    :param category: Event category of further parts.
+    :type category: unicode | str
+    :param action: Event action of further parts.
+    :type action: unicode | str
+    :return: URL-encoded hits. Contains only ``payload`` if it does not exceed ``limit``.
+    :rtype: list[unicode | str]
+    :raises server_tracking.exceptions.SenderException: If the hit cannot be split into parts within the limit.
+    """
+    if len(payload) <= limit:
+        return [payload]
+    common = []
+    common_size = 0
+    totals = []
+    hit_type = None
+    product_action = None
+    # Products by index, and impressions by list and index, each with their items and size.
+    groups = {}
+    list_items = {}
+    for item in payload.split('&'):
+        key = item.partition('=')[0]
+        m = PRODUCT_PATTERN.match(key)
+        if m:
+            group_key = ('pr', int(m.group(1)))
+            suffix = m.group(2)
+        else:
+            m = IMPRESSION_PATTERN.match(key)
+            if m:
+                group_key = ('il', int(m.group(1)), int(m.group(2)))
+                suffix = m.group(3)
+            else:
+                m = IMPRESSION_LIST_PATTERN.match(key)
+                if m:
+                    list_items.setdefault(int(m.group(1)), []).append(item)
+                    continue
+                if key in TRANSACTION_TOTAL_KEYS:
+                    totals.append(item)
+                    continue
+                if key == 't':
+                    hit_type = item[2:]
+                elif key == 'pa':
+                    product_action = item[3:]
+                common.append(item)
+                common_size += _item_size(item)
+                continue
+        group = groups.get(group_key)
+        if group is None:
+            groups[group_key] = group = [[], 0]
+        group[0].append((suffix, item.partition('=')[2]))
+        group[1] += _item_size(item)
+    if not groups:
+        raise SenderException("Hit exceeds the size limit and contains no products to split:", len(payload))
+    if product_action not in TRANSACTION_ACTIONS:
+        common.extend(totals)
+        common_size += sum(_item_size(item) for item in totals)
+        totals = []
+
+    if hit_type == HIT_TYPE_EVENT:
+        continuation = ['ni=1']
+        skip = ('ni=', )
+    else:
+        continuation = ['t={0}'.format(HIT_TYPE_EVENT), 'ni=1', 'ec={0}'.format(encode_value(category)),
+                        'ea={0}'.format(encode_value(action))]
+        skip = ('t=', 'ni=', 'ec=', 'ea=', 'el=', 'ev=')
+    if product_action in TRANSACTION_ACTIONS:
+        skip += TRANSACTION_PREFIXES
+    continuation = [item for item in common if not item.startswith(skip)] + continuation
+    continuation_size = sum(_item_size(item) for item in continuation)
+    list_sizes = {index: sum(_item_size(item) for item in items) for index, items in list_items.items()}
+
+    # Groups are sorted by index, so that renumbered keys are never longer than the original ones.
+    parts = []
+    current = []
+    current_lists = set()
+    current_size = 0
+    base_size = common_size + sum(_item_size(item) for item in totals)
+    for group_key, (group_items, group_size) in sorted(groups.items()):
+        is_impression = group_key[0] == 'il'
+        size = group_size
+        if is_impression and group_key[1] not in current_lists:
+            size += list_sizes.get(group_key[1], 0)
+        if current and base_size + current_size + size > limit:
+            parts.append((current, current_lists))
+            current = []
+            current_lists = set()
+            current_size = 0
+            base_size = continuation_size
+            size = group_size + (list_sizes.get(group_key[1], 0) if is_impression else 0)
+        if base_size + size > limit:
+            raise SenderException("Product exceeds the size limit of a hit:", size)
+        current.append((group_key, group_items))
+        if is_impression:
+            current_lists.add(group_key[1])
+        current_size += size
+    parts.append((current, current_lists))
+
+    payloads = []
+    for part_index, (part_groups, part_lists) in enumerate(parts):
+        items = common + totals if part_index == 0 else continuation[:]
+        for list_index in sorted(part_lists):
+            items.extend(list_items.get(list_index, ()))
+        product_count = 0
+        impression_counts = {}
+        for group_key, group_items in part_groups:
+            if group_key[0] == 'pr':
+                product_count += 1
+                prefix = 'pr{0}'.format(product_count)
+            else:
+                list_index = group_key[1]
+                impression_counts[list_index] = count = impression_counts.get(list_index, 0) + 1
+                prefix = 'il{0}pi{1}'.format(list_index, count)
+            items.extend('{0}{1}={2}'.format(prefix, suffix, value) for suffix, value in group_items)
+        payloads.append('&'.join(items))
+    return payloads
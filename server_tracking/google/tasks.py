@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from datetime import datetime
+from functools import partial
+import time
+
 from celery import Task, shared_task
-from requests import Session, RequestException
+from requests import RequestException
 
+from .. import lifecycle
+from ..encoding import encode_payload
+from ..resilience import RetryPolicy
 from ..settings import update_default_settings, SST_DEFAULT_SETTINGS, GA_DEFAULT_SETTINGS
-from .sender import AnalyticsSender
-from .parameters import HitParameters
+from .replay import set_queue_time
+from .sender import AnalyticsSender, create_session
 
 
 class AnalyticsSendTask(Task):
@@ -16,24 +21,40 @@ class AnalyticsSendTask(Task):
 
     def __init__(self):
         config = self.app.conf
-        self.session = session = Session()
         sst_settings = update_default_settings(config, 'SERVER_SIDE_TRACKING', SST_DEFAULT_SETTINGS)
         ga_settings = update_default_settings(config, 'SERVER_SIDE_TRACKING_GA', GA_DEFAULT_SETTINGS)
-        self.sender = AnalyticsSender(session,
-                                      ssl=ga_settings['ssl'],
+        session_factory = partial(create_session,
+                                  pool_connections=sst_settings['pool_connections'],
+                                  pool_maxsize=sst_settings['pool_maxsize'],
+                                  pool_block=sst_settings['pool_block'],
+                                  keep_alive=sst_settings['keep_alive'])
+        self.sender = AnalyticsSender(ssl=ga_settings['ssl'],
                                       debug=sst_settings['debug'],
                                       default_method=sst_settings['send_method'],
                                       post_fallback=sst_settings['post_fallback'],
-                                      timeout=sst_settings['timeout'])
+                                      split_hits=sst_settings['split_hits'],
+                                      timeout=sst_settings['timeout'],
+                                      session_factory=session_factory)
+        # Worker processes of the prefork pool get their own connections. Signals are handled by Celery.
+        lifecycle.register(self.sender)
+        lifecycle.install(sst_settings['shutdown_timeout'], sigterm=False)
+        # Retries are scheduled by Celery with a countdown, instead of being performed by the sender.
+        self.retry_policy = RetryPolicy(sst_settings['retry_max'],
+                                        backoff=sst_settings['retry_backoff'],
+                                        backoff_max=sst_settings['retry_backoff_max'],
+                                        jitter=sst_settings['retry_jitter'])
 
 
 @shared_task(bind=True, name='googleanalytics.send_hit', base=AnalyticsSendTask)
 def send_hit(self, request_params, timestamp):
-    time_queued = datetime.utcfromtimestamp(timestamp)
-    time_sent = datetime.utcnow()
-    queued_delta = time_sent - time_queued
-    request_params.update(HitParameters(queue_time=queued_delta.seconds).url())
+    # Hits are passed either as parameters or URL-encoded. The queue time is in milliseconds.
+    queue_time = int(max(time.time() - timestamp, 0) * 1000)
+    payload = set_queue_time(encode_payload(request_params), queue_time)
     try:
-        return self.sender.send(request_params)
+        return self.sender.send(payload)
     except RequestException as e:
-        raise self.retry(exc=e)
+        policy = self.retry_policy
+        retry_kwargs = {'countdown': policy.delay(self.request.retries)}
+        if policy.max_retries:
+            retry_kwargs['max_retries'] = policy.max_retries
+        raise self.retry(exc=e, **retry_kwargs)
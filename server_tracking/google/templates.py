@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Templates for hits that are sent repeatedly with the same fixed parameters, e.g. an event with a constant category and
+action. The fixed parameters are validated and URL-encoded once, when the template is defined.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import six
+
+from ..encoding import encode_params
+from . import HIT_TYPE_EVENT
+from .parameters import EventParameters, HitParameters
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+class HitTemplate(object):
+    """
+    Fixed parameters of a recurring hit. Templates can be passed to
+    :meth:`~server_tracking.google.client.AnalyticsClient.request` and the related methods in place of parameter
+    objects, along with the parameters that vary per hit. When hits are encoded by the client, the pre-encoded form of
+    the template is used, as long as none of its parameters is overridden by others.
+
+    :param hit_type: Hit type.
+    :type hit_type: unicode | str
+    :param params: UrlGenerator objects to provide the fixed parameters. They are validated immediately; later
+     changes to these objects do not affect the template.
+    :type params: Tuple[server_tracking.parameters.UrlGenerator]
+    :param kwargs: Further raw url parameters.
+    :raises server_tracking.exceptions.InvalidParametersException: If any of the parameter objects is invalid.
+    """
+    __slots__ = (str('hit_type'), str('_params'), str('_payload'), str('_keys'))
+
+    def __init__(self, hit_type, *params, **kwargs):
+        fixed = {}
+        for p in params:
+            if p:
+                fixed.update(p.url())
+        fixed.update(kwargs)
+        self.hit_type = hit_type
+        self._params = {k: v for k, v in six.iteritems(fixed) if v is not None}
+        self._payload = encode_params(self._params)
+        self._keys = frozenset(self._params)
+
+    def __len__(self):
+        return len(self._params)
+
+    def __repr__(self):
+        return '<{0}: {1} {2}>'.format(self.__class__.__name__, self.hit_type, self._payload)
+
+    def cached_url(self):
+        """
+        Returns the fixed parameters. They must not be changed by the caller.
+
+        :return: Request parameters.
+        :rtype: dict
+        """
+        return self._params
+
+    def url(self):
+        """
+        :return: A copy of the fixed parameters.
+        :rtype: dict
+        """
+        return self._params.copy()
+
+    @property
+    def payload(self):
+        """
+        :return: URL-encoded fixed parameters.
+        :rtype: unicode | str
+        """
+        return self._payload
+
+    @property
+    def keys(self):
+        """
+        :return: Names of the fixed parameters.
+        :rtype: frozenset
+        """
+        return self._keys
+
+    def send(self, client, *params, **kwargs):
+        """
+        Sends a hit from this template.
+
+        :param client: Client to send the hit with.
+        :type client: server_tracking.google.client.AnalyticsClient
+        :param params: UrlGenerator objects to provide the parameters that vary per hit.
+        :type params: Tuple[server_tracking.parameters.UrlGenerator]
+        :param kwargs: Raw url parameters to update the generated url with.
+        :return: Varies, see :meth:`server_tracking.google.client.AnalyticsClient.request`.
+        """
+        return client.request(self.hit_type, self, *params, **kwargs)
+
+
+def event_template(category, action, label=None, value=None, non_interaction_hit=None, misc_params=()):
+    """
+    Creates a template for an event.
+
+    :param category: Event category.
+    :type category: unicode | str
+    :param action: Event action.
+    :type action: unicode | str
+    :param label: Event label.
+    :type label: unicode | str
+    :param value: Event value.
+    :type value: int | float
+    :param non_interaction_hit: Set to ``1`` if the event is not based on a user interaction.
+    :type non_interaction_hit: int
+    :param misc_params: Further fixed parameters.
+    :type misc_params: tuple[server_tracking.parameters.UrlGenerator]
+    :return: Event template.
+    :rtype: HitTemplate
+    """
+    event = EventParameters(category, action=action, label=label, value=value)
+    hit = HitParameters(non_interaction_hit=non_interaction_hit)
+    return HitTemplate(HIT_TYPE_EVENT, event, hit, *misc_params)
+
+
+class TemplateCache(object):
+    """
+    Bounded cache of templates, for call sites that pass the fixed parameters on each call. When ``max_size`` is
+    reached, the least recently used template is discarded.
+
+    :param factory: Function that creates a template from the arguments of :meth:`get`.
+    :type factory: callable
+    :param max_size: Maximum number of templates to keep.
+    :type max_size: int
+    """
+    def __init__(self, factory, max_size=TEMPLATE_CACHE_SIZE):
+        self._factory = factory
+        self._max_size = max_size
+        self._templates = OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, *args):
+        """
+        Returns the template for the given arguments, creating it if necessary.
+
+        :return: Template.
+        :rtype: HitTemplate
+        """
+        templates = self._templates
+        try:
+            template = templates.pop(args, None)
+        except TypeError:
+            # Unhashable arguments.
+            return self._factory(*args)
+        if template is None:
+            template = self._factory(*args)
+            while len(templates) >= self._max_size:
+                try:
+                    templates.popitem(last=False)
+                except KeyError:
+                    break
+        # Inserted again as the most recently used.
+        templates[args] = template
+        return template
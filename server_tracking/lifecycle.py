@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Keeps senders, worker threads, and connections consistent across ``fork()`` and process shutdown.
+
+Registered components need to implement two methods:
+
+* ``after_fork()``: Called in a child process after ``fork()``. Should replace connections, locks, and queues
+  inherited from the parent, and restart background threads that had been running.
+* ``close(timeout)``: Called on process exit. Should send pending hits within ``timeout`` seconds and stop all
+  background threads.
+"""
+from __future__ import unicode_literals, absolute_import
+
+import atexit
+import logging
+import os
+import signal
+import threading
+
+from .resilience import monotonic
+
+
+log = logging.getLogger(__name__)
+
+FORK_HOOKS = hasattr(os, 'register_at_fork')
+
+_components = []
+_pid = os.getpid()
+_shutdown_timeout = 5
+_installed = False
+_previous_handler = None
+
+
+def register(component):
+    """
+    Registers a component for fork and shutdown handling. On shutdown, components are closed in reverse order of
+    registration.
+
+    :param component: Object that implements ``after_fork`` and ``close``.
+    """
+    _components.append(component)
+
+
+def unregister(component):
+    try:
+        _components.remove(component)
+    except ValueError:
+        pass
+
+
+def _after_fork():
+    global _pid
+    _pid = os.getpid()
+    for component in _components:
+        try:
+            component.after_fork()
+        except Exception as e:
+            log.exception(e)
+
+
+def check_fork():
+    """
+    Calls :meth:`after_fork` on all components, if the process id has changed since the last call. Only needed where
+    ``os.register_at_fork`` is not available.
+    """
+    if os.getpid() != _pid:
+        _after_fork()
+
+
+def shutdown(timeout=None):
+    """
+    Closes all registered components, sending pending hits within a common deadline.
+
+    :param timeout: Total time in seconds. Default is the value passed to :func:`install`.
+    :type timeout: int | float
+    """
+    if os.getpid() != _pid:
+        # Inherited components of a forked process that did not use them.
+        return
+    deadline = monotonic() + (_shutdown_timeout if timeout is None else timeout)
+    while _components:
+        component = _components.pop()
+        try:
+            component.close(max(0, deadline - monotonic()))
+        except Exception as e:
+            log.exception(e)
+
+
+def _handle_sigterm(signum, frame):
+    shutdown()
+    previous = _previous_handler
+    if callable(previous):
+        previous(signum, frame)
+    elif previous != signal.SIG_IGN:
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+def install(shutdown_timeout=5, sigterm=True):
+    """
+    Installs the fork, exit, and (optionally) ``SIGTERM`` hooks. Can be called repeatedly, but hooks are only
+    installed once.
+
+    :param shutdown_timeout: Time in seconds for sending pending hits on shutdown.
+    :type shutdown_timeout: int | float
+    :param sigterm: Also close components on ``SIGTERM``. A previously installed signal handler is called
+     afterwards. Only possible from the main thread.
+    :type sigterm: bool
+    """
+    global _installed, _shutdown_timeout, _previous_handler
+    _shutdown_timeout = shutdown_timeout
+    if _installed:
+        return
+    _installed = True
+    if FORK_HOOKS:
+        os.register_at_fork(after_in_child=_after_fork)
+    atexit.register(shutdown)
+    if sigterm and isinstance(threading.current_thread(), threading._MainThread):
+        _previous_handler = signal.getsignal(signal.SIGTERM)
+        signal.signal(signal.SIGTERM, _handle_sigterm)
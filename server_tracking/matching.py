@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Matching of URL paths against include and exclude rules, e.g. for deciding which page views are tracked. Rules are
+compiled once, so that the cost of matching a path does not grow with the number of rules.
+"""
+from __future__ import unicode_literals, absolute_import
+
+import re
+
+import six
+
+_RATE = ''
+# Numbered back-references would refer to other groups once the expressions are combined.
+_BACKREFERENCE = re.compile(r'\\[1-9]')
+
+
+def _is_regex(pattern):
+    return hasattr(pattern, 'match') and hasattr(pattern, 'pattern')
+
+
+class PathMatcher(object):
+    """
+    Decides on the sample rate of a path, based on prefixes and regular expressions. Paths matching an exclude rule
+    have a rate of ``0``; paths matching an include rule have the rate of that rule, by default ``1``.
+
+    Regular expressions, given as compiled patterns, are matched at the beginning of the path and checked first, in the
+    given order. Otherwise the longest matching prefix applies, so that an include rule can make an exception from a
+    shorter exclude rule and vice versa. An empty prefix matches all paths.
+
+    Prefixes are kept in a trie, and all regular expressions are combined into one for finding out whether any of them
+    matches. Thus, matching a path that is not affected by any regular expression takes time in proportion to the
+    length of the longest matching prefix, regardless of the number of rules.
+
+    :param exclude: Prefixes and compiled regular expressions of excluded paths.
+    :type exclude: collections.Iterable[unicode | str | re.Pattern]
+    :param include: Prefixes and compiled regular expressions of included paths. Each one can also be a tuple of
+     the prefix or expression and a sample rate between ``0`` and ``1``.
+    :type include: collections.Iterable[unicode | str | re.Pattern | tuple]
+    """
+    def __init__(self, exclude=(), include=()):
+        self._trie = {}
+        self._regexes = []
+        for pattern in exclude:
+            self._add(pattern, 0)
+        for rule in include:
+            if isinstance(rule, tuple):
+                pattern, rate = rule
+            else:
+                pattern, rate = rule, 1
+            self._add(pattern, rate)
+        self._combined = self._combine(self._regexes)
+
+    def _add(self, pattern, rate):
+        if _is_regex(pattern):
+            self._regexes.append((pattern, rate))
+        elif isinstance(pattern, six.string_types):
+            node = self._trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[_RATE] = rate
+        else:
+            raise ValueError("Invalid path pattern: {0!r}".format(pattern))
+
+    @staticmethod
+    def _combine(regexes):
+        if not regexes:
+            return None
+        flags = set(regex.flags for regex, __ in regexes)
+        if len(flags) > 1 or any(_BACKREFERENCE.search(regex.pattern) for regex, __ in regexes):
+            return None
+        try:
+            return re.compile('|'.join('(?:{0})'.format(regex.pattern) for regex, __ in regexes), flags.pop())
+        except (re.error, AssertionError):
+            # E.g. too many groups on older Python versions.
+            return None
+
+    def __bool__(self):
+        return bool(self._trie or self._regexes)
+
+    __nonzero__ = __bool__
+
+    def get_rate(self, path):
+        """
+        Returns the sample rate of the rule that applies to a path.
+
+        :param path: URL path.
+        :type path: unicode | str
+        :return: Sample rate, or ``None`` if no rule matches.
+        :rtype: float
+        """
+        regexes = self._regexes
+        if regexes:
+            combined = self._combined
+            if combined is None or combined.match(path):
+                for regex, rate in regexes:
+                    if regex.match(path):
+                        return rate
+        node = self._trie
+        rate = node.get(_RATE)
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            rate = node.get(_RATE, rate)
+        return rate
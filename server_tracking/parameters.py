@@ -3,6 +3,8 @@ from __future__ import unicode_literals
 
 from collections import namedtuple
 import itertools
+import sys
+
 import six
 
 from .exceptions import InvalidParametersException
@@ -12,6 +14,14 @@ UrlParameter = UP = namedtuple('UrlParameter', ['url_component', 'required'])
 UP.__new__.__defaults__ = (False, )
 VariableParameter = VP = namedtuple('VariableParameter', ['index'])
 
+KEY_TABLE_LIMIT = 1000
+
+if six.PY2:
+    def _intern(s):
+        return s
+else:
+    _intern = sys.intern
+
 
 def _get_property(item):
     def get_item(self):
@@ -20,14 +30,13 @@ def _get_property(item):
     def set_item(self, value):
         if value is not None:
             self._params[item] = value
-        elif item in self._params:
-            del self._params[item]
+        else:
+            self._params.pop(item, None)
+        self._url = None
 
     def del_item(self):
-        try:
-            del self._params[item]
-        except KeyError:
-            pass
+        self._params.pop(item, None)
+        self._url = None
 
     return property(get_item, set_item, del_item)
 
@@ -36,6 +45,12 @@ _META_INFO_NAME = str('MetaInfo')
 _META_INFO_FIELDS = ['preset_prefix', 'index_prefix', 'custom_prefix', 'item_prefix']
 _META_INFO_DEFAULT = {field_name: '' for field_name in _META_INFO_FIELDS}
 _META_INFO_DEFAULT['abstract'] = False
+# Only classes of this package are created with empty __slots__ by default.
+_PACKAGE = __name__.partition('.')[0]
+
+
+def _in_package(dct):
+    return dct.get('__module__', '').partition('.')[0] == _PACKAGE
 
 
 def _copy_meta(cls_meta, meta, fields):
@@ -46,12 +61,26 @@ def _copy_meta(cls_meta, meta, fields):
 
 
 class ParameterMeta(type):
+    """
+    Compiles the parameters of a class: Each parameter name is mapped to its URL component in ``meta.name_components``,
+    so that values can be assigned without going through properties, and required components are collected in a
+    ``frozenset``. Classes of this package are created with ``__slots__``. Other subclasses keep an instance
+    ``__dict__``, unless they declare ``__slots__`` themselves. If they override ``url()``, this is noted in
+    ``meta.custom_url``.
+    """
     def __new__(mcs, name, bases, dct):
+        in_package = _in_package(dct)
+        if '__slots__' not in dct and in_package:
+            dct['__slots__'] = ()
         new_cls = super(ParameterMeta, mcs).__new__(mcs, name, bases, dct)
         param_base = getattr(new_cls, 'meta', None)
         new_cls.meta = meta = type(_META_INFO_NAME, (object, ), _META_INFO_DEFAULT)()
         _copy_meta(param_base, meta, _META_INFO_FIELDS)
         _copy_meta(dct.get('Meta'), meta, _META_INFO_FIELDS + ['abstract'])
+        if 'url' in dct:
+            meta.custom_url = not in_package
+        else:
+            meta.custom_url = getattr(param_base, 'custom_url', False)
         cls_parameters = [(p_name, p)
                           for p_name, p in six.iteritems(dct)
                           if isinstance(p, UrlParameter)]
@@ -69,8 +98,9 @@ class ParameterMeta(type):
             meta.parameters = parameters = cls_parameters
             meta.custom_parameters = c_parameters = cls_c_parameters
             meta.parameter_names = [i[0] for i in itertools.chain(cls_parameters, cls_c_parameters)]
-        meta.required_components = required_components = set()
+        required_components = set()
         meta.component_parameters = component_rev = {}
+        meta.name_components = name_components = {}
         if not getattr(meta, 'abstract', False):
             custom_prefix = meta.custom_prefix
             for p_name, param in parameters:
@@ -79,26 +109,36 @@ class ParameterMeta(type):
                     required_components.add(url_comp)
                 setattr(new_cls, p_name, _get_property(url_comp))
                 component_rev[url_comp] = p_name
+                name_components[p_name] = url_comp
             for p_name, param in c_parameters:
                 url_comp = '{0}{1}'.format(custom_prefix, param.index)
                 setattr(new_cls, p_name, _get_property(url_comp))
                 component_rev[url_comp] = p_name
+                name_components[p_name] = url_comp
+        meta.required_components = frozenset(required_components)
+        # Prefixed URL keys of PrefixUrlGenerator and EnumeratedUrlGenerator classes, by item index.
+        meta.key_tables = {}
         return new_cls
 
 
 class AbstractUrlGenerator(six.with_metaclass(ParameterMeta)):
+    __slots__ = (str('_params'), str('_url'))
+
     class Meta(object):
         abstract = True
 
     def __init__(self, params=None, **kwargs):
         if self.meta.abstract:
             raise ValueError("Cannot instantiate an abstract UrlGenerator class.")
+        self._url = None
         if isinstance(params, self.__class__):
             self._params = params._params.copy()
         else:
             self._params = {}
-            self.update(params)
-        self.update_from_kwargs(kwargs)
+            if params:
+                self.update(params)
+        if kwargs:
+            self.update_from_kwargs(kwargs)
 
     def __len__(self):
         return len(self._params)
@@ -110,12 +150,17 @@ class AbstractUrlGenerator(six.with_metaclass(ParameterMeta)):
         return '<{0}: {1}>'.format(self.__class__.__name__, items)
 
     def _update_from_dict(self, d):
-        names = self.meta.parameter_names
+        get_component = self.meta.name_components.get
+        params = self._params
         for k, v in six.iteritems(d):
-            if k in names:
-                setattr(self, k, v)
-            else:
+            url_comp = get_component(k)
+            if url_comp is None:
                 raise ValueError("Invalid field name '{0}'.".format(k))
+            if v is not None:
+                params[url_comp] = v
+            else:
+                params.pop(url_comp, None)
+        self._url = None
 
     def copy(self):
         new_obj = self.__class__()
@@ -125,43 +170,82 @@ class AbstractUrlGenerator(six.with_metaclass(ParameterMeta)):
     def update(self, other=None, **kwargs):
         if other:
             if isinstance(other, AbstractUrlGenerator):
-                for name in self.meta.parameter_names:
-                    setattr(self, name, getattr(other, name))
+                params = self._params
+                for name, url_comp in six.iteritems(self.meta.name_components):
+                    value = getattr(other, name)
+                    if value is not None:
+                        params[url_comp] = value
+                    else:
+                        params.pop(url_comp, None)
+                self._url = None
             elif isinstance(other, dict):
                 self._update_from_dict(other)
             else:
                 raise ValueError("Invalid type for update.")
-        self.update_from_kwargs(kwargs)
+        if kwargs:
+            self.update_from_kwargs(kwargs)
 
     def update_from_kwargs(self, kwargs):
-        names = self.meta.parameter_names
+        get_component = self.meta.name_components.get
+        params = self._params
         for k, v in six.iteritems(kwargs):
-            if k in names:
-                if v is not None:
-                    setattr(self, k, v)
-            else:
+            url_comp = get_component(k)
+            if url_comp is None:
                 raise ValueError("Invalid field name '{0}'.".format(k))
+            if v is not None:
+                params[url_comp] = v
+        self._url = None
 
     def is_empty(self):
         return not self._params
 
     def validate(self):
-        missing = {self.meta.component_parameters[req]
-                   for req in self.meta.required_components.difference(self._params)}
-        if missing:
+        required = self.meta.required_components
+        if required and not required.issubset(self._params):
+            missing = {self.meta.component_parameters[req]
+                       for req in required.difference(self._params)}
             raise InvalidParametersException("Parameters are required, but missing: {0}",
                                              ', '.join(missing))
 
-    def url(self, *args, **kwargs):
+    def _generate_url(self, *args):
         raise NotImplementedError("Method is not implemented.")
 
+    def cached_url(self, *args):
+        """
+        Returns the same parameters as :meth:`url`, but without copying them. The result is validated and generated
+        once, and kept until the object is modified or called with different arguments. It must not be changed by the
+        caller. Subclasses outside of this package that override :meth:`url` are not cached; their :meth:`url` is
+        called instead.
+
+        :return: Request parameters.
+        :rtype: dict
+        """
+        if self.meta.custom_url:
+            return self.url(*args)
+        return self._get_cached_url(*args)
+
+    def _get_cached_url(self, *args):
+        cached = self._url
+        if cached is None or cached[0] != args:
+            self.validate()
+            self._url = cached = (args, self._generate_url(*args))
+        return cached[1]
+
+    def url(self, *args, **kwargs):
+        """
+        Validates the object and generates request parameters.
+
+        :return: Request parameters. The caller may modify them.
+        :rtype: dict
+        """
+        return self._get_cached_url(*args).copy()
+
 
 class UrlGenerator(AbstractUrlGenerator):
     class Meta(object):
         abstract = True
 
-    def url(self, *args, **kwargs):
-        self.validate()
+    def _generate_url(self):
         return self._params.copy()
 
 
@@ -176,15 +260,20 @@ class PrefixUrlGenerator(AbstractUrlGenerator):
         if not self.meta.index_prefix:
             raise ValueError("Meta value index_prefix is not set.")
 
-    def url(self, *args, **kwargs):
-        self.validate()
+    def _get_keys(self):
         meta = self.meta
-        prefix = '{0}{1}'.format(meta.preset_prefix, meta.index_prefix)
-        params = {
-            '{0}{1}'.format(prefix, key): value
-            for key, value in six.iteritems(self._params)
-        }
-        return params
+        keys = meta.key_tables.get(None)
+        if keys is None:
+            prefix = '{0}{1}'.format(meta.preset_prefix, meta.index_prefix)
+            meta.key_tables[None] = keys = {
+                url_comp: _intern(prefix + url_comp)
+                for url_comp in meta.component_parameters
+            }
+        return keys
+
+    def _generate_url(self):
+        keys = self._get_keys()
+        return {keys[key]: value for key, value in six.iteritems(self._params)}
 
 
 class EnumeratedUrlGenerator(AbstractUrlGenerator):
@@ -192,11 +281,46 @@ class EnumeratedUrlGenerator(AbstractUrlGenerator):
         abstract = True
 
     def url(self, index, *args, **kwargs):
-        self.validate()
+        return self._get_cached_url(index).copy()
+
+    def _get_keys(self, index):
         meta = self.meta
-        prefix = '{0}{1}{2}'.format(meta.preset_prefix, meta.index_prefix, meta.item_prefix)
-        enum_params = {
-            '{0}{1}{2}'.format(prefix, index, key): value
-            for key, value in six.iteritems(self._params)
-        }
-        return enum_params
+        key_tables = meta.key_tables
+        keys = key_tables.get(index)
+        if keys is None:
+            prefix = '{0}{1}{2}{3}'.format(meta.preset_prefix, meta.index_prefix, meta.item_prefix, index)
+            keys = {
+                url_comp: _intern(prefix + url_comp)
+                for url_comp in meta.component_parameters
+            }
+            if len(key_tables) < KEY_TABLE_LIMIT:
+                key_tables[index] = keys
+        return keys
+
+    def _generate_url(self, index):
+        keys = self._get_keys(index)
+        return {keys[key]: value for key, value in six.iteritems(self._params)}
+
+    @classmethod
+    def url_list(cls, items, start=1):
+        """
+        Generates the parameters of a list of items in one call, e.g. all products of an impression list. Items are
+        numbered in order, beginning with ``start``.
+
+        :param items: Items, usually instances of this class.
+        :type items: collections.Iterable[EnumeratedUrlGenerator]
+        :param start: Index of the first item.
+        :type start: int
+        :return: Request parameters.
+        :rtype: dict
+        """
+        url = {}
+        for index, item in enumerate(items, start):
+            if item.meta.custom_url:
+                url.update(item.url(index))
+                continue
+            item.validate()
+            keys = item._get_keys(index)
+            for key, value in six.iteritems(item._params):
+                url[keys[key]] = value
+        return url
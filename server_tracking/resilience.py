@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import logging
+import random
+import time
+from threading import Lock, local
+
+
+log = logging.getLogger(__name__)
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+_thread_state = local()
+
+
+def set_background_thread():
+    """
+    Marks the current thread as one that sends hits in the background, where waiting for a retry does not delay
+    anything else.
+    """
+    _thread_state.background = True
+
+
+def is_background_thread():
+    """
+    :return: Whether :func:`set_background_thread` has been called on the current thread.
+    :rtype: bool
+    """
+    return getattr(_thread_state, 'background', False)
+
+
+class RetryPolicy(object):
+    """
+    Number of retries and delays between them, growing exponentially.
+
+    :param max_retries: Maximum number of retries after the first attempt.
+    :type max_retries: int
+    :param backoff: Delay before the first retry in seconds. Doubles with each further retry.
+    :type backoff: int | float
+    :param backoff_max: Maximum delay in seconds.
+    :type backoff_max: int | float
+    :param jitter: Randomize each delay between zero and its nominal value, so that clients that failed at the same
+     time do not retry at the same time.
+    :type jitter: bool
+    """
+    def __init__(self, max_retries=0, backoff=0.5, backoff_max=30, jitter=True):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+    def delay(self, retry):
+        """
+        Returns the delay before a retry.
+
+        :param retry: Number of the retry, starting at zero.
+        :type retry: int
+        :return: Delay in seconds.
+        :rtype: float
+        """
+        delay = min(self.backoff_max, self.backoff * (2 ** retry))
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def delays(self):
+        """
+        Generates the delays before each retry.
+
+        :rtype: collections.Iterable[float]
+        """
+        for retry in range(self.max_retries):
+            yield self.delay(retry)
+
+
+class CircuitBreaker(object):
+    """
+    Stops attempts to reach a failing service for a while. After ``threshold`` consecutive failures, the breaker
+    opens and :meth:`allow` returns ``False`` for ``cooldown`` seconds. Afterwards, a single trial attempt is allowed;
+    it closes the breaker again on success, or re-opens it on failure.
+
+    :param threshold: Number of consecutive failures that open the breaker.
+    :type threshold: int
+    :param cooldown: Time in seconds before a trial attempt is allowed.
+    :type cooldown: int | float
+    """
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def allow(self):
+        """
+        Returns whether an attempt should be made.
+
+        :rtype: bool
+        """
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and monotonic() >= self._opened_at + self.cooldown:
+                self._trial = True
+                return True
+        return False
+
+    def record_success(self):
+        if self._failures or self._opened_at is not None:
+            with self._lock:
+                if self._opened_at is not None:
+                    log.info("Circuit breaker closed.")
+                self._failures = 0
+                self._opened_at = None
+                self._trial = False
+
+    def abort_trial(self):
+        """
+        Ends a trial attempt that has neither succeeded nor failed, e.g. because of an error that is unrelated to the
+        service. The next call to :meth:`allow` permits another trial.
+        """
+        if self._trial:
+            with self._lock:
+                self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.threshold):
+                if self._opened_at is None:
+                    log.warning("Circuit breaker opened after %s failures.", self._failures)
+                self._opened_at = monotonic()
+                self._trial = False
+
+    def remaining(self):
+        """
+        Returns the time until the next trial attempt is allowed.
+
+        :return: Time in seconds. Zero if the breaker is closed.
+        :rtype: float
+        """
+        opened_at = self._opened_at
+        if opened_at is None:
+            return 0
+        return max(0, opened_at + self.cooldown - monotonic())
+
+    def after_fork(self):
+        # The lock may have been held by another thread of the parent process.
+        self._lock = Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
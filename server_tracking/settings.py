@@ -13,17 +13,56 @@ SST_DEFAULT_SETTINGS = {
     'cookie_salt': '',
     'cookie_httponly': True,
     'cookie_secure': True,
+    'cookie_cache_size': 10000,
     'debug': False,
     'send_method': 'POST',
     'post_fallback': True,
+    'split_hits': True,
     'timeout': 10,
     'defer': None,
+    'batch_max_hits': 20,
+    'batch_max_bytes': 16000,
+    'batch_max_linger': 5,
+    'thread_pool_size': 4,
+    'thread_queue_size': 1000,
+    'thread_queue_overflow': 'drop_newest',
+    'pool_connections': 1,
+    'pool_maxsize': 10,
+    'pool_block': False,
+    'pool_prewarm': 0,
+    'keep_alive': True,
+    'session_per_thread': False,
+    'spool_path': None,
+    'spool_segment_size': 1048576,
+    'spool_max_segments': 16,
+    'spool_replay_rate': 10,
+    'retry_max': 0,
+    'retry_backoff': 0.5,
+    'retry_backoff_max': 30,
+    'retry_jitter': True,
+    'breaker_threshold': 0,
+    'breaker_cooldown': 30,
+    'send_fallback': None,
+    'fallback_queue_size': 1000,
+    'sidecar_socket': None,
+    'shutdown_timeout': 5,
+    'shutdown_on_sigterm': True,
+    'sample_rates': {},
+    'sample_rate_default': 1,
+    'sample_rate_categories': {},
+    'sample_rate_paths': {},
+    'sample_rate_dimension': None,
+    'dedup_window': 0,
+    'dedup_max_size': 10000,
+    'dedup_keys': None,
     'anonymize_ip': True,
     'pageview_exclude': (),
+    'pageview_include': (),
     'pageview_na_exceptions': False,
     'pageview_server_exceptions': False,
     'pageview_ajax_responses': False,
     'pageview_ajax_exceptions': False,
+    'pageview_after_response': True,
     'own_cookie_name': 'its_me',
 }
 GA_DEFAULT_SETTINGS = {
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import logging
+import mmap
+import os
+import re
+import struct
+import time
+from threading import RLock
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+log = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct(str('<Id'))
+CURSOR = struct.Struct(str('<QQ'))
+SEGMENT_NAME = '{0:012d}.seg'
+SEGMENT_PATTERN = re.compile(r'^(\d{12})\.seg$')
+CURSOR_NAME = 'cursor'
+LOCK_NAME = 'lock'
+
+
+class SpoolLockedException(Exception):
+    pass
+
+
+class _Segment(object):
+    def __init__(self, path, size):
+        self.path = path
+        exists = os.path.exists(path)
+        self.file = f = open(path, 'r+b' if exists else 'w+b')
+        if not exists or os.path.getsize(path) < size:
+            f.truncate(size)
+        self.map = mmap.mmap(f.fileno(), size)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class HitSpool(object):
+    """
+    Durable append-only log of encoded hits. Records are written to a sequence of fixed-size, memory-mapped segment
+    files. Disk usage is bounded by ``segment_size * max_segments``; when the limit is reached, the oldest segment is
+    discarded along with any unread hits in it. The read position is stored along with the segments, so that a spool
+    can be resumed after a restart of the process.
+
+    Only one process can use a spool directory at a time. :meth:`open_available` finds a free directory for processes
+    that run in parallel.
+
+    :param path: Directory of the spool. It is created if necessary.
+    :type path: unicode | str
+    :param segment_size: Size of each segment file in bytes. Also limits the size of a single record.
+    :type segment_size: int
+    :param max_segments: Maximum number of segment files.
+    :type max_segments: int
+    """
+    def __init__(self, path, segment_size=1048576, max_segments=16):
+        if max_segments < 2:
+            raise ValueError("At least two segments are required.")
+        self._segment_size = segment_size
+        self._max_segments = max_segments
+        self._lock = RLock()
+        self._parent = None
+        self.dropped = 0
+        self._open(path)
+
+    def _open(self, path):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._path = path
+        self._lock_file = self._acquire_lock()
+        self._segments = {}
+
+        seqs = sorted(int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(path)) if m)
+        self._seqs = seqs or [0]
+        cursor_path = os.path.join(path, CURSOR_NAME)
+        with open(cursor_path, 'a+b') as f:
+            if os.path.getsize(cursor_path) < CURSOR.size:
+                f.truncate(CURSOR.size)
+        self._cursor_file = f = open(cursor_path, 'r+b')
+        self._cursor_map = mmap.mmap(f.fileno(), CURSOR.size)
+        read_seq, read_offset = CURSOR.unpack_from(self._cursor_map)
+        if read_seq < self._seqs[0] or read_seq > self._seqs[-1]:
+            read_seq, read_offset = self._seqs[0], 0
+        self._read_seq = read_seq
+        self._read_offset = read_offset
+        self._write_seq = self._seqs[-1]
+        self._write_offset = self._scan_end(self._write_seq)
+        self._closed = False
+
+    def _acquire_lock(self):
+        lock_file = open(os.path.join(self._path, LOCK_NAME), 'a+b')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                lock_file.close()
+                raise SpoolLockedException("Spool directory is in use by another process:", self._path)
+        return lock_file
+
+    @classmethod
+    def open_available(cls, path, max_spools=64, **kwargs):
+        """
+        Opens the first spool in a numbered subdirectory of ``path`` that is not in use by another process.
+
+        :param path: Parent directory of spools.
+        :type path: unicode | str
+        :param max_spools: Maximum number of subdirectories to try.
+        :type max_spools: int
+        :param kwargs: Further arguments to :class:`HitSpool`.
+        :return: Spool.
+        :rtype: HitSpool
+        """
+        for i in range(max_spools):
+            try:
+                spool = cls(os.path.join(path, str(i)), **kwargs)
+            except SpoolLockedException:
+                continue
+            spool._parent = (path, max_spools)
+            return spool
+        raise SpoolLockedException("No spool directory available in:", path)
+
+    def _segment(self, seq):
+        segment = self._segments.get(seq)
+        if segment is None:
+            path = os.path.join(self._path, SEGMENT_NAME.format(seq))
+            self._segments[seq] = segment = _Segment(path, self._segment_size)
+        return segment
+
+    def _scan_end(self, seq):
+        data = self._segment(seq).map
+        offset = 0
+        limit = self._segment_size - RECORD_HEADER.size
+        while offset <= limit:
+            length = RECORD_HEADER.unpack_from(data, offset)[0]
+            if not length:
+                break
+            offset += RECORD_HEADER.size + length
+        return offset
+
+    def _remove_segment(self, seq):
+        segment = self._segments.pop(seq, None)
+        if segment is not None:
+            segment.close()
+        try:
+            os.remove(os.path.join(self._path, SEGMENT_NAME.format(seq)))
+        except OSError:
+            pass
+        self._seqs.remove(seq)
+
+    def _count_unread(self, seq, offset):
+        data = self._segment(seq).map
+        count = 0
+        limit = self._segment_size - RECORD_HEADER.size
+        while offset <= limit:
+            length = RECORD_HEADER.unpack_from(data, offset)[0]
+            if not length:
+                break
+            count += 1
+            offset += RECORD_HEADER.size + length
+        return count
+
+    def _store_cursor(self):
+        CURSOR.pack_into(self._cursor_map, 0, self._read_seq, self._read_offset)
+
+    def _roll(self):
+        self._write_seq += 1
+        self._write_offset = 0
+        self._seqs.append(self._write_seq)
+        self._segment(self._write_seq)
+        while len(self._seqs) > self._max_segments:
+            oldest = self._seqs[0]
+            if oldest == self._read_seq:
+                self.dropped += self._count_unread(oldest, self._read_offset)
+                self._read_seq = self._seqs[1]
+                self._read_offset = 0
+                self._store_cursor()
+            else:
+                self.dropped += self._count_unread(oldest, 0)
+            self._remove_segment(oldest)
+        if self.dropped:
+            log.warning("Spool limit reached, %s hits have been discarded in total.", self.dropped)
+
+    def append(self, payload, timestamp=None):
+        """
+        Appends an encoded hit to the spool.
+
+        :param payload: URL-encoded hit.
+        :type payload: unicode | str | bytes
+        :param timestamp: Time when the hit was generated. Default is the current time.
+        :type timestamp: float
+        """
+        if not isinstance(payload, bytes):
+            payload = payload.encode('utf-8')
+        length = len(payload)
+        record_size = RECORD_HEADER.size + length
+        if not length or record_size > self._segment_size:
+            raise ValueError("Invalid record size: {0}".format(length))
+        with self._lock:
+            if self._closed:
+                raise SpoolLockedException("Spool has been closed:", self._path)
+            if self._write_offset + record_size > self._segment_size:
+                self._roll()
+            data = self._segment(self._write_seq).map
+            offset = self._write_offset
+            start = offset + RECORD_HEADER.size
+            data[start:start + length] = payload
+            # The length is written last, so that a record only becomes visible once it is complete.
+            RECORD_HEADER.pack_into(data, offset, length, timestamp or time.time())
+            self._write_offset = start + length
+
+    def peek(self):
+        """
+        Returns the oldest unread record, without removing it.
+
+        :return: Tuple of timestamp and encoded hit, or ``None`` if the spool is empty.
+        :rtype: (float, unicode | str)
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            while True:
+                seq, offset = self._read_seq, self._read_offset
+                if offset <= self._segment_size - RECORD_HEADER.size:
+                    data = self._segment(seq).map
+                    length, timestamp = RECORD_HEADER.unpack_from(data, offset)
+                    if length:
+                        start = offset + RECORD_HEADER.size
+                        return timestamp, data[start:start + length].decode('utf-8')
+                if seq == self._write_seq:
+                    return None
+                # Segment is fully read.
+                self._read_seq = self._seqs[self._seqs.index(seq) + 1]
+                self._read_offset = 0
+                self._store_cursor()
+                self._remove_segment(seq)
+
+    def consume(self):
+        """
+        Removes the oldest unread record, as returned by :meth:`peek`.
+        """
+        with self._lock:
+            if self.peek() is None:
+                return
+            length = RECORD_HEADER.unpack_from(self._segment(self._read_seq).map, self._read_offset)[0]
+            self._read_offset += RECORD_HEADER.size + length
+            self._store_cursor()
+
+    def is_empty(self):
+        with self._lock:
+            return self.peek() is None
+
+    def _release(self, flush=True):
+        for segment in self._segments.values():
+            if flush:
+                segment.map.flush()
+            segment.close()
+        self._segments = {}
+        if flush:
+            self._cursor_map.flush()
+        self._cursor_map.close()
+        self._cursor_file.close()
+        self._lock_file.close()
+        self._closed = True
+
+    def close(self, timeout=None):
+        """
+        Writes all changes to disk and releases the spool directory.
+
+        :param timeout: Not used; for compatibility with other components closed on shutdown.
+        """
+        with self._lock:
+            if not self._closed:
+                self._release()
+
+    def after_fork(self):
+        """
+        Hands over the spool directory to the parent process, which continues to use it. If the spool has been opened
+        with :meth:`open_available`, the child process continues with another available directory. Otherwise, the
+        spool remains closed.
+        """
+        # The lock may have been held by another thread of the parent process.
+        self._lock = RLock()
+        if self._closed:
+            return
+        # Closing the inherited handles does not release the lock of the parent process.
+        self._release(flush=False)
+        if self._parent is None:
+            log.warning("Spool %s cannot be used in a child process.", self._path)
+            return
+        path, max_spools = self._parent
+        for i in range(max_spools):
+            try:
+                self._open(os.path.join(path, str(i)))
+                return
+            except SpoolLockedException:
+                continue
+        log.warning("No spool directory available in %s for child process.", path)
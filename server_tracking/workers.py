@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import logging
+from threading import Lock, Thread
+
+from six.moves.queue import Queue, Full, Empty
+
+from . import QUEUE_OVERFLOW_BLOCK, QUEUE_OVERFLOW_DROP_NEWEST, QUEUE_OVERFLOW_DROP_OLDEST
+from .resilience import monotonic, set_background_thread
+
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = (QUEUE_OVERFLOW_BLOCK, QUEUE_OVERFLOW_DROP_NEWEST, QUEUE_OVERFLOW_DROP_OLDEST)
+
+_STOP = object()
+
+
+class WorkerPool(object):
+    """
+    Processes items from a bounded queue using a fixed number of threads. Threads are started with the first item.
+
+    :param func: Function that is called with each item.
+    :type func: callable
+    :param workers: Number of worker threads.
+    :type workers: int
+    :param queue_size: Maximum number of items waiting for processing.
+    :type queue_size: int
+    :param overflow: Policy when the queue is full: ``block`` waits for a free slot, ``drop_newest`` discards the
+     submitted item, and ``drop_oldest`` discards the item that has been waiting longest.
+    :type overflow: unicode | str
+    :param on_drop: Optional function that is called with each discarded item.
+    :type on_drop: callable
+    :param initializer: Optional function that is called by each worker thread when it starts.
+    :type initializer: callable
+    :param name: Name prefix of the worker threads.
+    :type name: unicode | str
+    """
+    def __init__(self, func, workers=4, queue_size=1000, overflow=QUEUE_OVERFLOW_DROP_NEWEST, on_drop=None,
+                 initializer=None, name='WorkerPool'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Invalid overflow policy '{0}'.".format(overflow))
+        if workers < 1:
+            raise ValueError("At least one worker is required.")
+        self._func = func
+        self._workers = workers
+        self._overflow = overflow
+        self._on_drop = on_drop
+        self._initializer = initializer
+        self._name = name
+        self._queue_size = queue_size
+        self._queue = Queue(queue_size)
+        self._threads = []
+        self._lock = Lock()
+        self.dropped = 0
+
+    def _start_threads(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                thread = Thread(target=self._run, name='{0}-{1}'.format(self._name, i))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        set_background_thread()
+        if self._initializer is not None:
+            try:
+                self._initializer()
+            except Exception as e:
+                log.exception(e)
+        queue = self._queue
+        func = self._func
+        while True:
+            item = queue.get()
+            try:
+                if item is _STOP:
+                    return
+                func(item)
+            except Exception as e:
+                log.exception(e)
+            finally:
+                queue.task_done()
+
+    def _drop(self, item):
+        self.dropped += 1
+        log.debug("Worker queue is full, dropping item.")
+        if self._on_drop is not None:
+            try:
+                self._on_drop(item)
+            except Exception as e:
+                log.exception(e)
+
+    def submit(self, item):
+        """
+        Adds an item to the queue, applying the overflow policy if the queue is full.
+
+        :param item: Item to process.
+        :return: ``False`` if the submitted item has been discarded, ``True`` otherwise.
+        :rtype: bool
+        """
+        if not self._threads:
+            self._start_threads()
+        queue = self._queue
+        if self._overflow == QUEUE_OVERFLOW_BLOCK:
+            queue.put(item)
+            return True
+        while True:
+            try:
+                queue.put_nowait(item)
+                return True
+            except Full:
+                if self._overflow == QUEUE_OVERFLOW_DROP_NEWEST:
+                    self._drop(item)
+                    return False
+            try:
+                oldest = queue.get_nowait()
+            except Empty:
+                continue
+            queue.task_done()
+            self._drop(oldest)
+
+    def join(self):
+        """
+        Blocks until all queued items have been processed.
+        """
+        self._queue.join()
+
+    def close(self, timeout=None):
+        """
+        Processes remaining items and stops the worker threads.
+
+        :param timeout: Maximum time in seconds to wait for the worker threads.
+        :type timeout: int | float
+        """
+        with self._lock:
+            threads = self._threads
+            self._threads = []
+        deadline = monotonic() + timeout if timeout is not None else None
+        for __ in threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0, deadline - monotonic()) if deadline is not None else None)
+            except Full:
+                log.warning("Worker queue is still full at shutdown, %d items are not processed.",
+                            self._queue.qsize())
+                break
+        for thread in threads:
+            thread.join(max(0, deadline - monotonic()) if deadline is not None else None)
+
+    def after_fork(self):
+        """
+        Discards the queue and threads inherited from the parent process, which does not run in a child process.
+        Threads are started again with the next item.
+        """
+        self._queue = Queue(self._queue_size)
+        self._threads = []
+        self._lock = Lock()
@@ -12,5 +12,8 @@ setup(
     author='Matthias Erll',
     author_email='matthias@erll.de',
     install_requires=['requests', 'six'],
+    extras_require={
+        'async': ['aiohttp'],
+    },
     description='Server-side tracking in Google Analytics for web applications.'
 )
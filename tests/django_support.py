@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Configures Django for the tests of ``server_tracking.django``, which are skipped if Django is not installed. All test
+modules share the same settings, since they are read when the modules are imported.
+"""
+from __future__ import unicode_literals
+
+try:
+    import django
+except ImportError:
+    django = None
+
+TRACKING_ID = 'UA-12345678-1'
+
+
+def setup_django():
+    """
+    :return: Whether Django is available.
+    :rtype: bool
+    """
+    if django is None:
+        return False
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(
+            SECRET_KEY='test',
+            ALLOWED_HOSTS=['*'],
+            TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates'}],
+            SERVER_SIDE_TRACKING={
+                'defer': None,
+                'shutdown_on_sigterm': False,
+            },
+            SERVER_SIDE_TRACKING_GA={
+                'property': TRACKING_ID,
+            },
+        )
+        django.setup()
+    return True
+
+
+DJANGO_AVAILABLE = setup_django()
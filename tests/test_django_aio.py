@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import unittest
+
+from server_tracking.google.aio import aiohttp
+from .django_support import DJANGO_AVAILABLE
+
+if DJANGO_AVAILABLE and aiohttp is not None:
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from server_tracking.django import aio, utils
+else:
+    aio = None
+
+
+@unittest.skipIf(aio is None, "Django or aiohttp is not available.")
+class AsyncDjangoTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        self.async_hits = []
+
+        async def send_async(request_params):
+            await asyncio.sleep(0)
+            self.async_hits.append(request_params)
+
+        self._send_func = utils.default_client._send_func
+        self._async_send_func = aio.async_client._send_func
+        utils.default_client._send_func = self.hits.append
+        aio.async_client._send_func = send_async
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        utils.default_client._send_func = self._send_func
+        aio.async_client._send_func = self._async_send_func
+
+    def test_middleware_sync(self):
+        middleware = aio.AsyncPageViewMiddleware(lambda request: HttpResponse('<html></html>'))
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        response = middleware(self.factory.get('/page'))
+        self.assertIn('vn', response.cookies)
+        self.assertEqual(self.hits, [])
+        response.close()
+        self.assertEqual(len(self.hits), 1)
+        self.assertIn('t=pageview', self.hits[0])
+        self.assertEqual(self.async_hits, [])
+
+    def test_middleware_async(self):
+        async def get_response(request):
+            return HttpResponse('<html></html>')
+
+        middleware = aio.AsyncPageViewMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        async def run():
+            response = await middleware(self.factory.get('/page'))
+            self.assertIn('vn', response.cookies)
+            await asyncio.gather(*aio._tasks)
+            return response
+
+        response = asyncio.run(run())
+        self.assertEqual(len(self.async_hits), 1)
+        self.assertIn('t=pageview', self.async_hits[0])
+        self.assertIn('cid={0}'.format(response.cookies['vn'].value.partition(':')[0]), self.async_hits[0])
+        self.assertEqual(self.hits, [])
+
+    def test_dispatch(self):
+        async def run():
+            started = asyncio.Event()
+            release = asyncio.Event()
+
+            async def coro():
+                started.set()
+                await release.wait()
+
+            async def fail():
+                raise ValueError('test')
+
+            task = aio.dispatch(coro())
+            await started.wait()
+            # Kept until finished, since the event loop only holds weak references.
+            self.assertIn(task, aio._tasks)
+            release.set()
+            await task
+            self.assertNotIn(task, aio._tasks)
+            with self.assertLogs(aio.log, 'ERROR') as logs:
+                failed = aio.dispatch(fail())
+                await asyncio.wait([failed])
+                await asyncio.sleep(0)
+            self.assertNotIn(failed, aio._tasks)
+            return logs
+
+        logs = asyncio.run(run())
+        self.assertEqual(len(logs.records), 1)
+        self.assertIsInstance(logs.records[0].exc_info[1], ValueError)
+
+    def test_track_event(self):
+        factory = self.factory
+
+        class View(object):
+            request = factory.get('/page')
+
+            @aio.track_event('Category', 'Action', label='Label')
+            async def get(self):
+                return HttpResponse()
+
+        async def run():
+            response = await View().get()
+            await asyncio.gather(*aio._tasks)
+            return response
+
+        response = asyncio.run(run())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.async_hits), 1)
+        self.assertIn('ec=Category&ea=Action&el=Label', self.async_hits[0])
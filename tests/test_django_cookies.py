@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+from .django_support import DJANGO_AVAILABLE
+
+if DJANGO_AVAILABLE:
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from server_tracking.django import cookies
+    from server_tracking.django.settings import SERVER_SIDE_TRACKING as SST_SETTINGS
+else:
+    cookies = None
+
+
+class FakeTime(object):
+    def __init__(self, offset):
+        self.offset = offset
+
+    def time(self):
+        return time.time() + self.offset
+
+
+@unittest.skipIf(cookies is None, "Django is not available.")
+class SignedCookieTest(unittest.TestCase):
+    def setUp(self):
+        cookies._cache.clear()
+        self.unsigned = []
+        self._unsign = cookies._unsign
+
+        def unsign(name, signed_value):
+            self.unsigned.append(signed_value)
+            return self._unsign(name, signed_value)
+
+        cookies._unsign = unsign
+        self.factory = RequestFactory()
+        response = HttpResponse()
+        response.set_signed_cookie('vn', 'abc', salt=SST_SETTINGS['cookie_salt'])
+        self.signed_value = response.cookies['vn'].value
+
+    def tearDown(self):
+        cookies._unsign = self._unsign
+        cookies._cache.clear()
+
+    def _get_request(self, value):
+        return self.factory.get('/', HTTP_COOKIE='vn={0}'.format(value))
+
+    def test_cache(self):
+        for __ in range(3):
+            request = self._get_request(self.signed_value)
+            self.assertEqual(cookies.get_signed_cookie(request, 'vn', max_age=100), 'abc')
+            self.assertEqual(cookies.get_signed_cookie(request, 'vn', max_age=100), 'abc')
+        self.assertEqual(self.unsigned, [self.signed_value])
+        self.assertIsNone(cookies.get_signed_cookie(self.factory.get('/'), 'vn'))
+
+    def test_expired(self):
+        self.assertEqual(cookies.get_signed_cookie(self._get_request(self.signed_value), 'vn', max_age=100), 'abc')
+        original_time = cookies.time
+        cookies.time = FakeTime(200)
+        try:
+            self.assertIsNone(cookies.get_signed_cookie(self._get_request(self.signed_value), 'vn', max_age=100))
+            self.assertEqual(cookies.get_signed_cookie(self._get_request(self.signed_value), 'vn', max_age=300),
+                             'abc')
+        finally:
+            cookies.time = original_time
+        self.assertEqual(len(self.unsigned), 1)
+
+    def test_tampered(self):
+        value, sep, signature = self.signed_value.rpartition(':')
+        tampered = '{0}{1}{2}'.format(value.replace('abc', 'abd'), sep, signature)
+        for __ in range(2):
+            self.assertIsNone(cookies.get_signed_cookie(self._get_request(tampered), 'vn'))
+        # The invalid signature is cached as well.
+        self.assertEqual(self.unsigned, [tampered])
+
+    def test_cache_size(self):
+        size = SST_SETTINGS['cookie_cache_size']
+        SST_SETTINGS['cookie_cache_size'] = 2
+        try:
+            for value in ('a', 'b', 'c'):
+                response = HttpResponse()
+                response.set_signed_cookie('vn', value, salt=SST_SETTINGS['cookie_salt'])
+                request = self._get_request(response.cookies['vn'].value)
+                self.assertEqual(cookies.get_signed_cookie(request, 'vn'), value)
+        finally:
+            SST_SETTINGS['cookie_cache_size'] = size
+        self.assertEqual([key[1].partition(':')[0] for key in cookies._cache], ['b', 'c'])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+from .django_support import DJANGO_AVAILABLE
+
+if DJANGO_AVAILABLE:
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from server_tracking.django import utils
+    from server_tracking.django.middleware import PageViewMiddleware
+
+    class ClosableObjectsResponse(HttpResponse):
+        # Closes resources as in Django before 3.0.
+        def __init__(self, *args, **kwargs):
+            super(ClosableObjectsResponse, self).__init__(*args, **kwargs)
+            del self._resource_closers
+            self._closable_objects = []
+
+        def close(self):
+            for closable in self._closable_objects:
+                closable.close()
+
+    class UnclosableResponse(HttpResponse):
+        def __init__(self, *args, **kwargs):
+            super(UnclosableResponse, self).__init__(*args, **kwargs)
+            del self._resource_closers
+else:
+    utils = None
+
+
+@unittest.skipIf(utils is None, "Django is not available.")
+class CallAfterResponseTest(unittest.TestCase):
+    def test_resource_closers(self):
+        calls = []
+        response = HttpResponse()
+        self.assertTrue(utils.call_after_response(response, calls.append, 1))
+        self.assertEqual(calls, [])
+        response.close()
+        self.assertEqual(calls, [1])
+
+    def test_closable_objects(self):
+        calls = []
+        response = ClosableObjectsResponse()
+        self.assertTrue(utils.call_after_response(response, calls.append, 1))
+        self.assertEqual(calls, [])
+        response.close()
+        self.assertEqual(calls, [1])
+
+    def test_immediate(self):
+        calls = []
+        self.assertFalse(utils.call_after_response(UnclosableResponse(), calls.append, 1))
+        self.assertEqual(calls, [1])
+
+    def test_exception(self):
+        def fail():
+            raise ValueError('test')
+
+        response = HttpResponse()
+        utils.call_after_response(response, fail)
+        with self.assertLogs(utils.log, 'ERROR'):
+            response.close()
+
+
+@unittest.skipIf(utils is None, "Django is not available.")
+class PageViewMiddlewareTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        self._send_func = utils.default_client._send_func
+        utils.default_client._send_func = self.hits.append
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        utils.default_client._send_func = self._send_func
+
+    def _get_response(self, response_class):
+        middleware = PageViewMiddleware(lambda request: response_class('<html></html>'))
+        return middleware(self.factory.get('/page'))
+
+    def test_after_response(self):
+        for response_class in (HttpResponse, ClosableObjectsResponse):
+            del self.hits[:]
+            response = self._get_response(response_class)
+            self.assertIn('vn', response.cookies)
+            self.assertEqual(self.hits, [])
+            response.close()
+            self.assertEqual(len(self.hits), 1)
+            client_id = response.cookies['vn'].value.partition(':')[0]
+            self.assertIn('cid={0}'.format(client_id), self.hits[0])
+
+    def test_immediate(self):
+        response = self._get_response(UnclosableResponse)
+        self.assertIn('vn', response.cookies)
+        self.assertEqual(len(self.hits), 1)
+        self.assertIn('t=pageview', self.hits[0])
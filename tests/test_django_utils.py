@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+from .django_support import DJANGO_AVAILABLE
+
+if DJANGO_AVAILABLE:
+    from django.http import HttpResponse
+    from django.template.response import SimpleTemplateResponse, TemplateResponse
+
+    from server_tracking.django import utils
+else:
+    utils = None
+
+
+class TitledView(object):
+    title = 'View title'
+
+
+class UntitledView(object):
+    pass
+
+
+class CountingExtractor(object):
+    def __init__(self, title=None):
+        self.title = title
+        self.checked = []
+        self.calls = 0
+
+    def applies_to(self, response_class, view_class):
+        self.checked.append((response_class, view_class))
+        return True
+
+    def get_title(self, response):
+        self.calls += 1
+        return self.title
+
+
+class FailingExtractor(object):
+    def __init__(self):
+        self.calls = 0
+
+    def get_title(self, response):
+        self.calls += 1
+        return response.missing
+
+
+@unittest.skipIf(utils is None, "Django is not available.")
+class TitleTest(unittest.TestCase):
+    def setUp(self):
+        self._extractors = utils.title_extractors[:]
+        utils._title_resolvers.clear()
+
+    def tearDown(self):
+        utils.title_extractors[:] = self._extractors
+        utils._title_resolvers.clear()
+
+    def test_default_extractors(self):
+        self.assertIsNone(utils.get_title(HttpResponse()))
+        self.assertIsNone(utils.get_title(SimpleTemplateResponse('page.html')))
+        self.assertEqual(utils.get_title(SimpleTemplateResponse('page.html', {'title': 'Title'})), 'Title')
+        self.assertEqual(utils.get_title(TemplateResponse(None, 'page.html', {'view': TitledView()})), 'View title')
+        self.assertIsNone(utils.get_title(TemplateResponse(None, 'page.html', {'view': UntitledView()})))
+        self.assertEqual(utils._title_resolvers[(HttpResponse, None)], [])
+        self.assertEqual(len(utils._title_resolvers[(TemplateResponse, UntitledView)]), 1)
+
+    def test_attribute_error(self):
+        failing = FailingExtractor()
+        utils.title_extractors[:] = [failing, CountingExtractor('Title')]
+        for __ in range(3):
+            self.assertEqual(utils.get_title(HttpResponse()), 'Title')
+        # Extractors are not dropped for failures.
+        self.assertEqual(failing.calls, 3)
+
+    def test_cache(self):
+        extractor = CountingExtractor('Title')
+        utils.title_extractors[:] = [extractor]
+        for __ in range(2):
+            utils.get_title(HttpResponse())
+            utils.get_title(TemplateResponse(None, 'page.html', {'view': TitledView()}))
+            utils.get_title(TemplateResponse(None, 'page.html', {'view': UntitledView()}))
+        self.assertEqual(extractor.checked, [(HttpResponse, None), (TemplateResponse, TitledView),
+                                             (TemplateResponse, UntitledView)])
+        self.assertEqual(extractor.calls, 6)
+
+    def test_cache_size(self):
+        utils.title_extractors[:] = [CountingExtractor()]
+        size = utils.TITLE_RESOLVER_CACHE_SIZE
+        utils.TITLE_RESOLVER_CACHE_SIZE = 2
+        try:
+            utils.get_title(HttpResponse())
+            utils.get_title(TemplateResponse(None, 'page.html', {'view': TitledView()}))
+            self.assertEqual(len(utils._title_resolvers), 2)
+            utils.get_title(TemplateResponse(None, 'page.html', {'view': UntitledView()}))
+        finally:
+            utils.TITLE_RESOLVER_CACHE_SIZE = size
+        self.assertEqual(list(utils._title_resolvers), [(TemplateResponse, UntitledView)])
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+import unittest
+
+from server_tracking.google import HIT_TYPE_EVENT, HIT_TYPE_TRANSACTION, HIT_TYPE_TRANSACTION_ITEM
+from server_tracking.google.aio import AsyncAnalyticsClient, AsyncAnalyticsSender, aiohttp
+from server_tracking.google.client import BulkResult
+from server_tracking.google.parameters import EComItem, SessionParameters
+from server_tracking.google.splitting import split_payload
+
+from .test_ga_splitting import _purchase
+
+
+class AsyncClientTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+
+        async def send_func(request_params):
+            await asyncio.sleep(0)
+            self.hits.append(request_params)
+
+        self.client = AsyncAnalyticsClient(send_func, {'tracking_id': 'UA-x'})
+
+    def test_event(self):
+        session = SessionParameters(client_id=42)
+        result = asyncio.run(self.client.event('Category', 'Action', session_params=session))
+        self.assertTrue(result)
+        self.assertEqual(self.hits, [{'v': 1, 'tid': 'UA-x', 't': HIT_TYPE_EVENT, 'ec': 'Category',
+                                      'ea': 'Action', 'cid': 42}])
+
+    def test_transaction(self):
+        items = [EComItem('item1', price=10), EComItem('item2', price=5, quantity=2)]
+        self.assertTrue(asyncio.run(self.client.transaction('1234', items, revenue=20)))
+        self.assertEqual([hit['t'] for hit in self.hits],
+                         [HIT_TYPE_TRANSACTION, HIT_TYPE_TRANSACTION_ITEM, HIT_TYPE_TRANSACTION_ITEM])
+
+    def test_send_many(self):
+        specs = [('event', {'category': 'Offline', 'action': 'Conversion', 'session_params': {'client_id': i}})
+                 for i in range(20)]
+        specs.extend([('event', {'category': 'Offline'}), ('unknown', {})])
+        errors = []
+        for concurrency in (3, 0):
+            del self.hits[:]
+            result = asyncio.run(self.client.send_many(specs, concurrency=concurrency, queue_size=2,
+                                                       on_error=lambda spec, e: errors.append(spec[0])))
+            self.assertEqual(result, BulkResult(processed=22, sent=20, failed=2, skipped=0))
+            self.assertEqual(sorted(hit['cid'] for hit in self.hits), list(range(20)))
+        self.assertEqual(errors, ['event', 'unknown'] * 2)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not available.")
+class AsyncSenderTest(unittest.TestCase):
+    def test_send(self):
+        from aiohttp import web
+
+        received = []
+
+        async def collect(request):
+            received.append((request.method, request.raw_path.partition('?')[2], await request.text()))
+            return web.Response()
+
+        async def run():
+            app = web.Application()
+            app.router.add_route('*', '/collect', collect)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            sender = AsyncAnalyticsSender(ssl=False)
+            sender._base_url = 'http://127.0.0.1:{0}/collect'.format(port)
+            await sender.get({'t': 'event', 'ec': 'a b'})
+            await sender.post({'t': 'event', 'ec': 'a b'})
+            await sender.get({'dp': 'x' * 3000})
+            await sender.post(_purchase(200))
+            await sender.close()
+            await runner.cleanup()
+
+        asyncio.run(run())
+        self.assertEqual(received[:3], [('GET', 't=event&ec=a+b', ''),
+                                        ('POST', '', 't=event&ec=a+b'),
+                                        ('POST', '', 'dp=' + 'x' * 3000)])
+        parts = [body for __, __, body in received[3:]]
+        self.assertEqual(parts, split_payload(_purchase(200)))
+        self.assertTrue(len(parts) > 1)
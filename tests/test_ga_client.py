@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+from six.moves.urllib.parse import parse_qs
+
+from server_tracking.encoding import encode_params
+from server_tracking.exceptions import InvalidParametersException
+from server_tracking.google import HIT_TYPE_EVENT, HIT_TYPE_PAGEVIEW, HIT_TYPE_TRANSACTION, HIT_TYPE_TRANSACTION_ITEM
+from server_tracking.google.client import AnalyticsClient, BulkResult
+from server_tracking.google.parameters import (SessionParameters, PageViewParameters, CustomDimensionUrlGenerator,
+                                               EComItem, EventParameters)
+from server_tracking.google.templates import TemplateCache, event_template
+from server_tracking.parameters import VP
+from server_tracking.google.sampling import HitSampler, client_bucket
+
+TRACKING_ID = 'UA-x'
+
+
+class DimensionParameters(CustomDimensionUrlGenerator):
+    dimension = VP(1)
+
+
+class AnalyticsClientTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        self.client = AnalyticsClient(self.hits.append, {'tracking_id': TRACKING_ID})
+
+    def test_event(self):
+        self.assertTrue(self.client.event('Category', 'Action', session_params=SessionParameters(client_id=1)))
+        self.assertEqual(self.hits, [{'v': 1, 'tid': TRACKING_ID, 't': HIT_TYPE_EVENT, 'ec': 'Category',
+                                      'ea': 'Action', 'cid': 1}])
+
+    def test_modified_misc_parameters(self):
+        session = SessionParameters(client_id=1)
+        self.client.misc_parameters = (session, )
+        self.client.event('Category', 'Action')
+        session.client_id = 2
+        self.client.event('Category', 'Action')
+        self.assertEqual([hit['cid'] for hit in self.hits], [1, 2])
+
+    def test_payload(self):
+        dimension = DimensionParameters(dimension='a b')
+        client = AnalyticsClient(self.hits.append, {'tracking_id': TRACKING_ID}, misc_parameters=(dimension, ),
+                                 encode_hits=True)
+        page = PageViewParameters(host_name='example.com', path='/')
+        session = SessionParameters(client_id=1)
+        cases = [
+            ((HIT_TYPE_PAGEVIEW, page, session), {}),
+            ((HIT_TYPE_PAGEVIEW, page, session, DimensionParameters(dimension='c')), {}),
+            ((HIT_TYPE_PAGEVIEW, page, session), {'cd1': 'd', 'tid': 'UA-y'}),
+            ((HIT_TYPE_PAGEVIEW, page, session), {'cd1': None}),
+        ]
+        for args, kwargs in cases:
+            expected = encode_params(client.get_request_params(*args, **kwargs))
+            self.assertEqual(parse_qs(client.get_payload(*args, **kwargs)), parse_qs(expected))
+        dimension.dimension = 'e'
+        client.pageview(page, session_params=session)
+        self.assertEqual(parse_qs(self.hits[-1])['cd1'], ['e'])
+
+    def test_transaction(self):
+        items = [EComItem('item1', price=10), EComItem('item2', price=5, quantity=2)]
+        self.assertTrue(self.client.transaction('1234', items, shipping=3, tax=2))
+        self.assertEqual([hit['t'] for hit in self.hits],
+                         [HIT_TYPE_TRANSACTION, HIT_TYPE_TRANSACTION_ITEM, HIT_TYPE_TRANSACTION_ITEM])
+        self.assertEqual(self.hits[0]['tr'], 25)
+
+    def test_transaction_send_many(self):
+        units = []
+
+        def send_func(request_params):
+            raise AssertionError("Hits should be sent as a unit.")
+
+        send_func.send_many = units.append
+        client = AnalyticsClient(send_func, {'tracking_id': TRACKING_ID})
+        self.assertTrue(client.transaction('1234', [EComItem('item1', price=10)] * 3))
+        self.assertEqual([[hit['t'] for hit in unit] for unit in units],
+                         [[HIT_TYPE_TRANSACTION] + [HIT_TYPE_TRANSACTION_ITEM] * 3])
+
+
+class HitTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        self.client = AnalyticsClient(self.hits.append, {'tracking_id': TRACKING_ID}, encode_hits=True)
+        self.session = SessionParameters(client_id=1)
+
+    def test_template(self):
+        template = event_template('Checkout', 'Submit & Pay', value=5)
+        template.send(self.client, self.session, PageViewParameters(host_name='example.com', path='/'))
+        expected = self.client.get_request_params(HIT_TYPE_EVENT, EventParameters('Checkout', 'Submit & Pay', value=5),
+                                                  self.session, PageViewParameters(host_name='example.com', path='/'))
+        self.assertEqual(parse_qs(self.hits[0]), parse_qs(encode_params(expected)))
+
+    def test_override(self):
+        template = event_template('Checkout', 'Submit')
+        template.send(self.client, self.session, ec='Override')
+        self.assertEqual(parse_qs(self.hits[0])['ec'], ['Override'])
+
+    def test_invalid(self):
+        self.assertRaises(InvalidParametersException, event_template, 'Checkout', None)
+
+    def test_event_cache(self):
+        self.client.event('Checkout', 'Submit', session_params=self.session)
+        self.client.event('Checkout', 'Submit', session_params=self.session, non_interaction_hit=1)
+        self.assertEqual(len(self.client._event_templates), 1)
+        self.assertNotIn('ni', parse_qs(self.hits[0]))
+        self.assertEqual(parse_qs(self.hits[1])['ni'], ['1'])
+
+    def test_template_cache_lru(self):
+        cache = TemplateCache(event_template, max_size=2)
+        hot = cache.get('Checkout', 'Submit')
+        for value in range(5):
+            cache.get('Checkout', 'Submit', None, value)
+            self.assertIs(cache.get('Checkout', 'Submit'), hot)
+        self.assertEqual(len(cache), 2)
+        last = cache.get('Checkout', 'Submit', None, 4)
+        self.assertIs(cache.get('Checkout', 'Submit', None, 4), last)
+        self.assertIs(cache.get('Checkout', 'Submit'), hot)
+
+
+class SendManyTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        self.client = AnalyticsClient(self.hits.append, {'tracking_id': TRACKING_ID}, encode_hits=True)
+
+    def _specs(self, count):
+        for i in range(count):
+            yield 'event', {'category': 'Offline', 'action': 'Conversion', 'session_params': {'client_id': i}}
+        yield 'event', {'category': 'Offline'}
+        yield 'unknown', {}
+
+    def test_send_many(self):
+        progress = []
+        errors = []
+        result = self.client.send_many(self._specs(50), concurrency=3, queue_size=5, on_progress=progress.append,
+                                       progress_interval=20, on_error=lambda spec, e: errors.append(spec[0]))
+        self.assertEqual(result, BulkResult(processed=52, sent=50, failed=2, skipped=0))
+        self.assertEqual(len(self.hits), 50)
+        self.assertEqual(sorted(int(parse_qs(hit)['cid'][0]) for hit in self.hits), list(range(50)))
+        self.assertEqual(errors, ['event', 'unknown'])
+        self.assertEqual([p.processed for p in progress], [20, 40, 52])
+
+    def test_send_failures(self):
+        def _send(hit):
+            raise ValueError(hit)
+
+        result = self.client.send_many(self._specs(3), concurrency=0, send_func=_send)
+        self.assertEqual(result, BulkResult(processed=5, sent=0, failed=5, skipped=0))
+
+
+class SamplingTest(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        self.client_ids = range(1000)
+
+    def test_client_bucket(self):
+        self.assertEqual(client_bucket('abc'), client_bucket('abc'))
+        self.assertTrue(0 <= client_bucket(42) < 1)
+
+    def test_rates(self):
+        sampler = HitSampler({HIT_TYPE_PAGEVIEW: 0.5}, default_rate=0.2, category_rates={'Sale': 1},
+                             path_rates={'/a/': 0.1, '/a/b/': 0.3})
+        self.assertEqual(sampler.get_rate(HIT_TYPE_PAGEVIEW), 0.5)
+        self.assertEqual(sampler.get_rate(HIT_TYPE_EVENT), 0.2)
+        self.assertEqual(sampler.get_rate(HIT_TYPE_EVENT, category='Sale', path='/a/'), 1)
+        self.assertEqual(sampler.get_rate(HIT_TYPE_PAGEVIEW, path='/a/c'), 0.1)
+        self.assertEqual(sampler.get_rate(HIT_TYPE_PAGEVIEW, path='/a/b/c'), 0.3)
+
+    def test_client_sampling(self):
+        sampler = HitSampler({HIT_TYPE_PAGEVIEW: 0.25}, dimension=3)
+        client = AnalyticsClient(self.hits.append, {'tracking_id': TRACKING_ID}, sampler=sampler)
+        for cid in self.client_ids:
+            session = SessionParameters(client_id=cid)
+            client.pageview(host_name='example.com', path='/', session_params=session)
+            client.event('Category', 'Action', path='/', host_name='example.com', session_params=session)
+        pageviews = {hit['cid'] for hit in self.hits if hit['t'] == HIT_TYPE_PAGEVIEW}
+        events = {hit['cid'] for hit in self.hits if hit['t'] == HIT_TYPE_EVENT}
+        self.assertEqual(len(events), len(self.client_ids))
+        self.assertTrue(200 < len(pageviews) < 300)
+        self.assertEqual(pageviews, {cid for cid in self.client_ids if client_bucket(cid) < 0.25})
+        self.assertTrue(all(hit['cd3'] == 0.25 for hit in self.hits if hit['t'] == HIT_TYPE_PAGEVIEW))
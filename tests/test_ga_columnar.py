@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+from server_tracking.exceptions import InvalidParametersException
+from server_tracking.google import HIT_TYPE_EVENT, HIT_TYPE_PAGEVIEW
+from server_tracking.google.client import AnalyticsClient
+from server_tracking.google.columnar import ColumnarHitBuilder
+from server_tracking.google.parameters import EventParameters, SessionParameters, PageViewParameters
+
+
+class ColumnarHitBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self.client = AnalyticsClient(None, {'tracking_id': 'UA-12345678-1'})
+
+    def test_payloads(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_EVENT)
+        payloads = list(builder.payloads({
+            'client_id': ['1', '2', '3'],
+            'category': 'Import',
+            'action': ['Order', 'Order & Pay', 'Cancel'],
+            'value': [10, None, 2.5],
+        }))
+        expected = [
+            self.client.get_payload(HIT_TYPE_EVENT, EventParameters('Import', action=action, value=value),
+                                    SessionParameters(client_id=client_id))
+            for client_id, action, value in (('1', 'Order', 10), ('2', 'Order & Pay', None), ('3', 'Cancel', 2.5))
+        ]
+        self.assertEqual([sorted(p.split('&')) for p in payloads], [sorted(p.split('&')) for p in expected])
+
+    def test_chunks(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_PAGEVIEW, chunk_size=3)
+        payloads = list(builder.payloads({'client_id': (str(i) for i in range(10)), 'location_url': 'http://x/'}))
+        self.assertEqual(len(payloads), 10)
+        self.assertTrue(payloads[9].endswith('&cid=9'))
+
+    def test_missing_column(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_EVENT)
+        with self.assertRaises(InvalidParametersException):
+            builder.payloads({'client_id': ['1'], 'category': ['Import']})
+        with self.assertRaises(InvalidParametersException):
+            # Page view parameters are used, but not sufficient.
+            builder.payloads({'client_id': ['1'], 'category': ['Import'], 'action': ['Order'], 'title': ['Home']})
+        with self.assertRaises(ValueError):
+            builder.payloads({'client_id': ['1'], 'category': ['Import'], 'action': ['Order'], 'invalid': [1]})
+
+    def test_missing_value(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_EVENT)
+        payloads = builder.payloads({'client_id': ['1', None], 'category': 'Import', 'action': 'Order'})
+        with self.assertRaises(InvalidParametersException):
+            list(payloads)
+
+    def test_nan(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_EVENT)
+        payloads = list(builder.payloads({'client_id': ['1', '2'], 'category': 'Import', 'action': 'Order',
+                                          'value': [float('nan'), 3], 'label': float('nan')}))
+        self.assertNotIn('ev=', payloads[0])
+        self.assertIn('ev=3', payloads[1])
+        self.assertFalse(any('nan' in payload for payload in payloads))
+        payloads = builder.payloads({'client_id': ['1'], 'category': [float('nan')], 'action': 'Order'})
+        with self.assertRaises(InvalidParametersException):
+            list(payloads)
+
+    def test_length_mismatch(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_EVENT)
+        with self.assertRaises(ValueError):
+            list(builder.payloads({'client_id': ['1', '2'], 'category': ['Import'], 'action': 'Order'}))
+
+    def test_timestamps(self):
+        builder = ColumnarHitBuilder(self.client, HIT_TYPE_PAGEVIEW, parameter_classes=(PageViewParameters,
+                                                                                          SessionParameters))
+        now = time.time()
+        payloads = list(builder.payloads({'client_id': ['1', '2'], 'path': '/', 'host_name': 'example.com'},
+                                         timestamps=[now - 60, now - 86400]))
+        self.assertEqual(len(payloads), 1)
+        queue_time = int(payloads[0].rpartition('&qt=')[2])
+        self.assertTrue(60000 <= queue_time < 70000)
+        self.assertEqual(builder.expired, 1)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+from server_tracking.google import HIT_TYPE_EVENT
+from server_tracking.google.client import AnalyticsClient
+from server_tracking.google.dedup import HitDeduplicator
+from server_tracking.google.parameters import EComItem, SessionParameters
+
+
+class HitDeduplicatorTest(unittest.TestCase):
+    def test_ignored_parameters(self):
+        dedup = HitDeduplicator()
+        self.assertFalse(dedup.is_duplicate('v=1&t=event&ec=a&ea=b&z=1'))
+        self.assertTrue(dedup.is_duplicate('v=1&t=event&ea=b&ec=a&z=2&qt=10'))
+        self.assertFalse(dedup.is_duplicate('v=1&t=event&ec=a&ea=c'))
+        self.assertFalse(dedup.is_duplicate({'v': 1, 't': HIT_TYPE_EVENT, 'ec': 'a', 'ea': 'b'}))
+        self.assertTrue(dedup.is_duplicate({'v': 1, 't': HIT_TYPE_EVENT, 'ec': 'a', 'ea': 'b', 'z': 5}))
+        self.assertEqual(dedup.duplicates, 2)
+
+    def test_keys(self):
+        dedup = HitDeduplicator()
+        self.assertFalse(dedup.is_duplicate('tid=UA-x&t=transaction&ti=1&tr=10'))
+        self.assertTrue(dedup.is_duplicate('tid=UA-x&t=transaction&ti=1&tr=20'))
+        self.assertFalse(dedup.is_duplicate('tid=UA-x&t=transaction&ti=2&tr=20'))
+        self.assertFalse(dedup.is_duplicate('tid=UA-y&t=transaction&ti=1&tr=20'))
+
+    def test_bounds(self):
+        dedup = HitDeduplicator(window=0.05, max_size=2)
+        for ec in ('a', 'b', 'c'):
+            dedup.is_duplicate({'t': HIT_TYPE_EVENT, 'ec': ec})
+        self.assertEqual(len(dedup), 2)
+        self.assertFalse(dedup.is_duplicate({'t': HIT_TYPE_EVENT, 'ec': 'a'}))
+        self.assertTrue(dedup.is_duplicate({'t': HIT_TYPE_EVENT, 'ec': 'c'}))
+        time.sleep(0.06)
+        self.assertFalse(dedup.is_duplicate({'t': HIT_TYPE_EVENT, 'ec': 'c'}))
+        self.assertEqual(len(dedup), 1)
+
+    def test_client(self):
+        hits = []
+        client = AnalyticsClient(hits.append, {'tracking_id': 'UA-x'}, encode_hits=True,
+                                 deduplicator=HitDeduplicator())
+        session = SessionParameters(client_id=1)
+        items = [EComItem('item1', price=10)]
+        for __ in range(2):
+            self.assertTrue(client.event('Form', 'Submit', session_params=session))
+            self.assertTrue(client.transaction('1234', items, misc_params=(session, )))
+        self.assertEqual(len(hits), 3)
@@ -67,6 +67,37 @@ class UrlGeneratorTest(unittest.TestCase):
             'v': 1,
         })
 
+    def test_subclass_attributes(self):
+        class TrackedSessionParameters(SessionParameters):
+            def __init__(self, *args, **kwargs):
+                super(TrackedSessionParameters, self).__init__(*args, **kwargs)
+                self.source = 'test'
+
+        sp = TrackedSessionParameters(client_id=CLIENT_ID)
+        self.assertEqual(sp.source, 'test')
+        self.assertEqual(sp.url(), {'cid': CLIENT_ID})
+        self.assertFalse(hasattr(SessionParameters(client_id=CLIENT_ID), '__dict__'))
+
+    def test_custom_url(self):
+        class LabeledSessionParameters(SessionParameters):
+            def url(self, *args, **kwargs):
+                url = super(LabeledSessionParameters, self).url(*args, **kwargs)
+                url['cd1'] = 'label'
+                return url
+
+        class LabeledProductParameters(SearchListProductParams):
+            def url(self, index, *args, **kwargs):
+                url = super(LabeledProductParameters, self).url(index, *args, **kwargs)
+                url['il1pi{0}cd1'.format(index)] = 'label'
+                return url
+
+        sp = LabeledSessionParameters(client_id=CLIENT_ID)
+        self.assertDictEqual(sp.cached_url(), {'cid': CLIENT_ID, 'cd1': 'label'})
+        self.assertFalse(SessionParameters.meta.custom_url)
+        self.assertFalse(GeneralParameters.meta.custom_url)
+        self.assertDictEqual(LabeledProductParameters.url_list([LabeledProductParameters(sku='xyz')]),
+                             {'il1pi1id': 'xyz', 'il1pi1cd1': 'label'})
+
     def test_session_parameters(self):
         sp = SessionParameters(user_id='1')
         with self.assertRaises(InvalidParametersException) as exc:
@@ -79,6 +110,41 @@ class UrlGeneratorTest(unittest.TestCase):
             'uid': '1',
         })
 
+    def test_compiled_class(self):
+        self.assertEqual(SessionParameters.meta.name_components['client_id'], 'cid')
+        self.assertEqual(SessionParameters.meta.required_components, frozenset(['cid']))
+        sp = SessionParameters(client_id=CLIENT_ID, user_id='1')
+        self.assertFalse(hasattr(sp, '__dict__'))
+        with self.assertRaises(AttributeError):
+            sp.unknown = 1
+        with self.assertRaises(ValueError):
+            SessionParameters(unknown=1)
+        sp.user_id = None
+        self.assertEqual(len(sp), 1)
+        copied = SessionParameters()
+        copied.update(sp)
+        self.assertDictEqual(copied.url(), {'cid': CLIENT_ID})
+        gp = GeneralParameters(tracking_id=TRACKING_ID, use_cache_buster=True)
+        self.assertTrue(gp.use_cache_buster)
+
+    def test_cached_url(self):
+        sp = SessionParameters(client_id=CLIENT_ID)
+        cached = sp.cached_url()
+        self.assertIs(sp.cached_url(), cached)
+        url = sp.url()
+        url['uid'] = '2'
+        self.assertDictEqual(sp.url(), {'cid': CLIENT_ID})
+        sp.user_id = '1'
+        self.assertDictEqual(sp.cached_url(), {'cid': CLIENT_ID, 'uid': '1'})
+        sp.update(user_id='3')
+        self.assertEqual(sp.url()['uid'], '3')
+        del sp.client_id
+        with self.assertRaises(InvalidParametersException):
+            sp.url()
+        tp = EnhancedEComProductParameters(sku='xyz')
+        self.assertDictEqual(tp.url(1), {'pr1id': 'xyz'})
+        self.assertDictEqual(tp.url(2), {'pr2id': 'xyz'})
+
     def test_custom_parameters(self):
         cd = CustomDimensionParams(my_dimension='test')
         cm = CustomMetricParams()
@@ -108,3 +174,10 @@ class UrlGeneratorTest(unittest.TestCase):
         self.assertDictEqual(tlcd.url(3), {'il1pi3cd1': 'test'})
         tlcm = CustomProductMetricParams(my_metric=101)
         self.assertDictEqual(tlcm.url(4), {'il1pi4cm2': 101})
+
+    def test_url_list(self):
+        products = [SearchListProductParams(sku='a', price=1), SearchListProductParams(sku='b')]
+        expected = {'il1pi1id': 'a', 'il1pi1pr': 1, 'il1pi2id': 'b'}
+        self.assertDictEqual(SearchListProductParams.url_list(products), expected)
+        self.assertDictEqual(SearchListProductParams.url_list(products, start=3),
+                             {'il1pi3id': 'a', 'il1pi3pr': 1, 'il1pi4id': 'b'})
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from requests import ConnectionError, HTTPError
+from requests.structures import CaseInsensitiveDict
+
+from server_tracking import FALLBACK_DROP, FALLBACK_QUEUE
+from server_tracking.exceptions import SenderException
+from server_tracking.resilience import RetryPolicy, CircuitBreaker, set_background_thread
+from server_tracking.google import BATCH_PATH, COLLECT_PATH
+from server_tracking.google.replay import SpoolReplayer
+from server_tracking.google.sender import AnalyticsSender, BatchAnalyticsSender, create_session
+from server_tracking.spool import HitSpool
+
+
+class FakeSession(object):
+    def __init__(self):
+        self.headers = CaseInsensitiveDict({'User-Agent': 'test'})
+        self.hooks = {'response': []}
+        self.posted = []
+        self.sent = []
+        self.event = threading.Event()
+
+    def send(self, request, timeout=None):
+        self.sent.append(request)
+
+    def post(self, url, data=None, timeout=None):
+        self.posted.append((url, data))
+        self.event.set()
+
+    def close(self):
+        pass
+
+
+class SessionTest(unittest.TestCase):
+    def test_create_session(self):
+        session = create_session(pool_maxsize=20, pool_block=True, keep_alive=False)
+        adapter = session.get_adapter('https://www.google-analytics.com')
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    def test_prewarm(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(10)
+        try:
+            sender = AnalyticsSender(create_session(pool_maxsize=2, pool_block=True), ssl=False, timeout=1)
+            sender._base_url = 'http://127.0.0.1:{0}{1}'.format(server.getsockname()[1], COLLECT_PATH)
+            sender.prewarm(5)
+            pool = sender.session.get_adapter(sender._base_url).poolmanager.connection_from_url(sender._base_url)
+            # Limited to the pool size, instead of waiting for a free connection.
+            self.assertEqual(pool.num_connections, 2)
+            sender.close()
+        finally:
+            server.close()
+        with self.assertLogs('server_tracking.google.sender', 'WARNING'):
+            AnalyticsSender(FakeSession()).prewarm(2)
+
+    def test_session_per_thread(self):
+        sender = AnalyticsSender(session_factory=FakeSession, session_per_thread=True)
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(sender.session))
+        thread.start()
+        thread.join()
+        self.assertIs(sender.session, sender.session)
+        self.assertIsNot(sender.session, sessions[0])
+
+
+class SenderTest(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+
+    def test_get(self):
+        sender = AnalyticsSender(self.session)
+        sender.send({'t': 'event', 'ec': 'a b'})
+        request = self.session.sent[0]
+        self.assertEqual(request.method, 'GET')
+        self.assertTrue(request.url.endswith('{0}?t=event&ec=a+b'.format(COLLECT_PATH)))
+        self.assertEqual(request.headers['User-Agent'], 'test')
+        self.assertIsNone(request.body)
+
+    def test_post_fallback(self):
+        sender = AnalyticsSender(self.session)
+        sender.send({'dp': 'x' * 2000})
+        request = self.session.sent[0]
+        self.assertEqual(request.method, 'POST')
+        self.assertEqual(request.body, ('dp=' + 'x' * 2000).encode('ascii'))
+        self.assertEqual(request.headers['Content-Length'], '2003')
+        sender = AnalyticsSender(self.session, post_fallback=False)
+        self.assertRaises(SenderException, sender.send, {'dp': 'x' * 2000})
+
+    def test_spool_on_failure(self):
+        spooled = []
+
+        class FakeSpool(object):
+            def append(self, payload, timestamp=None):
+                spooled.append((payload, timestamp))
+
+        def fail(request, timeout=None):
+            raise ConnectionError()
+
+        self.session.send = fail
+        sender = AnalyticsSender(self.session, spool=FakeSpool())
+        self.assertIsNone(sender.send({'t': 'event'}, 1000))
+        self.assertEqual(spooled, [('t=event', 1000)])
+        self.assertRaises(ConnectionError, AnalyticsSender(self.session).send, {'t': 'event'})
+
+    def test_retry_and_breaker(self):
+        attempts = []
+
+        def fail(request, timeout=None):
+            attempts.append(request)
+            raise ConnectionError()
+
+        def send_in_background():
+            set_background_thread()
+            results.append(sender.send({'t': 'event'}))
+
+        self.session.send = fail
+        sender = AnalyticsSender(self.session, retry=RetryPolicy(2, backoff=0.001),
+                                 breaker=CircuitBreaker(threshold=3, cooldown=60), fallback=FALLBACK_DROP)
+        # Not retried in the calling thread.
+        self.assertIsNone(sender.send({'t': 'event'}))
+        self.assertEqual(len(attempts), 1)
+        results = []
+        thread = threading.Thread(target=send_in_background)
+        thread.start()
+        thread.join(5)
+        self.assertEqual(results, [None])
+        self.assertEqual(len(attempts), 3)
+        # Breaker is open, no further attempts.
+        self.assertIsNone(sender.send({'t': 'event'}))
+        self.assertEqual(len(attempts), 3)
+
+    def test_breaker_trial_error(self):
+        def fail(request, timeout=None):
+            raise ValueError()
+
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.session.send = fail
+        sender = AnalyticsSender(self.session, breaker=breaker, fallback=FALLBACK_DROP)
+        self.assertRaises(ValueError, sender.send, {'t': 'event'})
+        # The trial has ended without a result, so that another one is allowed.
+        self.assertTrue(breaker.allow())
+
+    def test_breaker_default_fallback(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=60)
+        breaker.record_failure()
+        with self.assertLogs('server_tracking.google.sender', 'DEBUG'):
+            sender = AnalyticsSender(self.session, breaker=breaker)
+        self.assertIsNone(sender.send({'t': 'event'}))
+        self.assertEqual(self.session.sent, [])
+
+    def test_queue_fallback(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+        breaker.record_failure()
+        sender = AnalyticsSender(self.session, breaker=breaker, fallback=FALLBACK_QUEUE)
+        self.assertIsNone(sender.send({'t': 'event'}))
+        self.assertEqual(self.session.sent, [])
+        sender._fallback_pool.join()
+        self.assertEqual(len(self.session.sent), 1)
+        self.assertIn('t=event&qt=', self.session.sent[0].url)
+        self.assertFalse(breaker.is_open)
+
+    def test_replay(self):
+        class Response(object):
+            def __init__(self, status_code):
+                self.status_code = status_code
+
+        path = tempfile.mkdtemp()
+        spool = HitSpool(path)
+        try:
+            spool.append('t=event')
+            breaker = CircuitBreaker(threshold=1, cooldown=60)
+            sender = AnalyticsSender(self.session, spool=spool, breaker=breaker)
+            replayer = SpoolReplayer(spool, sender.replay)
+            self.session.send = lambda request, timeout=None: Response(500)
+            self.assertRaises(HTTPError, replayer.replay_next)
+            self.assertEqual(spool.peek()[1], 't=event')
+            self.assertTrue(breaker.is_open)
+            # No attempt while the breaker is open.
+            self.session.send = lambda request, timeout=None: Response(200)
+            self.assertRaises(SenderException, replayer.replay_next)
+            self.assertEqual(spool.peek()[1], 't=event')
+            breaker.record_success()
+            self.assertTrue(replayer.replay_next())
+            self.assertIsNone(spool.peek())
+        finally:
+            spool.close()
+            shutil.rmtree(path)
+
+    def test_post_limit(self):
+        sender = AnalyticsSender(self.session, default_method='POST')
+        sender.send('t=event')
+        self.assertEqual(self.session.sent[0].body, b't=event')
+        self.assertRaises(SenderException, sender.send, {'dp': 'x' * 8000})
+
+    def test_send_many(self):
+        sender = AnalyticsSender(self.session)
+        sender.send_many(['t=transaction&ti=1'] + ['t=item&ti=1&in={0}'.format(i) for i in range(25)])
+        self.assertEqual(self.session.sent, [])
+        self.assertEqual(len(self.session.posted), 2)
+        self.assertTrue(all(url.endswith(BATCH_PATH) for url, __ in self.session.posted))
+        hits = [hit for __, data in self.session.posted for hit in data.split(b'\n')]
+        self.assertEqual(len(hits), 26)
+        self.assertEqual(hits[0], b't=transaction&ti=1')
+
+
+class BatchSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+
+    def test_flush_on_count(self):
+        sender = BatchAnalyticsSender(self.session, max_hits=2, max_linger=60)
+        sender.send({'v': 1, 't': 'event'})
+        sender.send({'v': 1, 't': 'pageview'})
+        self.assertTrue(self.session.event.wait(5))
+        sender.close(5)
+        self.assertEqual(len(self.session.posted), 1)
+        url, data = self.session.posted[0]
+        self.assertTrue(url.endswith(BATCH_PATH))
+        self.assertEqual(sorted(data.split(b'\n')), [b'v=1&t=event', b'v=1&t=pageview'])
+
+    def test_flush_on_size(self):
+        sender = BatchAnalyticsSender(self.session, max_bytes=30, max_linger=60)
+        sender.send({'dp': 'a' * 20})
+        sender.send({'dp': 'b' * 20})
+        sender.close(5)
+        self.assertEqual([data for __, data in self.session.posted],
+                         [('dp=' + 'a' * 20).encode('utf-8'), ('dp=' + 'b' * 20).encode('utf-8')])
+
+    def test_send_many(self):
+        sender = BatchAnalyticsSender(self.session, max_hits=3, max_linger=60)
+        sender.send_many(['t=transaction', 't=item', 't=item'])
+        self.assertTrue(self.session.event.wait(5))
+        sender.close(5)
+        self.assertEqual(self.session.posted[0][1], b't=transaction\nt=item\nt=item')
+
+    def test_flush_on_linger(self):
+        sender = BatchAnalyticsSender(self.session, max_linger=0.05)
+        sender.send({'t': 'event'})
+        self.assertTrue(self.session.event.wait(5))
+        self.assertEqual(self.session.posted[0][1], b't=event')
+        sender.close(5)
+
+    def test_add_after_close(self):
+        spooled = []
+
+        class FakeSpool(object):
+            def append(self, payload, timestamp=None):
+                spooled.append((payload, timestamp))
+
+        sender = BatchAnalyticsSender(self.session, spool=FakeSpool())
+        sender.close(5)
+        sender.send({'t': 'event'}, 1000)
+        self.assertEqual(spooled, [('t=event', 1000)])
+        sender = BatchAnalyticsSender(self.session)
+        sender.close(5)
+        with self.assertLogs('server_tracking.google.sender', 'DEBUG'):
+            sender.send({'t': 'event'})
+        self.assertEqual(self.session.posted, [])
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from server_tracking.google import POST_SIZE_LIMIT
+from server_tracking.google.sidecar import MESSAGE_HEADER, PAYLOAD_SIZE_LIMIT, SidecarClient, SidecarServer
+
+
+class FakeSender(object):
+    def __init__(self):
+        self.hits = []
+        self.event = threading.Event()
+
+    def send(self, payload, timestamp=None):
+        self.hits.append((payload, timestamp))
+        self.event.set()
+
+
+class FakeSpool(object):
+    def __init__(self):
+        self.hits = []
+
+    def append(self, payload, timestamp=None):
+        self.hits.append((payload, timestamp))
+
+
+class SidecarTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.path, 'sst.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_send(self):
+        sender = FakeSender()
+        server = SidecarServer(self.socket_path, sender)
+        server.bind()
+        thread = threading.Thread(target=server.serve)
+        thread.start()
+        try:
+            SidecarClient(self.socket_path).send({'t': 'event', 'ec': 'a b'}, 1000.5)
+            self.assertTrue(sender.event.wait(5))
+        finally:
+            server.stop()
+            thread.join()
+            server.close()
+        self.assertEqual(sender.hits, [('t=event&ec=a+b', 1000.5)])
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_fail_open(self):
+        spool = FakeSpool()
+        SidecarClient(self.socket_path, spool=spool).send('t=event', 1000)
+        self.assertEqual(spool.hits, [('t=event', 1000)])
+        client = SidecarClient(self.socket_path)
+        client.send('t=event')
+        self.assertEqual(client.dropped, 1)
+
+    def test_size_limit(self):
+        client = SidecarClient(self.socket_path)
+        delivered = []
+        client.deliver = lambda payload, timestamp: delivered.append(payload)
+        products = '&'.join('pr{0}nm={1}'.format(i, 'x' * 100) for i in range(1, 400))
+        client.send('t=event&ec=a&ea=b&' + products, 1000)
+        self.assertGreater(len(delivered), 1)
+        self.assertTrue(all(len(part) <= POST_SIZE_LIMIT for part in delivered))
+        client.send('t=event&dp=' + 'x' * PAYLOAD_SIZE_LIMIT, 1000)
+        self.assertEqual(client.dropped, 1)
+
+    def test_truncated(self):
+        sender = FakeSender()
+        server = SidecarServer(self.socket_path, sender)
+        server.handle(MESSAGE_HEADER.pack(1000, 7) + b't=event')
+        server.handle(MESSAGE_HEADER.pack(1000, 20) + b't=event')
+        self.assertEqual(sender.hits, [('t=event', 1000)])
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+from six.moves.urllib.parse import parse_qs
+
+from server_tracking.encoding import encode_params
+from server_tracking.exceptions import SenderException
+from server_tracking.google import HIT_TYPE_EVENT, HIT_TYPE_PAGEVIEW, EECOM_ACTION_PURCHASE
+from server_tracking.google.sender import AnalyticsSender
+from server_tracking.google.splitting import split_payload
+
+from .test_ga_sender import FakeSession
+
+
+def _purchase(products):
+    params = {'v': 1, 'tid': 'UA-x', 'cid': 1, 't': HIT_TYPE_PAGEVIEW, 'dp': '/checkout',
+              'pa': EECOM_ACTION_PURCHASE, 'ti': 'T1', 'tr': 100, 'il1nm': 'Related'}
+    for i in range(1, products + 1):
+        params['pr{0}id'.format(i)] = 'SKU{0:05d}'.format(i)
+        params['pr{0}nm'.format(i)] = 'Product {0}'.format(i)
+        params['il1pi{0}id'.format(i)] = 'REL{0:05d}'.format(i)
+    return encode_params(params)
+
+
+class SplitPayloadTest(unittest.TestCase):
+    def test_small_payload(self):
+        self.assertEqual(split_payload('t=event', limit=100), ['t=event'])
+
+    def test_split(self):
+        payload = _purchase(40)
+        parts = [parse_qs(part) for part in split_payload(payload, limit=1000)]
+        self.assertTrue(len(parts) > 1)
+        self.assertTrue(all(len(part) <= 1000 for part in split_payload(payload, limit=1000)))
+        products = []
+        impressions = []
+        for part in parts:
+            self.assertEqual(part['cid'], ['1'])
+            products.extend(part['pr{0}id'.format(i)][0] for i in range(1, 41) if 'pr{0}id'.format(i) in part)
+            impressions.extend(part['il1pi{0}id'.format(i)][0] for i in range(1, 41)
+                               if 'il1pi{0}id'.format(i) in part)
+            if any(key.startswith('il1pi') for key in part):
+                self.assertEqual(part['il1nm'], ['Related'])
+        self.assertEqual(products, ['SKU{0:05d}'.format(i) for i in range(1, 41)])
+        self.assertEqual(impressions, ['REL{0:05d}'.format(i) for i in range(1, 41)])
+        self.assertEqual(parts[0]['t'], [HIT_TYPE_PAGEVIEW])
+        self.assertEqual(parts[0]['tr'], ['100'])
+        self.assertEqual(parts[0]['pa'], [EECOM_ACTION_PURCHASE])
+        self.assertEqual(parts[0]['ti'], ['T1'])
+        for part in parts[1:]:
+            self.assertEqual(part['t'], [HIT_TYPE_EVENT])
+            self.assertEqual(part['ni'], ['1'])
+            self.assertNotIn('tr', part)
+            # The purchase is only counted once.
+            self.assertNotIn('pa', part)
+            self.assertNotIn('ti', part)
+
+    def test_no_products(self):
+        self.assertRaises(SenderException, split_payload, 'dp=' + 'x' * 200, limit=100)
+
+    def test_sender(self):
+        session = FakeSession()
+        sender = AnalyticsSender(session, default_method='POST')
+        sender.send(_purchase(200))
+        self.assertTrue(len(session.sent) > 1)
+        self.assertTrue(all(len(request.body) <= 8000 for request in session.sent))
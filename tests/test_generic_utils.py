@@ -3,6 +3,9 @@ from __future__ import unicode_literals
 
 import unittest
 
+from requests.models import RequestEncodingMixin
+
+from server_tracking.encoding import encode_params, encode_payload
 from server_tracking.utils import anonymize_ip_address, class_from_name
 
 
@@ -22,3 +25,25 @@ class GenericUtilsTest(unittest.TestCase):
     def test_class_loader(self):
         self.assertEqual(class_from_name('tests.test_generic_utils.GenericUtilsTest').__name__, self.__class__.__name__)
         self.assertRaises(AttributeError, class_from_name, 'server_tracking.utils')
+
+
+class EncodingTest(unittest.TestCase):
+    def test_encode_params(self):
+        params = {
+            'v': 1,
+            'ev': 1.5,
+            'ni': True,
+            'dp': '/path/to?q=a b&c=d',
+            'dt': 'Ünïcödé – title',
+            'ua': 'Mozilla/5.0 (X11; Linux x86_64)',
+            'tid': 'UA-123-1',
+            'el': None,
+        }
+        self.assertEqual(encode_params(params), RequestEncodingMixin._encode_params(params))
+        # Second run is served from cache.
+        self.assertEqual(encode_params(params), RequestEncodingMixin._encode_params(params))
+
+    def test_encode_payload(self):
+        self.assertEqual(encode_payload({'t': 'event'}), 't=event')
+        self.assertEqual(encode_payload('t=event'), 't=event')
+        self.assertEqual(encode_payload(b't=event'), 't=event')
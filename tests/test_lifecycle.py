@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from server_tracking import lifecycle
+from server_tracking.spool import HitSpool
+from server_tracking.workers import WorkerPool
+from server_tracking.google.sender import BatchAnalyticsSender
+
+from .test_ga_sender import FakeSession
+
+
+class RecordingComponent(object):
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def after_fork(self):
+        self.log.append(('fork', self.name))
+
+    def close(self, timeout=None):
+        self.log.append(('close', self.name))
+
+
+class LifecycleTest(unittest.TestCase):
+    def setUp(self):
+        self.log = []
+        self.components = [RecordingComponent(name, self.log) for name in ('a', 'b')]
+        for component in self.components:
+            lifecycle.register(component)
+
+    def tearDown(self):
+        for component in self.components:
+            lifecycle.unregister(component)
+
+    def test_check_fork(self):
+        lifecycle.check_fork()
+        self.assertEqual(self.log, [])
+        lifecycle._pid = -1
+        lifecycle.check_fork()
+        self.assertEqual(self.log, [('fork', 'a'), ('fork', 'b')])
+        self.assertEqual(lifecycle._pid, os.getpid())
+
+    def test_shutdown_order(self):
+        lifecycle.shutdown(1)
+        self.assertEqual(self.log, [('close', 'b'), ('close', 'a')])
+        self.assertNotIn(self.components[0], lifecycle._components)
+
+
+class AfterForkTest(unittest.TestCase):
+    def test_worker_pool(self):
+        processed = []
+        pool = WorkerPool(processed.append, workers=1)
+        pool.submit(1)
+        pool.join()
+        pool.after_fork()
+        self.assertEqual(pool._threads, [])
+        pool.submit(2)
+        pool.join()
+        pool.close(1)
+        self.assertEqual(processed, [1, 2])
+
+    def test_batch_sender(self):
+        sessions = []
+
+        def _session_factory():
+            session = FakeSession()
+            sessions.append(session)
+            return session
+
+        sender = BatchAnalyticsSender(session_factory=_session_factory, max_linger=60)
+        sender.add('t=event&ec=a')
+        sender.after_fork()
+        self.assertEqual(len(sessions), 2)
+        sender.add('t=event&ec=b')
+        sender.close(1)
+        self.assertEqual(sessions[0].posted, [])
+        self.assertEqual(sessions[1].posted[0][1], b't=event&ec=b')
+
+    def test_spool(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        spool = HitSpool.open_available(path, segment_size=256)
+        spool.append('t=event&ec=parent')
+        read, write = os.pipe()
+        pid = os.fork()
+        if not pid:
+            status = 1
+            try:
+                os.close(read)
+                spool.after_fork()
+                spool.append('t=event&ec=child')
+                os.write(write, spool._path.encode('utf-8'))
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(write)
+        child_path = os.read(read, 1024).decode('utf-8')
+        os.close(read)
+        self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        self.assertEqual(child_path, os.path.join(path, '1'))
+        self.assertEqual(spool.peek()[1], 't=event&ec=parent')
+        spool.close()
+        child_spool = HitSpool(child_path, segment_size=256)
+        self.assertEqual(child_spool.peek()[1], 't=event&ec=child')
+        child_spool.close()
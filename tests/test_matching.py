@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+import unittest
+
+from server_tracking.matching import PathMatcher
+
+
+class PathMatcherTest(unittest.TestCase):
+    def test_prefixes(self):
+        matcher = PathMatcher(exclude=('admin/', 'api/'), include=('admin/public/', ('api/v2/', 0.25)))
+        self.assertIsNone(matcher.get_rate(''))
+        self.assertIsNone(matcher.get_rate('blog/'))
+        self.assertIsNone(matcher.get_rate('admin'))
+        self.assertEqual(matcher.get_rate('admin/'), 0)
+        self.assertEqual(matcher.get_rate('admin/users/'), 0)
+        self.assertEqual(matcher.get_rate('admin/public/index'), 1)
+        self.assertEqual(matcher.get_rate('api/v1/'), 0)
+        self.assertEqual(matcher.get_rate('api/v2/orders/'), 0.25)
+
+    def test_empty_prefix(self):
+        matcher = PathMatcher(exclude=('', ), include=('shop/', ))
+        self.assertEqual(matcher.get_rate('blog/'), 0)
+        self.assertEqual(matcher.get_rate('shop/item/'), 1)
+        self.assertFalse(PathMatcher())
+        self.assertIsNone(PathMatcher().get_rate('blog/'))
+
+    def test_regexes(self):
+        matcher = PathMatcher(exclude=(re.compile(r'.*\.php$'), 'static/'),
+                              include=((re.compile(r'static/(a|b)/'), 0.5), ))
+        self.assertEqual(matcher.get_rate('wp-login.php'), 0)
+        self.assertEqual(matcher.get_rate('static/a/x.css'), 0.5)
+        self.assertEqual(matcher.get_rate('static/c/x.css'), 0)
+        self.assertIsNone(matcher.get_rate('x/static/a/'))
+        # Regular expressions are checked before prefixes, in the given order.
+        self.assertEqual(matcher.get_rate('static/b/x.php'), 0)
+
+    def test_uncombined_regexes(self):
+        matcher = PathMatcher(include=(re.compile(r'(a)\1'), re.compile('B', re.IGNORECASE)))
+        self.assertIsNone(matcher._combined)
+        self.assertEqual(matcher.get_rate('aa'), 1)
+        self.assertEqual(matcher.get_rate('b'), 1)
+        self.assertIsNone(matcher.get_rate('ab'))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, PathMatcher, exclude=(1, ))
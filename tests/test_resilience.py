@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+from server_tracking.resilience import RetryPolicy, CircuitBreaker
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_delays(self):
+        policy = RetryPolicy(5, backoff=1, backoff_max=10, jitter=False)
+        self.assertEqual(list(policy.delays()), [1, 2, 4, 8, 10])
+        policy = RetryPolicy(3, backoff=1, jitter=True)
+        for retry, delay in enumerate(policy.delays()):
+            self.assertTrue(0 <= delay <= 2 ** retry)
+        self.assertEqual(list(RetryPolicy().delays()), [])
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_open_and_close(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.allow())
+        self.assertTrue(0 < breaker.remaining() <= 0.05)
+        time.sleep(0.06)
+        # Only a single trial attempt is allowed.
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.remaining(), 0)
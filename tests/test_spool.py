@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+import time
+import unittest
+
+from server_tracking.spool import HitSpool, SpoolLockedException
+from server_tracking.google.replay import SpoolReplayer, set_queue_time
+
+
+class HitSpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _drain(self, spool):
+        records = []
+        while True:
+            record = spool.peek()
+            if record is None:
+                return records
+            records.append(record[1])
+            spool.consume()
+
+    def test_append_and_read(self):
+        spool = HitSpool(self.path, segment_size=64)
+        self.assertIsNone(spool.peek())
+        for i in range(10):
+            spool.append('t=event&ev={0}'.format(i), timestamp=1000 + i)
+        self.assertEqual(spool.peek(), (1000, 't=event&ev=0'))
+        self.assertEqual(self._drain(spool), ['t=event&ev={0}'.format(i) for i in range(10)])
+        self.assertTrue(spool.is_empty())
+        spool.close()
+
+    def test_resume(self):
+        spool = HitSpool(self.path, segment_size=64)
+        for i in range(6):
+            spool.append('ev={0}'.format(i))
+        spool.consume()
+        spool.consume()
+        spool.close()
+        spool = HitSpool(self.path, segment_size=64)
+        spool.append('ev=6')
+        self.assertEqual(self._drain(spool), ['ev={0}'.format(i) for i in range(2, 7)])
+        spool.close()
+
+    def test_bounded(self):
+        spool = HitSpool(self.path, segment_size=40, max_segments=2)
+        for i in range(10):
+            # Two records fit into one segment.
+            spool.append('ev={0}'.format(i))
+        self.assertEqual(self._drain(spool), ['ev={0}'.format(i) for i in range(6, 10)])
+        self.assertEqual(spool.dropped, 6)
+        self.assertRaises(ValueError, spool.append, 'x' * 40)
+        spool.close()
+
+    def test_lock(self):
+        spool = HitSpool.open_available(self.path)
+        self.assertRaises(SpoolLockedException, HitSpool, spool._path)
+        other = HitSpool.open_available(self.path)
+        self.assertNotEqual(spool._path, other._path)
+        spool.close()
+        other.close()
+
+
+class SpoolReplayerTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.spool = HitSpool(self.path)
+        self.sent = []
+
+    def tearDown(self):
+        self.spool.close()
+        shutil.rmtree(self.path)
+
+    def test_set_queue_time(self):
+        self.assertEqual(set_queue_time('t=event&qt=10&ec=a', 500), 't=event&ec=a&qt=500')
+
+    def test_replay(self):
+        now = time.time()
+        self.spool.append('t=event&ec=old', now - 20000)
+        self.spool.append('t=event&ec=new', now - 2)
+        replayer = SpoolReplayer(self.spool, self.sent.append)
+        self.assertTrue(replayer.replay_next())
+        self.assertTrue(replayer.replay_next())
+        self.assertFalse(replayer.replay_next())
+        self.assertEqual(replayer.expired, 1)
+        self.assertEqual(len(self.sent), 1)
+        payload, __, queue_time = self.sent[0].rpartition('&qt=')
+        self.assertEqual(payload, 't=event&ec=new')
+        self.assertTrue(2000 <= int(queue_time) < 3000)
+
+    def test_replay_failure(self):
+        def fail(payload):
+            raise IOError()
+
+        self.spool.append('t=event')
+        replayer = SpoolReplayer(self.spool, fail)
+        self.assertRaises(IOError, replayer.replay_next)
+        self.assertEqual(self.spool.peek()[1], 't=event')
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+from server_tracking import QUEUE_OVERFLOW_DROP_NEWEST, QUEUE_OVERFLOW_DROP_OLDEST, QUEUE_OVERFLOW_BLOCK
+from server_tracking.workers import WorkerPool
+
+
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.processed = []
+
+    def _process(self, item):
+        self.started.set()
+        self.release.wait(5)
+        self.processed.append(item)
+
+    def _fill(self, pool):
+        pool.submit(0)
+        self.assertTrue(self.started.wait(5))
+        pool.submit(1)
+        pool.submit(2)
+
+    def test_drop_newest(self):
+        dropped = []
+        pool = WorkerPool(self._process, workers=1, queue_size=2, overflow=QUEUE_OVERFLOW_DROP_NEWEST,
+                          on_drop=dropped.append)
+        self._fill(pool)
+        self.assertFalse(pool.submit(3))
+        self.release.set()
+        pool.close(5)
+        self.assertEqual(self.processed, [0, 1, 2])
+        self.assertEqual(dropped, [3])
+        self.assertEqual(pool.dropped, 1)
+
+    def test_drop_oldest(self):
+        dropped = []
+        pool = WorkerPool(self._process, workers=1, queue_size=2, overflow=QUEUE_OVERFLOW_DROP_OLDEST,
+                          on_drop=dropped.append)
+        self._fill(pool)
+        self.assertTrue(pool.submit(3))
+        self.release.set()
+        pool.close(5)
+        self.assertEqual(self.processed, [0, 2, 3])
+        self.assertEqual(dropped, [1])
+
+    def test_block(self):
+        pool = WorkerPool(self._process, workers=1, queue_size=2, overflow=QUEUE_OVERFLOW_BLOCK)
+        self._fill(pool)
+        threading.Timer(0.05, self.release.set).start()
+        self.assertTrue(pool.submit(3))
+        pool.close(5)
+        self.assertEqual(self.processed, [0, 1, 2, 3])
+
+    def test_close_timeout(self):
+        pool = WorkerPool(self._process, workers=1, queue_size=2, overflow=QUEUE_OVERFLOW_DROP_NEWEST)
+        self._fill(pool)
+        start = time.time()
+        pool.close(0.1)
+        self.assertLess(time.time() - start, 1)
+        self.release.set()
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, WorkerPool, self._process, overflow='discard')